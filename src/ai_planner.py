@@ -0,0 +1,335 @@
+"""
+Enemy planning in worker processes.
+
+The main loop publishes an immutable snapshot of the world (robot positions,
+hit points) and the workers return intents for the enemies: the robot to follow
+or, if there is none, the bush to hide in. The intents are applied when they
+arrive, one or more ticks later; until then the enemies keep their last
+intents.
+
+The worker processes are forked once, before pygame.init() (SDL starts threads,
+forking a process with threads is unsafe), and shared by all matches. Each job
+names the map of its match, the workers load it once from the map cache.
+"""
+
+import multiprocessing
+import random
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+import pygame
+import config
+import map_compiler
+from ai_scheduler import AIScheduler
+from map import Map
+from robot import Robot, choose_goal, find_hiding_spot, visible_robots
+
+
+class RobotState(NamedTuple):
+    """A robot in a world snapshot"""
+
+    id: int
+    x: float
+    y: float
+    hitbox_radius: int
+    hp: float
+
+
+class WorldSnapshot(NamedTuple):
+    ticks: int  # pygame ticks when the snapshot was taken
+    robots: tuple[RobotState, ...]
+
+
+class Intent(NamedTuple):
+    """Result of planning for one enemy"""
+
+    robot_id: int
+    decided: bool  # whether a new goal was chosen (otherwise only a hiding spot)
+    goal_id: int | None  # robot to follow, None: hide
+    hiding_spot: tuple[float, float] | None  # bush to hide in (if there is no goal)
+
+
+class MapSource(NamedTuple):
+    """How a worker gets the map of a match"""
+
+    key: str | None  # cache key of map_compiler (None: not a cached level file)
+    file_path: str | None
+    tile_size: int
+    compiled: dict | None  # tiles of a map changed by set_tile (sent along)
+
+
+def map_source(game_map: Map) -> MapSource:
+    compiled = game_map.to_compiled() if game_map.edits else None
+    return MapSource(
+        game_map.cache_key, game_map.file_path, config.TILE_SIZE, compiled
+    )
+
+
+# pool shared by all matches (see start_workers) and its number of workers
+executor: ProcessPoolExecutor | None = None
+executor_workers = 0
+
+# map of the worker process (of the last job)
+worker_map: Map | None = None
+worker_map_source: MapSource | None = None
+
+
+def workers_supported() -> bool:
+    """Worker processes are forked, which is only reliable on Linux"""
+    return (
+        sys.platform.startswith("linux")
+        and "fork" in multiprocessing.get_all_start_methods()
+    )
+
+
+def start_workers(workers: int | None = None) -> None:
+    """Fork the worker processes (once, before pygame.init)"""
+    global executor, executor_workers
+    workers = config.AI_WORKERS if workers is None else workers
+    if executor is not None or workers <= 0 or not workers_supported():
+        return
+    if pygame.get_init():
+        print("Warning: pygame is running already, enemies plan on the main thread.")
+        return
+    # forked workers do not run main.py again
+    executor = ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("fork")
+    )
+    # fork all workers now (the pool forks them at the first job)
+    for future in [executor.submit(int) for _ in range(workers)]:
+        future.result()
+    executor_workers = workers
+
+
+def stop_workers() -> None:
+    """Stop the worker processes (at the end of the game)"""
+    global executor, executor_workers
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+    executor = None
+    executor_workers = 0
+
+
+def load_worker_map(source: MapSource) -> Map:
+    """Runs in a worker: the map of a job, loaded once per match"""
+    global worker_map, worker_map_source
+    config.TILE_SIZE = source.tile_size
+    if worker_map is None or source != worker_map_source:
+        if source.compiled is not None:
+            worker_map = Map(source.file_path, compiled=source.compiled)
+        elif source.key is not None:
+            worker_map = map_compiler.load_map(source.file_path)
+        else:
+            worker_map = Map(source.file_path)
+        worker_map_source = source
+    return worker_map
+
+
+def plan(
+    source: MapSource,
+    snapshot: WorldSnapshot,
+    decide_ids: list[int],
+    hide_ids: list[int],
+    seed: int,
+) -> list[Intent]:
+    """Runs in a worker: choose goals and hiding spots for the given enemies"""
+    random.seed(seed)  # workers are forked, they would all draw the same numbers
+    game_map = load_worker_map(source)
+    states = {state.id: state for state in snapshot.robots}
+    visible = visible_robots(snapshot.robots, game_map)  # same for all decisions
+    intents = []
+    for robot_id in decide_ids:
+        state = states[robot_id]
+        goal = choose_goal(state, snapshot.robots, game_map, visible)
+        hiding_spot = None
+        if goal is None:
+            hiding_spot = find_hiding_spot(
+                state.x, state.y, state.hitbox_radius, game_map
+            )
+        intents.append(
+            Intent(robot_id, True, goal.id if goal else None, hiding_spot)
+        )
+    for robot_id in hide_ids:
+        state = states[robot_id]
+        hiding_spot = find_hiding_spot(state.x, state.y, state.hitbox_radius, game_map)
+        intents.append(Intent(robot_id, False, None, hiding_spot))
+    return intents
+
+
+class AIPlanner(AIScheduler):
+    def __init__(self, game_map: Map):
+        """AIScheduler that plans in the worker processes (see start_workers).
+
+        When no job is running (and at most every AI_PUBLISH_INTERVAL_MS), the
+        enemies that are due and the hiding enemies without a valid hiding spot
+        are split over the workers with one snapshot of the world. The main
+        thread only takes the snapshot and applies intents. If a job fails or
+        the pool breaks, its enemies decide on the main thread.
+        """
+        super().__init__()
+        if executor is None:
+            raise RuntimeError("start_workers() must be called before pygame.init()")
+        self.executor = executor
+        self.workers = executor_workers
+        self.map_source = map_source(game_map)
+        # jobs of the published snapshot -> (deciding enemies, hiding enemies)
+        self.pending: dict[Future, tuple[list[Robot], list[Robot]]] = {}
+        self.pending_robots: dict[int, Robot] = {}  # robot id -> robot of snapshot
+        self.pending_ticks = 0  # ticks of the published snapshot
+        self.next_publish = 0  # ticks from which a new snapshot may be published
+
+        # statistics
+        self.plans = 0  # number of published snapshots
+        self.latency_ms = 0  # ticks between publishing and applying the last plan
+        self.failed_plans = 0  # jobs decided on the main thread instead
+
+    def update(self, ticks: int, game_map: Map, robots: list[Robot]) -> None:
+        """Apply finished intents, publish a new snapshot if no job is running"""
+        start = time.perf_counter()
+        self.apply_intents(ticks, game_map, robots)
+        if self.executor is None:  # the pool broke, decide like AIScheduler
+            super().update(ticks, game_map, robots)
+            return
+        if not self.pending and ticks >= self.next_publish:
+            self.queue_due(ticks)
+            self.publish(ticks, game_map, robots)
+        self.last_frame_ms = (time.perf_counter() - start) * 1000
+
+    def needs_hiding_spot(self, enemy: Robot, game_map: Map) -> bool:
+        """Whether the hiding spot of a hiding enemy has to be planned (again)"""
+        if enemy not in self.hiding_spots:
+            return True  # not planned since the enemy lost its goal
+        spot = self.hiding_spots[enemy]
+        if spot is None:
+            return False  # no bush area large enough, go_hide searches itself
+        x, y = spot
+        return game_map.get_tile_type(
+            int(x // config.TILE_SIZE), int(y // config.TILE_SIZE)
+        ) != "bush"
+
+    def publish(self, ticks: int, game_map: Map, robots: list[Robot]) -> None:
+        """Send a snapshot with the due and the hiding enemies to the workers"""
+        decide = list(self.queue)
+        self.queue.clear()
+        self.queued.clear()
+        for enemy in decide:
+            self.schedule_next(enemy, ticks)
+        deciding = set(decide)
+        hide = [
+            enemy
+            for enemy, goal in self.goals.items()
+            if goal is None
+            and enemy not in deciding
+            and self.needs_hiding_spot(enemy, game_map)
+        ]
+        if not decide and not hide:
+            return
+        self.next_publish = ticks + config.AI_PUBLISH_INTERVAL_MS
+
+        snapshot = WorldSnapshot(
+            ticks,
+            tuple(
+                RobotState(id(robot), robot.x, robot.y, robot.hitbox_radius, robot.hp)
+                for robot in robots
+            ),
+        )
+        self.pending_robots = {id(robot): robot for robot in robots}
+        self.pending_ticks = ticks
+        self.plans += 1
+        jobs = [
+            (decide[worker::self.workers], hide[worker::self.workers])
+            for worker in range(self.workers)
+        ]
+        jobs = [job for job in jobs if job[0] or job[1]]
+        for i, (job_decide, job_hide) in enumerate(jobs):
+            try:
+                future = self.executor.submit(
+                    plan,
+                    self.map_source,
+                    snapshot,
+                    [id(enemy) for enemy in job_decide],
+                    [id(enemy) for enemy in job_hide],
+                    random.getrandbits(32),
+                )
+            except RuntimeError as error:  # the pool broke (BrokenProcessPool)
+                for job in jobs[i:]:
+                    self.plan_failed(error, job, game_map, robots)
+                self.stop_planning()
+                return
+            self.pending[future] = (job_decide, job_hide)
+
+    def apply_intents(self, ticks: int, game_map: Map, robots: list[Robot]) -> None:
+        """Take over the intents of finished jobs"""
+        if not self.pending:
+            return
+        alive = set(robots)
+        for future in [future for future in self.pending if future.done()]:
+            job = self.pending.pop(future)
+            try:
+                intents = future.result()
+            except Exception as error:  # the job raised or a worker died
+                self.plan_failed(error, job, game_map, robots)
+                if isinstance(error, BrokenProcessPool):
+                    self.stop_planning()
+                continue
+            for intent in intents:
+                enemy = self.pending_robots[intent.robot_id]
+                if enemy not in self.next_decision:
+                    continue  # removed while planning
+                if intent.decided:
+                    goal = self.pending_robots.get(intent.goal_id)
+                    self.goals[enemy] = goal if goal in alive else None
+                    self.decisions += 1
+                if self.goals[enemy] is None:
+                    self.hiding_spots[enemy] = intent.hiding_spot
+                else:
+                    self.hiding_spots.pop(enemy, None)  # planned again when it hides
+        if not self.pending:
+            self.latency_ms = ticks - self.pending_ticks
+
+    def plan_failed(
+        self,
+        error: BaseException,
+        job: tuple[list[Robot], list[Robot]],
+        game_map: Map,
+        robots: list[Robot],
+    ) -> None:
+        """Decide the enemies of a failed job on the main thread (like AIScheduler)"""
+        if not self.failed_plans:  # only once, a broken plan may fail every tick
+            print(f"Warning: enemy planning failed ({error!r}), deciding on the main "
+                  "thread.")
+        self.failed_plans += 1
+        decide, hide = job
+        for enemy in decide:
+            if enemy in self.next_decision:  # not removed while planning
+                self.decide(enemy, game_map, robots)
+        for enemy in decide + hide:
+            self.hiding_spots.pop(enemy, None)  # go_hide searches it itself
+
+    def stop_planning(self) -> None:
+        """The pool broke: enemies of this and later matches decide on the main
+        thread"""
+        self.executor = None
+        stop_workers()
+
+    def close(self) -> None:
+        """Drop the jobs of the match (the workers are kept for the next one)"""
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+
+    def stats(self) -> dict[str, float]:
+        stats = super().stats()
+        stats["plans"] = self.plans
+        stats["latency_ms"] = self.latency_ms
+        stats["failed_plans"] = self.failed_plans
+        return stats
+
+
+def create_ai(game_map: Map) -> AIScheduler:
+    """Planner with worker processes if they were started, else the main thread"""
+    if executor is not None:
+        return AIPlanner(game_map)
+    return AIScheduler()
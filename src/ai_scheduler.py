@@ -0,0 +1,126 @@
+import time
+from collections import deque
+import config
+from map import Map
+from robot import Robot
+
+
+class AIScheduler:
+    def __init__(
+        self,
+        interval_ms: int = config.AI_DECISION_INTERVAL_MS,
+        budget_ms: float = config.AI_FRAME_BUDGET_MS,
+    ):
+        """Spreads the goal decisions of the enemies over the frames.
+
+        Every enemy picks a new goal every interval_ms, but the enemies are
+        staggered (phases spread over the interval) instead of all deciding in
+        the same frame. Decisions that are due wait in a queue, update() works
+        on the queue until the time budget of the frame is used up.
+        """
+        self.interval_ms = interval_ms
+        self.budget_ms = budget_ms
+        self.goals: dict[Robot, Robot | None] = {}  # enemy -> current goal
+        # enemy -> planned hiding spot (None: go_hide searches it itself)
+        self.hiding_spots: dict[Robot, tuple[float, float] | None] = {}
+        self.next_decision: dict[Robot, int] = {}  # enemy -> ticks of next decision
+        self.queue: deque[Robot] = deque()  # enemies waiting for a decision
+        self.queued: set[Robot] = set()  # enemies in the queue
+
+        # statistics
+        self.decisions = 0  # number of decisions made
+        self.overruns = 0  # frames in which the decisions took longer than the budget
+        self.max_queue_depth = 0
+        self.last_frame_ms = 0.0  # time spent on decisions in the last frame
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of enemies waiting for a decision"""
+        return len(self.queue)
+
+    def start(self, enemies: list[Robot], ticks: int) -> None:
+        """All enemies decide at once, the following decisions are staggered"""
+        for i, enemy in enumerate(enemies):
+            # the first decision adds one interval, so the second one is at the phase
+            phase = self.interval_ms * (i + 1) // len(enemies)
+            self.next_decision[enemy] = ticks + phase - self.interval_ms
+            self.goals[enemy] = None
+            self.enqueue(enemy)
+
+    def enqueue(self, enemy: Robot, first: bool = False) -> None:
+        """Add an enemy to the queue (once)"""
+        if enemy in self.queued:
+            return
+        self.queued.add(enemy)
+        if first:
+            self.queue.appendleft(enemy)
+        else:
+            self.queue.append(enemy)
+
+    def remove(self, robot: Robot) -> None:
+        """Forget a removed robot, enemies chasing it decide again"""
+        self.next_decision.pop(robot, None)
+        self.goals.pop(robot, None)
+        self.hiding_spots.pop(robot, None)
+        if robot in self.queued:
+            self.queued.discard(robot)
+            self.queue.remove(robot)
+        for enemy, goal in self.goals.items():
+            if goal is robot:
+                self.goals[enemy] = None
+                self.enqueue(enemy, first=True)
+
+    def queue_due(self, ticks: int) -> None:
+        """Queue the enemies whose next decision is due"""
+        for enemy, next_ticks in self.next_decision.items():
+            if next_ticks <= ticks:
+                self.enqueue(enemy)
+        self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+
+    def schedule_next(self, enemy: Robot, ticks: int) -> None:
+        """Set the next decision of an enemy after it decided"""
+        # keep the phase of the enemy, skip missed decisions (e.g. after pause)
+        next_ticks = self.next_decision[enemy] + self.interval_ms
+        if next_ticks <= ticks:
+            missed = (ticks - next_ticks) // self.interval_ms + 1
+            next_ticks += missed * self.interval_ms
+        self.next_decision[enemy] = next_ticks
+
+    def decide(self, enemy: Robot, game_map: Map, robots: list[Robot]) -> None:
+        """Choose a new goal for an enemy (on the main thread)"""
+        self.goals[enemy] = enemy.get_robot_with_distance_prob(game_map, robots)
+        self.decisions += 1
+
+    def update(self, ticks: int, game_map: Map, robots: list[Robot]) -> None:
+        """Queue the enemies that are due and decide within the time budget"""
+        self.queue_due(ticks)
+
+        start = time.perf_counter()
+        elapsed_ms = 0.0
+        # at least one decision per frame, so the queue always gets shorter
+        while self.queue:
+            enemy = self.queue.popleft()
+            self.queued.discard(enemy)
+            self.decide(enemy, game_map, robots)
+            self.schedule_next(enemy, ticks)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= self.budget_ms:
+                break
+
+        if elapsed_ms > self.budget_ms:
+            self.overruns += 1
+        self.last_frame_ms = elapsed_ms
+
+    def close(self) -> None:
+        """Nothing to stop, decisions are made on the main thread"""
+
+    def stats(self) -> dict[str, float]:
+        """Counters for debugging and benchmarks"""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "decisions": self.decisions,
+            "overruns": self.overruns,
+            "last_frame_ms": self.last_frame_ms,
+        }
@@ -0,0 +1,147 @@
+import config
+from camera import Camera
+from positional_audio import ChannelPool, audibility_radius, stereo_volume
+from sounds import Sounds
+
+# higher priority wins when there are more sounds than voices in a frame
+SOUND_PRIORITIES: dict[str, int] = {
+    "gameover_sound": 10,
+    "win_sound": 10,
+    "countdown_sound": 9,
+    "player_hit_sound": 8,
+    "lava_sound": 7,
+    "shot_sound": 6,
+    "wall_hit_sound": 5,
+    "ice_sound": 4,
+    "drive_sound": 3,
+    "spider_sound": 3,
+    "sand_sound": 2,
+    "bush_sound": 2,
+}
+
+# loops are started once when their state changes (on their own channels), a
+# dropped start would keep them silent, so the voice limit does not apply to them
+LOOP_SOUNDS: set[str] = {"drive_sound", "spider_sound", "sand_sound", "bush_sound"}
+
+
+class AudioQueue:
+    def __init__(
+        self,
+        sounds: Sounds,
+        camera: Camera | None = None,
+        max_voices: int = config.AUDIO_MAX_VOICES,
+    ):
+        """Collects the sounds of a frame and plays them at once.
+
+        Robots call play_sound and stop_loop like on Sounds, but the calls only
+        record the action. flush() (once per frame) drops duplicates, starts the
+        loops, plays the max_voices other sounds with the highest priority and
+        drops the rest, so the mixer calls per frame do not grow with the number
+        of robots.
+
+        Sounds with a position (play_at) are attenuated and panned relative to
+        the camera and play on a ChannelPool; inaudible ones are dropped at once.
+        """
+        self.sounds = sounds
+        self.camera = camera
+        self.max_voices = max_voices
+        self.pool = ChannelPool()
+        self.plays: set[str] = set()  # sounds to play in this frame
+        self.stops: set[str] = set()  # loops to stop in this frame
+        # sound -> (squared distance to the camera center, x, y) of its nearest
+        # emitter in this frame
+        self.positional: dict[str, tuple[float, float, float]] = {}
+
+        # statistics
+        self.events = 0  # number of play and stop calls
+        self.duplicates = 0  # calls for a sound that was already queued
+        self.culled = 0  # positional sounds outside of the audibility radius
+        self.dropped = 0  # sounds dropped because of the voice limit
+        self.mixer_calls = 0  # sounds played and loops stopped
+
+    def play_sound(self, action: str) -> None:
+        self.events += 1
+        if action in self.plays:
+            self.duplicates += 1
+            return
+        self.plays.add(action)
+        self.stops.discard(action)  # the last call of a frame counts
+
+    def stop_loop(self, action: str) -> None:
+        self.events += 1
+        if action in self.stops:
+            self.duplicates += 1
+            return
+        self.stops.add(action)
+        self.plays.discard(action)
+
+    def play_at(self, action: str, x: float, y: float) -> None:
+        """Queue a sound of an emitter at (x, y) (world coordinates)"""
+        if self.camera is None:
+            self.play_sound(action)
+            return
+        self.events += 1
+        dx = x - self.camera.center_x
+        dy = y - self.camera.center_y
+        distance_sq = dx * dx + dy * dy
+        radius = audibility_radius(self.camera)
+        if distance_sq >= radius * radius:
+            self.culled += 1
+            return
+        nearest = self.positional.get(action)
+        if nearest is not None:
+            self.duplicates += 1
+            if distance_sq >= nearest[0]:
+                return
+        self.positional[action] = (distance_sq, x, y)
+
+    def flush(self) -> None:
+        """Stop and play the queued sounds (called once per frame)"""
+        for action in self.stops:
+            self.sounds.stop_loop(action)
+        self.mixer_calls += len(self.stops)
+
+        loops = self.plays & LOOP_SOUNDS
+        for action in loops:
+            self.sounds.play_sound(action)
+        self.mixer_calls += len(loops)
+
+        # (priority, sound, volume), louder positional sounds are more important
+        plays = [
+            (SOUND_PRIORITIES.get(action, 0), action, None)
+            for action in self.plays - loops
+        ]
+        for action, (_, x, y) in self.positional.items():
+            volume = stereo_volume(self.camera, x, y)
+            plays.append((SOUND_PRIORITIES.get(action, 0) + max(volume), action, volume))
+        plays.sort(key=lambda play: -play[0])
+        for priority, action, volume in plays[:self.max_voices]:
+            if volume is None:
+                self.sounds.play_sound(action)
+            else:
+                self.pool.play(self.sounds.sounds[action], priority, *volume)
+        self.mixer_calls += min(len(plays), self.max_voices)
+        self.dropped += max(0, len(plays) - self.max_voices)
+
+        self.plays.clear()
+        self.stops.clear()
+        self.positional.clear()
+
+    def stop_all_sounds(self) -> None:
+        self.plays.clear()
+        self.stops.clear()
+        self.positional.clear()
+        self.pool.stop()
+        self.sounds.stop_all_sounds()
+
+    def stats(self) -> dict[str, int]:
+        """Counters for debugging and benchmarks"""
+        return {
+            "events": self.events,
+            "duplicates": self.duplicates,
+            "culled": self.culled,
+            "dropped": self.dropped,
+            "stolen": self.pool.stolen,
+            "pool_dropped": self.pool.dropped,
+            "mixer_calls": self.mixer_calls,
+        }
@@ -0,0 +1,456 @@
+"""
+Mass battle: the state of many robots stored as component arrays.
+
+Instead of one Robot object per robot (with its own lists and sounds), every
+component (position, angle, speed, hp, power, team, type, ...) is one array
+and robot i is index i in all of them. The systems (player input, targeting,
+steering and movement, terrain effects, shooting, bullets and damage) each run
+one loop over the arrays. RobotView offers the Robot attributes of one index,
+so the RobotRenderer, the camera and the player controls work with it.
+"""
+
+import math
+import random
+from array import array
+import pygame
+import config
+from map import EFFECT_COVER, EFFECT_HAZARD, Map, TILE_CODES, combine_effects
+from robot import TERRAIN_SPEED_TABLE, get_hitbox_rect, recharge_rate
+from spawn_service import get_spawn_service
+from steering import steer
+
+ROBOT_TYPES: list[str] = ["Spider", "Tank"]
+PLAYER: int = 0  # index of the player robot
+
+WALL = TILE_CODES["wall"]
+LAVA = TILE_CODES["lava"]
+BUSH = TILE_CODES["bush"]
+
+TARGET_INTERVAL: int = 30  # frames between two target choices of a robot
+TARGET_SAMPLES: int = 12  # random robots compared when choosing a target
+SHOT_BREAK_MS: int = 2000  # min duration of break between shots
+SHOT_POWER: float = 20  # power needed (and used) for a shot
+LAVA_DAMAGE: float = 40
+BULLET_DAMAGE: float = 15
+BULLET_RADIUS: int = 7
+BULLET_SPEED: float = 20
+BULLET_REACH: float = 800
+BULLET_COLOR: tuple[int, int, int] = (0, 0, 0)
+
+
+class BattleWorld:
+    def __init__(self, game_map: Map):
+        """Component arrays of all robots and bullets of a mass battle"""
+        self.game_map = game_map
+        self.count = 0  # number of robots (dead ones keep their index)
+        self.frame = 0
+
+        # robot components, robot i is index i
+        self.x = array("d")
+        self.y = array("d")
+        self.alpha = array("d")  # direction in degree
+        self.speed = array("d")  # speed for moving
+        self.speed_alpha = array("d")  # speed for turning
+        self.v = array("d")  # current speed for moving (terrain effects)
+        self.v_alpha = array("d")  # current speed for turning
+        self.hp = array("d")
+        self.power = array("d")
+        self.team = array("b")
+        self.robot_type = array("b")  # index in ROBOT_TYPES
+        self.hitbox_radius = array("i")
+        self.last_shot_time = array("q")
+        self.target = array("i")  # index of the robot to attack, -1: none
+        self.alive = bytearray()
+        self.moving = bytearray()
+        self.in_bush = bytearray()  # touches a bush
+        self.hidden = bytearray()  # only touches bushes (can not be targeted)
+
+        # bullet components
+        self.bullet_x = array("d")
+        self.bullet_y = array("d")
+        self.bullet_dx = array("d")  # movement per frame
+        self.bullet_dy = array("d")
+        self.bullet_reach = array("d")
+        self.bullet_team = array("b")
+
+        self.views: list[RobotView] = []
+
+    def add_robot(
+        self,
+        x: float,
+        y: float,
+        hitbox_radius: int,
+        team: int,
+        robot_type: str,
+        speed: float,
+        speed_alpha: float,
+    ) -> int:
+        """Add a robot and return its index"""
+        self.x.append(x)
+        self.y.append(y)
+        self.alpha.append(random.uniform(0, 360))
+        self.speed.append(speed)
+        self.speed_alpha.append(speed_alpha)
+        self.v.append(speed)
+        self.v_alpha.append(speed_alpha)
+        self.hp.append(100)
+        self.power.append(100)
+        self.team.append(team)
+        self.robot_type.append(ROBOT_TYPES.index(robot_type))
+        self.hitbox_radius.append(hitbox_radius)
+        self.last_shot_time.append(100)
+        self.target.append(-1)
+        self.alive.append(1)
+        self.moving.append(0)
+        self.in_bush.append(0)
+        self.hidden.append(0)
+        self.views.append(RobotView(self, self.count))
+        self.count += 1
+        return self.count - 1
+
+    def spawn_robots(
+        self, count: int, teams: int, hitbox_radius: int, speed: float, speed_alpha: float
+    ) -> None:
+        """
+        Add count robots on random spawn positions, robot 0 is the player
+        Raises NoSpawnPositionError if the map has no valid spawn position
+        """
+        candidates = get_spawn_service(self.game_map).required_candidates(
+            get_hitbox_rect(0, 0, hitbox_radius)
+        )
+        if len(candidates) >= count:
+            positions = random.sample(candidates, count)
+        else:
+            positions = random.choices(candidates, k=count)
+        for i, (x, y) in enumerate(positions):
+            self.add_robot(
+                x,
+                y,
+                hitbox_radius,
+                i % teams,
+                ROBOT_TYPES[(i // teams) % len(ROBOT_TYPES)],
+                speed,
+                speed_alpha,
+            )
+
+    def footprint(self, x: float, y: float, radius: int) -> bytes | None:
+        """Tile codes touched by a hitbox at (x, y), None if it leaves the map"""
+        tile_size = config.TILE_SIZE
+        left = int(x - radius * 0.4)
+        top = int(y - radius * 0.35)
+        size = int(radius * 0.75)
+        first_x = left // tile_size
+        last_x = (left + size - 1) // tile_size
+        first_y = top // tile_size
+        last_y = (top + size - 1) // tile_size
+        cols = self.game_map.cols
+        if first_x < 0 or first_y < 0 or last_x >= cols or last_y >= self.game_map.rows:
+            return None
+        tiles = self.game_map.tiles
+        return b"".join(
+            tiles[row * cols + first_x:row * cols + last_x + 1]
+            for row in range(first_y, last_y + 1)
+        )
+
+    def teams_alive(self) -> set[int]:
+        return {self.team[i] for i in range(self.count) if self.alive[i]}
+
+    def robots_in_rect(self, rect: pygame.Rect) -> list["RobotView"]:
+        """Views of the living robots whose center is inside rect (world pixels)"""
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        x, y, alive = self.x, self.y, self.alive
+        return [
+            self.views[i]
+            for i in range(self.count)
+            if alive[i] and left <= x[i] < right and top <= y[i] < bottom
+        ]
+
+    def bullets_in_rect(self, rect: pygame.Rect) -> list[tuple[float, float]]:
+        """Positions of the bullets inside rect (world pixels)"""
+        return [
+            (x, y)
+            for x, y in zip(self.bullet_x, self.bullet_y)
+            if rect.collidepoint(x, y)
+        ]
+
+
+def component_property(name: str) -> property:
+    """Property reading and writing the component array name of the world"""
+
+    def get_value(view):
+        return getattr(view.world, name)[view.index]
+
+    def set_value(view, value):
+        getattr(view.world, name)[view.index] = value
+
+    return property(get_value, set_value)
+
+
+class RobotView:
+    """The Robot attributes of one robot of a BattleWorld"""
+
+    def __init__(self, world: BattleWorld, index: int):
+        self.world = world
+        self.index = index
+        self.is_player = index == PLAYER
+
+    x = component_property("x")
+    y = component_property("y")
+    alpha = component_property("alpha")
+    hp = component_property("hp")
+    power = component_property("power")
+    hitbox_radius = component_property("hitbox_radius")
+    last_shot_time = component_property("last_shot_time")
+    team = component_property("team")
+
+    @property
+    def robot_type(self) -> str:
+        return ROBOT_TYPES[self.world.robot_type[self.index]]
+
+    @property
+    def alive(self) -> bool:
+        return bool(self.world.alive[self.index])
+
+    @property
+    def moving(self) -> bool:
+        return bool(self.world.moving[self.index])
+
+    @property
+    def in_bush(self) -> bool:
+        return bool(self.world.in_bush[self.index])
+
+    @property
+    def bush_tiles(self) -> list[tuple[int, int]]:
+        """Bush tiles touched by the robot (computed when needed)"""
+        hitbox = self.get_hitbox()
+        game_map = self.world.game_map
+        return [
+            (i, j)
+            for i in range(hitbox.left // config.TILE_SIZE,
+                           (hitbox.right - 1) // config.TILE_SIZE + 1)
+            for j in range(hitbox.top // config.TILE_SIZE,
+                           (hitbox.bottom - 1) // config.TILE_SIZE + 1)
+            if game_map.get_tile_type(i, j) == "bush"
+        ]
+
+    def get_hitbox(self) -> pygame.Rect:
+        return get_hitbox_rect(self.x, self.y, self.hitbox_radius)
+
+
+def move(world: BattleWorld, i: int, dx: float, dy: float, avoid_lava: bool) -> bytes:
+    """
+    Move robot i if the hitbox does not touch a wall (and lava if avoid_lava),
+    otherwise only in x or only in y direction (slide along walls).
+    Returns the tile codes touched at the new position.
+    """
+    x = world.x[i]
+    y = world.y[i]
+    radius = world.hitbox_radius[i]
+    for new_x, new_y in ((x + dx, y + dy), (x + dx, y), (x, y + dy)):
+        codes = world.footprint(new_x, new_y, radius)
+        if codes is None or WALL in codes or (avoid_lava and LAVA in codes):
+            continue
+        world.x[i] = new_x
+        world.y[i] = new_y
+        return codes
+    return world.footprint(x, y, radius) or b""
+
+
+def fire(world: BattleWorld, i: int, ticks: int) -> None:
+    """Shoot a bullet in the direction of robot i if there is time and power"""
+    if ticks - world.last_shot_time[i] < SHOT_BREAK_MS or world.power[i] <= SHOT_POWER:
+        return
+    alpha_rad = math.radians(world.alpha[i])
+    offset = world.hitbox_radius[i] * 0.2  # start the bullet closer to center
+    world.bullet_x.append(world.x[i] + offset * math.cos(alpha_rad))
+    world.bullet_y.append(world.y[i] + offset * math.sin(alpha_rad))
+    world.bullet_dx.append(BULLET_SPEED * math.cos(alpha_rad))
+    world.bullet_dy.append(BULLET_SPEED * math.sin(alpha_rad))
+    world.bullet_reach.append(BULLET_REACH)
+    world.bullet_team.append(world.team[i])
+    world.last_shot_time[i] = ticks
+    world.power[i] -= SHOT_POWER
+
+
+def player_system(world: BattleWorld, keys, ticks: int) -> bytes:
+    """Moves the player like Robot.update_player"""
+    v = world.v[PLAYER]
+    dx = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * v
+    dy = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * v
+    turn = (keys[pygame.K_d] - keys[pygame.K_a]) * world.v_alpha[PLAYER]
+    world.alpha[PLAYER] = (world.alpha[PLAYER] + turn) % 360
+    world.moving[PLAYER] = bool(
+        dx or dy or keys[pygame.K_a] or keys[pygame.K_d]
+    )
+    if keys[pygame.K_s]:
+        fire(world, PLAYER, ticks)
+    return move(world, PLAYER, dx, dy, avoid_lava=False)
+
+
+def targeting_system(world: BattleWorld) -> None:
+    """
+    Every TARGET_INTERVAL frames (staggered over the robots) or if the target
+    died or hid, a robot attacks the nearest of some random enemies
+    """
+    count = world.count
+    x, y, team, alive, hidden, target = (
+        world.x, world.y, world.team, world.alive, world.hidden, world.target
+    )
+    for i in range(count):
+        if not alive[i] or i == PLAYER:
+            continue
+        current = target[i]
+        valid = current >= 0 and alive[current] and not hidden[current]
+        if valid and (world.frame + i) % TARGET_INTERVAL:
+            continue
+
+        best = current if valid else -1
+        best_dist = (x[best] - x[i]) ** 2 + (y[best] - y[i]) ** 2 if valid else math.inf
+        for other in random.sample(range(count), min(TARGET_SAMPLES, count)):
+            if team[other] == team[i] or not alive[other] or hidden[other]:
+                continue
+            dist = (x[other] - x[i]) ** 2 + (y[other] - y[i]) ** 2
+            if dist < best_dist:
+                best = other
+                best_dist = dist
+        target[i] = best
+
+
+def steering_system(world: BattleWorld, ticks: int) -> list[bytes]:
+    """
+    Enemies move and turn towards their target (like Robot.update_enemy)
+    and shoot if it is in front of them. Returns the touched tile codes.
+    """
+    codes_of: list[bytes] = [b""] * world.count
+    x, y, alpha, v, v_alpha, target, alive = (
+        world.x, world.y, world.alpha, world.v, world.v_alpha, world.target, world.alive
+    )
+    for i in range(world.count):
+        if not alive[i] or i == PLAYER:
+            continue
+        goal = target[i]
+        if goal < 0:
+            world.moving[i] = 0
+            codes_of[i] = world.footprint(x[i], y[i], world.hitbox_radius[i]) or b""
+            continue
+
+        # Move towards the target and turn to face it
+        dx, dy, alpha[i], aimed = steer(
+            x[goal] - x[i], y[goal] - y[i], alpha[i], v[i], v_alpha[i]
+        )
+        codes_of[i] = move(world, i, dx, dy, avoid_lava=True)
+        world.moving[i] = 1
+
+        # shoot if angle to target is under 10°
+        if aimed:
+            fire(world, i, ticks)
+    return codes_of
+
+
+def terrain_system(world: BattleWorld, codes_of: list[bytes]) -> None:
+    """Effects of the touched tiles (like Robot.map_effects) and power recharge"""
+    candidates = None
+    for i, codes in enumerate(codes_of):
+        if not world.alive[i]:
+            continue
+        effects = combine_effects(codes)
+        factor, _ = TERRAIN_SPEED_TABLE[effects]  # no terrain sounds in the battle
+        if factor is not None:
+            world.v[i] = world.speed[i] * factor
+            world.v_alpha[i] = world.speed_alpha[i] * factor
+
+        if effects & EFFECT_HAZARD:
+            world.hp[i] -= LAVA_DAMAGE
+            if candidates is None:
+                candidates = get_spawn_service(world.game_map).candidates(
+                    get_hitbox_rect(0, 0, world.hitbox_radius[i])
+                )
+            if candidates:  # otherwise the robot stays
+                world.x[i], world.y[i] = random.choice(candidates)
+
+        world.in_bush[i] = bool(effects & EFFECT_COVER)
+        world.hidden[i] = bool(codes) and codes.count(BUSH) == len(codes)
+        if world.power[i] < 100:
+            world.power[i] += recharge_rate
+
+
+def hit_robot(
+    world: BattleWorld,
+    cells: dict[tuple[int, int], list[int]],
+    cell_size: int,
+    x: float,
+    y: float,
+    team: int,
+) -> bool:
+    """Damages the first robot of another team touched by a bullet at (x, y)"""
+    cell_x = int(x // cell_size)
+    cell_y = int(y // cell_size)
+    for key in ((cell_x + i, cell_y + j) for i in (-1, 0, 1) for j in (-1, 0, 1)):
+        for i in cells.get(key, ()):
+            if world.team[i] == team or not world.alive[i]:
+                continue
+            max_dist = BULLET_RADIUS + world.hitbox_radius[i] * 0.35
+            if (world.x[i] - x) ** 2 + (world.y[i] - y) ** 2 < max_dist**2:
+                world.hp[i] -= BULLET_DAMAGE
+                if world.hp[i] <= 0:
+                    world.alive[i] = 0
+                return True
+    return False
+
+
+def bullet_system(world: BattleWorld) -> None:
+    """Bullets hitting a robot of another team damage it, the others move on"""
+    # robots sorted into cells, a bullet only checks the cells around it
+    cell_size = 2 * config.TILE_SIZE
+    cells: dict[tuple[int, int], list[int]] = {}
+    for i in range(world.count):
+        if world.alive[i]:
+            key = (int(world.x[i] // cell_size), int(world.y[i] // cell_size))
+            cells.setdefault(key, []).append(i)
+
+    trace_segment = world.game_map.trace_segment
+    width = world.game_map.cols * config.TILE_SIZE
+    height = world.game_map.rows * config.TILE_SIZE
+    keep = []
+    for b in range(len(world.bullet_x)):
+        # hit test before moving, so that a robot next to the shooter is hit too
+        if hit_robot(world, cells, cell_size, world.bullet_x[b], world.bullet_y[b],
+                     world.bullet_team[b]):
+            continue
+
+        x = world.bullet_x[b]
+        y = world.bullet_y[b]
+        bx = x + world.bullet_dx[b]
+        by = y + world.bullet_dy[b]
+        world.bullet_x[b] = bx
+        world.bullet_y[b] = by
+        world.bullet_reach[b] -= BULLET_SPEED
+
+        # stop bullet outside of the map, at the first wall on its way or at the
+        # end of its reach
+        if not (0 <= bx < width and 0 <= by < height):
+            continue
+        if trace_segment(x, y, bx, by, WALL) is not None:
+            continue
+        if world.bullet_reach[b] > 0:
+            keep.append(b)
+
+    if len(keep) != len(world.bullet_x):
+        for name in ("bullet_x", "bullet_y", "bullet_dx", "bullet_dy", "bullet_reach",
+                     "bullet_team"):
+            column = getattr(world, name)
+            setattr(world, name, array(column.typecode, (column[b] for b in keep)))
+
+
+def step(world: BattleWorld, ticks: int, keys=None) -> None:
+    """Runs all systems for one frame (keys: pressed keys of the player)"""
+    world.frame += 1
+    targeting_system(world)
+    codes_of = steering_system(world, ticks)
+    if keys is not None and world.alive[PLAYER]:
+        codes_of[PLAYER] = player_system(world, keys, ticks)
+    terrain_system(world, codes_of)
+    bullet_system(world)
+    for i in range(world.count):
+        if world.alive[i] and world.hp[i] <= 0:
+            world.alive[i] = 0
@@ -0,0 +1,760 @@
+"""
+Headless benchmark suite for the hot paths of the game.
+
+Run from the src directory (resources are loaded relative to it):
+
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --threshold 0.15
+
+Every case is parameterized by robot count, bullet count and map size.
+Results are written as JSON and can be compared against a stored baseline,
+a case is flagged as regression if its median time grows beyond the threshold.
+"""
+
+import os
+
+# Run without a window and without a sound device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse  # noqa: E402
+import itertools  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+import tracemalloc  # noqa: E402
+from typing import Callable  # noqa: E402
+
+import pygame  # noqa: E402
+from ai_planner import AIPlanner, start_workers  # noqa: E402
+
+start_workers()  # forked before SDL starts its threads (ai_planner_update)
+pygame.init()
+screen: pygame.Surface = pygame.display.set_mode((960, 540))
+
+import config  # noqa: E402
+from map import Map  # noqa: E402
+from map_renderer import MapRenderer  # noqa: E402
+from map_compiler import load_map, loaded_maps  # noqa: E402
+from robot import BULLET_REACH, Robot, visible_robots  # noqa: E402
+from bullet import Bullet  # noqa: E402
+from camera import Camera  # noqa: E402
+from robot_renderer import RobotRenderer  # noqa: E402
+from ai_scheduler import AIScheduler  # noqa: E402
+from texture_renderer import (  # noqa: E402
+    TextureBackend,
+    TextureMapRenderer,
+    TextureRobotRenderer,
+)
+from sounds import Sounds  # noqa: E402
+from audio_queue import AudioQueue  # noqa: E402
+from simulation_lod import SimulationLOD  # noqa: E402
+from battle_world import (  # noqa: E402
+    BattleWorld,
+    step,
+    steering_system,
+    targeting_system,
+)
+from spatial_hash import SpatialHash  # noqa: E402
+from steering import facing  # noqa: E402
+
+# Parameters of the benchmark cases
+ENTITY_COUNTS: list[int] = [4, 50, 500]  # robot and bullet counts
+MAP_SIZES: list[tuple[int, int]] = [(config.COLUMNS, config.ROWS), (128, 128)]
+LARGE_MAP_SIZES: list[tuple[int, int]] = [(1024, 1024), (4096, 4096)]  # parsing only
+ZOOM_LEVELS: list[float] = [0.6, 1.0, 1.5]
+RENDER_BACKENDS: list[str] = ["surface", "texture"]
+SIMULATION_MODES: list[str] = ["full", "lod"]  # enemies with or without simulation LOD
+CROWDS: list[tuple[int, int]] = [(10, 100), (100, 1000), (1000, 10000)]  # robots, bullets
+BROADPHASES: list[str] = ["scan", "grid"]  # all pairs or spatial hash
+ENEMY_COUNTS: list[int] = [10, 100, 1000]
+BENCH_TILE_SIZE: int = 32
+LEVEL_CHARS = "gggggwlisb"  # ground is more likely than the other tiles
+
+# case name -> (parameter names, factory returning the function to time,
+#               whether the peak memory of one run is measured)
+CASES: dict[str, tuple[list[str], Callable[..., Callable[[], None]], bool]] = {}
+
+
+def case(*param_names: str, memory: bool = False):
+    """Register a benchmark case with the parameters it depends on"""
+
+    def register(factory: Callable[..., Callable[[], None]]):
+        CASES[factory.__name__] = (list(param_names), factory, memory)
+        return factory
+
+    return register
+
+
+def param_values(name: str) -> list:
+    """Return all values of a benchmark parameter"""
+    if name in ("robots", "bullets"):
+        return ENTITY_COUNTS
+    if name == "map_size":
+        return MAP_SIZES
+    if name == "large_map_size":
+        return LARGE_MAP_SIZES
+    if name == "zoom":
+        return ZOOM_LEVELS
+    if name == "backend":
+        return RENDER_BACKENDS
+    if name == "simulation":
+        return SIMULATION_MODES
+    if name == "crowd":
+        return CROWDS
+    if name == "broadphase":
+        return BROADPHASES
+    if name == "enemies":
+        return ENEMY_COUNTS
+    raise KeyError(name)
+
+
+def write_level(cols: int, rows: int, seed: int = 1) -> str:
+    """Write a random level file for a map of the given size (including border)"""
+    rng = random.Random(seed)
+    file = tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", delete=False, encoding="utf-8"
+    )
+    with file:
+        for _ in range(rows - 2):
+            file.write("".join(rng.choices(LEVEL_CHARS, k=cols - 2)))
+            file.write("\n")
+    return file.name
+
+
+_levels: dict[tuple[int, int], str] = {}
+
+
+def level_file(map_size: tuple[int, int]) -> str:
+    """Return a (cached) random level file for the map size"""
+    if map_size not in _levels:
+        _levels[map_size] = write_level(*map_size)
+    return _levels[map_size]
+
+
+def make_map(map_size: tuple[int, int]) -> Map:
+    return Map(level_file(map_size))
+
+
+def make_camera(game_map: Map, zoom: float = 1.0) -> Camera:
+    camera = Camera(
+        screen.get_width(),
+        screen.get_height(),
+        game_map.cols * config.TILE_SIZE,
+        game_map.rows * config.TILE_SIZE,
+    )
+    camera.zoom = zoom
+    return camera
+
+
+def make_robots(game_map: Map, camera: Camera, count: int) -> list[Robot]:
+    """Place robots on random non-wall tiles of the map"""
+    rng = random.Random(count)
+    free_tiles = [
+        (x, y)
+        for y in range(1, game_map.rows - 1)
+        for x in range(1, game_map.cols - 1)
+        if game_map.get_tile_type(x, y) not in ("wall", "lava")
+    ]
+    sounds = Sounds()  # loading the sounds once per robot would dominate the setup
+    robots = []
+    for i in range(count):
+        x, y = game_map.tile_to_pixel(*rng.choice(free_tiles))
+        robots.append(
+            Robot(
+                camera.surface,
+                x,
+                y,
+                int(config.TILE_SIZE * 1.3),
+                rng.randrange(360),
+                (255, 255, 255),
+                4,
+                6,
+                i == 0,
+                rng.choice(["Spider", "Tank"]),
+                sounds,
+            )
+        )
+    return robots
+
+
+texture_backend: TextureBackend | None = None
+
+
+def get_texture_backend() -> TextureBackend:
+    """SDL2 texture backend with the software renderer (created once)"""
+    global texture_backend
+    if texture_backend is None:
+        config.TEXTURE_ACCELERATED = 0
+        texture_backend = TextureBackend("benchmark", screen.get_size())
+    return texture_backend
+
+
+def make_bullets(
+    game_map: Map, robots: list[Robot], count: int, seed: int = 0
+) -> list[Bullet]:
+    """Create bullets at random positions inside the map"""
+    rng = random.Random(seed)
+    width = game_map.cols * config.TILE_SIZE
+    height = game_map.rows * config.TILE_SIZE
+    return [
+        Bullet(
+            rng.randrange(config.TILE_SIZE, width - config.TILE_SIZE),
+            rng.randrange(config.TILE_SIZE, height - config.TILE_SIZE),
+            rng.randrange(360),
+            7,
+            (0, 0, 0),
+            robots[i % len(robots)] if robots else None,
+            20,
+            800,
+        )
+        for i in range(count)
+    ]
+
+
+@case("map_size")
+def map_parse(map_size) -> Callable[[], None]:
+    """Map.__init__ including get_inner_map"""
+    path = level_file(map_size)
+    return lambda: Map(path)
+
+
+@case("large_map_size", memory=True)
+def map_parse_large(large_map_size) -> Callable[[], None]:
+    """Streaming parser on large level files (peak memory is reported)"""
+    path = level_file(large_map_size)
+    return lambda: Map(path)
+
+
+@case("map_size")
+def map_load_compiled(map_size) -> Callable[[], None]:
+    """load_map from the disk cache (without the in-memory cache)"""
+    path = level_file(map_size)
+    load_map(path)  # make sure the compiled map is on disk
+
+    def run():
+        loaded_maps.clear()
+        load_map(path)
+
+    return run
+
+
+@case("map_size")
+def draw_map_picture(map_size) -> Callable[[], None]:
+    game_map = make_map(map_size)
+    renderer = MapRenderer(make_camera(game_map).surface, config.TEXTURES)
+    return lambda: renderer.draw_map_picture(game_map)
+
+
+@case("map_size", "zoom")
+def draw_map(map_size, zoom) -> Callable[[], None]:
+    game_map = make_map(map_size)
+    camera = make_camera(game_map, zoom)
+    renderer = MapRenderer(camera.surface, config.TEXTURES)
+    renderer.draw_map_picture(game_map)
+    return lambda: renderer.draw_map(camera)
+
+
+@case("map_size", "zoom")
+def draw_map_cold(map_size, zoom) -> Callable[[], None]:
+    """draw_map with empty chunk cache (first frame after loading a map)"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map, zoom)
+    renderer = MapRenderer(camera.surface, config.TEXTURES)
+
+    def run():
+        renderer.draw_map_picture(game_map)
+        renderer.draw_map(camera)
+
+    return run
+
+
+@case("map_size", "robots")
+def robot_renderer_draw(map_size, robots) -> Callable[[], None]:
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    for robot in robot_list:
+        robot.moving = True
+    renderer = RobotRenderer(camera.surface)
+
+    def run():
+        for robot in robot_list:
+            renderer.draw(robot, camera, 1 / 60)
+
+    return run
+
+
+def make_bush_overlay(
+    map_size, robots
+) -> tuple[MapRenderer, Camera, list[list[tuple[int, int]]]]:
+    """Map renderer, camera and 4 visible bush tiles for each robot"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    renderer = MapRenderer(camera.surface, config.TEXTURES)
+    renderer.draw_map_picture(game_map)
+    # bushes in the camera view (robots outside of it are not drawn)
+    view_cols = camera.camera_surface_width // BENCH_TILE_SIZE
+    view_rows = camera.camera_surface_height // BENCH_TILE_SIZE
+    visible = [(x, y) for x, y in game_map.bush_tiles if x < view_cols and y < view_rows]
+    rng = random.Random(3)
+    return renderer, camera, [rng.sample(visible, 4) for _ in range(robots)]
+
+
+@case("map_size", "robots")
+def draw_bush_overlay(map_size, robots) -> Callable[[], None]:
+    """Bush overlay of visible robots hiding in bushes (4 bush tiles each)"""
+    renderer, camera, bush_tiles = make_bush_overlay(map_size, robots)
+
+    def run():
+        for tiles in bush_tiles:
+            renderer.draw_bush_overlay(tiles, camera)
+
+    return run
+
+
+@case("map_size", "robots")
+def draw_bush_overlay_zooming(map_size, robots) -> Callable[[], None]:
+    """draw_bush_overlay while the camera zoom changes every frame"""
+    renderer, camera, bush_tiles = make_bush_overlay(map_size, robots)
+    zoom_targets = itertools.cycle([1.5, 0.6])
+    target = next(zoom_targets)
+
+    def run():
+        nonlocal target
+        # like Camera.follow_dynamic_center, towards near and far in turns
+        camera.zoom += (target - camera.zoom) * 0.1
+        if abs(target - camera.zoom) < 0.01:
+            target = next(zoom_targets)
+        for tiles in bush_tiles:
+            renderer.draw_bush_overlay(tiles, camera)
+
+    return run
+
+
+@case("map_size", "zoom", "robots", "backend")
+def render_frame(map_size, zoom, robots, backend) -> Callable[[], None]:
+    """Map and robots of one frame, including presenting it (surface vs texture)"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map, zoom)
+    robot_list = make_robots(game_map, camera, robots)
+    for robot in robot_list:
+        robot.moving = True
+
+    if backend == "texture":
+        sdl_renderer = get_texture_backend().renderer
+        map_renderer = TextureMapRenderer(sdl_renderer, camera.surface, config.TEXTURES)
+        robot_renderer = TextureRobotRenderer(sdl_renderer, camera.surface)
+    else:
+        map_renderer = MapRenderer(camera.surface, config.TEXTURES)
+        robot_renderer = RobotRenderer(camera.surface)
+    map_renderer.draw_map_picture(game_map)
+
+    def run():
+        camera.surface.fill((0, 0, 0))
+        map_renderer.draw_map(camera)
+        for robot in robot_list:
+            if robot_renderer.is_visible(robot, camera):  # culled like in MatchScene
+                robot_renderer.draw(robot, camera, 1 / 60)
+        if backend == "texture":
+            sdl_renderer.present()  # SDL batches the draw calls until present
+        else:
+            screen.blit(camera.surface, (0, 0))
+            pygame.display.flip()
+
+    return run
+
+
+@case("map_size", "robots")
+def move_if_no_walls(map_size, robots) -> Callable[[], None]:
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    walls = game_map.walls()
+    step = [4.0]
+
+    def run():
+        step[0] = -step[0]  # move back and forth to stay in place
+        for robot in robot_list:
+            robot.move_if_no_walls(
+                step[0], step[0], walls, robot_list, game_map, check_for_lava=True
+            )
+
+    return run
+
+
+@case("map_size", "robots", "bullets")
+def getting_shot(map_size, robots, bullets) -> Callable[[], None]:
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    bullet_list = make_bullets(game_map, robot_list, bullets)
+
+    def run():
+        for robot in robot_list:
+            robot.hp = 100
+            robot.getting_shot(bullet_list)
+
+    return run
+
+
+@case("map_size", "crowd", "broadphase")
+def neighbour_queries(map_size, crowd, broadphase) -> Callable[[], None]:
+    """Pairwise checks of one frame: robot contacts, threats and bullet hits"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, crowd[0])
+    bullet_list = make_bullets(game_map, robot_list, crowd[1])
+
+    def run():
+        grid = None
+        if broadphase == "grid":  # rebuilt here, a match only updates moved entities
+            grid = SpatialHash(2 * config.TILE_SIZE)
+            grid.rebuild("robot", robot_list, robot_list[0].hitbox_radius)
+            grid.rebuild("bullet", bullet_list, 7)
+        for robot in robot_list:
+            robot.hp = 100
+            robot.nearest_robot(robot_list, grid)
+            robot.robots_within(robot_list, BULLET_REACH, grid)
+            robot.getting_shot(bullet_list, grid)
+
+    return run
+
+
+@case("enemies")
+def fire_cone(enemies) -> Callable[[], None]:
+    """Which enemies face the player (move_if_in_range)"""
+    game_map = make_map((128, 128))
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, enemies + 1)
+    player = robot_list[0]
+    enemy_list = robot_list[1:]
+
+    def run():
+        for enemy in enemy_list:
+            facing(player.x, player.y, enemy)
+
+    return run
+
+
+@case("map_size", "robots")
+def go_hide(map_size, robots) -> Callable[[], None]:
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    walls = game_map.walls()
+    start = [(robot.x, robot.y, robot.alpha) for robot in robot_list]
+
+    def run():
+        for robot, (x, y, alpha) in zip(robot_list, start):
+            robot.x, robot.y, robot.alpha = x, y, alpha
+            robot.go_hide(game_map, walls, robot_list)
+
+    return run
+
+
+@case("map_size", "robots")
+def tile_queries(map_size, robots) -> Callable[[], None]:
+    # tile lookups of a frame: map effects, hiding check and visibility for goals
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    step = [1.0]
+
+    def run():
+        step[0] = -step[0]  # small moves, most of them stay on their tiles
+        for robot in robot_list:
+            robot.x += step[0]
+            robot.map_effects(game_map, robot_list)
+            robot.touched_textures(game_map)
+        visible_robots(robot_list, game_map)
+
+    return run
+
+
+@case("map_size", "robots")
+def ai_scheduler_update(map_size, robots) -> Callable[[], None]:
+    """One frame (16 ms) of enemy goal decisions with the frame budget"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    scheduler = AIScheduler()
+    scheduler.start(robot_list[1:], 0)
+    frame = itertools.count()
+
+    return lambda: scheduler.update(next(frame) * 16, game_map, robot_list)
+
+
+@case("map_size", "robots")
+def ai_planner_update(map_size, robots) -> Callable[[], None]:
+    """Main thread cost of one frame with planning in worker processes"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    planner = AIPlanner(game_map)
+    planner.start(robot_list[1:], 0)
+    frame = itertools.count()
+
+    return lambda: planner.update(next(frame) * 16, game_map, robot_list)
+
+
+# sounds of a busy frame: every robot shoots, hits a wall and leaves the sand
+FRAME_SOUNDS: list[tuple[str, str]] = [
+    ("play_sound", "shot_sound"),
+    ("play_sound", "wall_hit_sound"),
+    ("stop_loop", "sand_sound"),
+]
+
+
+@case("robots")
+def sounds_direct(robots) -> Callable[[], None]:
+    """Sounds of one frame played directly by every robot"""
+    sounds = Sounds()
+    calls = [getattr(sounds, method) for method, _ in FRAME_SOUNDS]
+    actions = [action for _, action in FRAME_SOUNDS]
+
+    def run():
+        for _ in range(robots):
+            for call, action in zip(calls, actions):
+                call(action)
+
+    return run
+
+
+@case("robots")
+def audio_queue_flush(robots) -> Callable[[], None]:
+    """Sounds of one frame collected by the AudioQueue and played at once"""
+    audio = AudioQueue(Sounds())
+    calls = [getattr(audio, method) for method, _ in FRAME_SOUNDS]
+    actions = [action for _, action in FRAME_SOUNDS]
+
+    def run():
+        for _ in range(robots):
+            for call, action in zip(calls, actions):
+                call(action)
+        audio.flush()
+
+    return run
+
+
+@case("map_size", "robots")
+def audio_queue_positional(map_size, robots) -> Callable[[], None]:
+    """Every robot shoots and is hit in one frame, heard relative to the camera"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    camera.follow_dynamic_center(robot_list, robot_list[0])
+    audio = AudioQueue(Sounds(), camera)
+
+    def run():
+        for robot in robot_list:
+            audio.play_at("shot_sound", robot.x, robot.y)
+            audio.play_at("player_hit_sound", robot.x, robot.y)
+        audio.flush()
+
+    return run
+
+
+@case("robots")
+def battle_step(robots) -> Callable[[], None]:
+    """One frame of all systems of a mass battle in battle-arena.txt"""
+    world = BattleWorld(load_map("battle-arena.txt"))
+    world.spawn_robots(robots, 2, int(config.TILE_SIZE * 1.3), 4, 6)
+    for i in range(world.count):
+        world.hp[i] = 1e9  # nobody dies, so that the count stays the same
+    frame = itertools.count()
+
+    return lambda: step(world, next(frame) * 16)
+
+
+@case("enemies")
+def battle_steering(enemies) -> Callable[[], None]:
+    """Enemies of a mass battle moving, turning and shooting at their targets"""
+    world = BattleWorld(load_map("battle-arena.txt"))
+    world.spawn_robots(enemies + 1, 2, int(config.TILE_SIZE * 1.3), 4, 6)
+    targeting_system(world)
+    frame = itertools.count()
+
+    return lambda: steering_system(world, next(frame) * 16)
+
+
+@case("map_size", "robots", "simulation")
+def enemy_update(map_size, robots, simulation) -> Callable[[], None]:
+    """One frame of update_enemy for all enemies (chasing the player)"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    player = robot_list[0]
+    camera.center_x, camera.center_y = player.x, player.y
+    walls = game_map.walls()
+    lod = SimulationLOD()
+    lod.start(robot_list[1:])
+    start = [(robot.x, robot.y) for robot in robot_list]
+
+    def run():
+        lod.next_frame()
+        for robot, (x, y) in zip(robot_list[1:], start[1:]):
+            robot.x, robot.y, robot.hp = x, y, 100  # same positions in every run
+            if simulation == "full":
+                robot.update_enemy(player, robot_list, game_map, walls, [], camera)
+                continue
+            band = lod.band(robot, player, camera)
+            steps = lod.steps(robot, band)
+            if steps:
+                robot.update_enemy(player, robot_list, game_map, walls, [], camera,
+                                   None, steps, full_detail=band == 0)
+            else:
+                robot.getting_shot([])
+
+    return run
+
+
+@case("map_size", "robots")
+def get_spawn_position(map_size, robots) -> Callable[[], None]:
+    """Respawn of one robot (e.g. after lava) with all other robots alive"""
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    robot_list = make_robots(game_map, camera, robots)
+    return lambda: robot_list[0].get_spawn_position(game_map, robot_list)
+
+
+@case("map_size", "bullets")
+def update_bullet(map_size, bullets) -> Callable[[], None]:
+    game_map = make_map(map_size)
+    camera = make_camera(game_map)
+    bullet_list = make_bullets(game_map, [], bullets)
+    start = [(bullet.x, bullet.y) for bullet in bullet_list]
+
+    def run():
+        for bullet, (x, y) in zip(bullet_list, start):
+            if not bullet.alive:  # respawn, so that the count stays the same
+                bullet.x, bullet.y, bullet.reach, bullet.alive = x, y, 800, True
+            bullet.update_bullet(game_map, camera)
+
+    return run
+
+
+def case_id(name: str, params: dict) -> str:
+    """Unique key of a parameterized case, e.g. 'draw_map[map_size=48x27,zoom=1.0]'"""
+    parts = []
+    for key, value in params.items():
+        if isinstance(value, tuple):
+            value = "x".join(str(v) for v in value)
+        parts.append(f"{key}={value}")
+    return f"{name}[{','.join(parts)}]"
+
+
+def time_case(run: Callable[[], None], repeat: int, min_time: float) -> list[float]:
+    """Time run() at least `repeat` times and at least `min_time` seconds (in ms)"""
+    run()  # warm up caches
+    timings: list[float] = []
+    total = 0.0
+    while len(timings) < repeat or total < min_time:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed * 1000)
+        total += elapsed
+    return timings
+
+
+def run_benchmarks(
+    selected: list[str], repeat: int, min_time: float
+) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for name in selected:
+        param_names, factory, memory = CASES[name]
+        for values in itertools.product(*(param_values(p) for p in param_names)):
+            params = dict(zip(param_names, values))
+            key = case_id(name, params)
+            run = factory(**params)
+            timings = time_case(run, repeat, min_time)
+            results[key] = {
+                "median_ms": statistics.median(timings),
+                "mean_ms": statistics.fmean(timings),
+                "min_ms": min(timings),
+                "max_ms": max(timings),
+                "runs": len(timings),
+            }
+            line = f"{key:<60} {results[key]['median_ms']:10.3f} ms"
+            if memory:
+                tracemalloc.start()
+                run()
+                results[key]["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+                tracemalloc.stop()
+                line += f" {results[key]['peak_kb']:12.0f} kB peak"
+            print(line)
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Return the cases whose median is slower than baseline * (1 + threshold)"""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result["median_ms"] / max(baseline[key]["median_ms"], 1e-9)
+        if ratio > 1 + threshold:
+            regressions.append(key)
+            print(f"REGRESSION {key}: {ratio:.2f}x baseline")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Roboarena benchmarks")
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("-b", "--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown against the baseline (0.2 = 20%%)",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="min seconds per case"
+    )
+    parser.add_argument("-k", "--filter", default="", help="run matching cases only")
+    args = parser.parse_args(argv)
+
+    config.TILE_SIZE = BENCH_TILE_SIZE
+    selected = [name for name in CASES if args.filter in name]
+    results = run_benchmarks(selected, args.repeat, args.min_time)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "meta": {
+                    "python": platform.python_version(),
+                    "pygame": pygame.version.ver,
+                    "platform": platform.platform(),
+                    "tile_size": config.TILE_SIZE,
+                    "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                },
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.threshold):
+            return 1
+        print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,11 @@
 import pygame
 import math
 import config
-from map import Map
+from map import TILE_CODES, Map
 from camera import Camera
 
+WALL = TILE_CODES["wall"]
+
 
 class Bullet:
     def __init__(
@@ -27,31 +29,45 @@ class Bullet:
         self.alive = True  # if bullet is there
         self.shooter = shooter  # Robot who shot this bullet
 
-    def update_bullet(self, map: Map, camera: Camera) -> None:
-        # update bullet position and reach
+    def update_bullet(
+        self, map: Map, camera: Camera, draw: bool = True
+    ) -> pygame.Rect | None:
+        # update bullet position and reach (returns the drawn region)
         direction_rad = math.radians(self.direction)
         x = self.velocity * math.cos(direction_rad)
         y = self.velocity * math.sin(direction_rad)
+        start_x = self.x
+        start_y = self.y
         self.x += x
         self.y += y
         self.reach -= abs(x + y)
 
         # stop bullet, if its outside of the screen
-        width = config.COLUMNS * config.TILE_SIZE
-        height = config.ROWS * config.TILE_SIZE
+        width = map.cols * config.TILE_SIZE
+        height = map.rows * config.TILE_SIZE
         if self.x < 0 or self.x > width:
             self.alive = False
         if self.y < 0 or self.y > height:
             self.alive = False
 
-        # stop bullet, if it hits wall or at end of reach
-        current_col = int(self.x / config.TILE_SIZE)
-        current_row = int(self.y / config.TILE_SIZE)
-        if map.get_tile_type(current_col, current_row) == "wall":
+        # stop bullet at the first wall on its way (not only at the end of the
+        # step, so that fast bullets can not fly through thin walls)
+        hit = map.trace_segment(start_x, start_y, self.x, self.y, WALL)
+        if hit is not None:
+            self.x, self.y = hit
             self.alive = False
+        # stop bullet at end of reach
         if self.reach <= 0:
             self.alive = False
 
         # draw bullet
+        if draw:
+            return self.draw_bullet(camera)
+        return None
+
+    def draw_bullet(self, camera: Camera) -> pygame.Rect:
+        # draw bullet on the camera surface (returns the drawn region)
         draw_x, draw_y = camera.apply(int(self.x), int(self.y))
-        pygame.draw.circle(camera.surface, self.color, (draw_x, draw_y), self.radius)
+        return pygame.draw.circle(
+            camera.surface, self.color, (draw_x, draw_y), self.radius
+        )
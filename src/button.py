@@ -20,15 +20,29 @@ class Button:
 
         self.text_surface = self.font.render(self.text, True, self.text_color)
         self.text_rect = self.text_surface.get_rect(center=self.rect.center)
+        self.hovered = None  # Hover-Zustand beim letzten Zeichnen (None = nie gezeichnet)
 
     def draw(self, screen):
+        """
+        Zeichnet den Button.
+        Rückgabe: Bereich des Buttons (pygame.Rect), z.B. für Presenter.mark_dirty
+        """
         mouse_pos = pygame.mouse.get_pos()
-        if self.rect.collidepoint(mouse_pos):
+        self.hovered = self.rect.collidepoint(mouse_pos)
+        if self.hovered:
             color = self.hover_color
         else:
             color = self.bg_color
         pygame.draw.rect(screen, color, self.rect)
         screen.blit(self.text_surface, self.text_rect)
+        return self.rect
+
+    def hover_changed(self):
+        """
+        Prüft, ob sich der Hover-Zustand seit dem letzten Zeichnen geändert hat.
+        Rückgabe: True, wenn der Button neu gezeichnet werden muss, sonst False
+        """
+        return self.rect.collidepoint(pygame.mouse.get_pos()) != self.hovered
 
     def is_clicked(self, event):
         """
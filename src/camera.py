@@ -1,3 +1,4 @@
+import math
 import pygame
 
 
@@ -89,6 +90,24 @@ class Camera:
         screen_y = (y - self.offset_y) * self.zoom
         return int(screen_x), int(screen_y)
 
+    def view_rect(self) -> pygame.Rect:
+        """Visible part of the map in world coordinates"""
+        return pygame.Rect(
+            self.offset_x,
+            self.offset_y,
+            math.ceil(self.camera_surface_width / self.zoom),
+            math.ceil(self.camera_surface_height / self.zoom),
+        )
+
+    def is_visible(self, x: float, y: float, margin: float = 0) -> bool:
+        """Whether something within margin (world pixels) of (x, y) can be seen"""
+        return (
+            self.offset_x - margin <= x < self.offset_x + margin
+            + self.camera_surface_width / self.zoom
+            and self.offset_y - margin <= y < self.offset_y + margin
+            + self.camera_surface_height / self.zoom
+        )
+
     def set_zoom_to(self, value: float):
         # Set zoom level directly limited between 0.8 and 3.0.
 
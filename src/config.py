@@ -24,7 +24,24 @@ ICONS: dict[str, pygame.Surface] = {
 
 
 TILE_SIZE: int = 0  # will be assigned during runtime in main.py
-COLUMNS: int = 48  # number of tile columns (horizontal)
-ROWS: int = 27  # number of tile rows (vertical)
+COLUMNS: int = 48  # number of visible tile columns (horizontal), maps can be larger
+ROWS: int = 27  # number of visible tile rows (vertical), maps can be larger
 ROBOT_RENDER_SIZE = 64  # always 64x64 px
 SHOW_STATS: bool = True  # Toggle to show or hide HP and Power numbers
+SHOW_PROFILER: bool = False  # show frame counters in the game (toggle with F3)
+CHUNK_SIZE: int = 16  # map is rendered in chunks of CHUNK_SIZE x CHUNK_SIZE tiles
+MAX_CACHED_CHUNKS: int = 32  # rendered map chunks kept in memory (LRU)
+MAX_CACHED_BUSH_TILES: int = 128  # zoomed bush overlay tiles kept (LRU)
+RENDER_BACKEND: str = "surface"  # "surface" or "texture" (SDL2), chosen in main.py
+TEXTURE_ACCELERATED: int = -1  # texture backend: -1 SDL decides, 0 software, 1 GPU
+AI_DECISION_INTERVAL_MS: int = 3000  # enemies pick a new goal this often
+AI_FRAME_BUDGET_MS: float = 1.0  # time per frame for enemy goal decisions
+AI_WORKERS: int = 2  # enemy planning processes (0 or not Linux: main thread)
+AI_PUBLISH_INTERVAL_MS: int = 100  # world snapshots for the workers at most this often
+AUDIO_MAX_VOICES: int = 4  # sounds started per frame at most (audio queue)
+AUDIO_CHANNELS: int = 8  # mixer channels for positional sounds (shots, hits, lava)
+AUDIO_RADIUS: float = 20  # robots are heard up to this many tiles (at zoom 1)
+# simulation LOD: (max distance in tiles to camera or player, update every n frames)
+LOD_BANDS: list[tuple[float, int]] = [(12, 1), (24, 2), (float("inf"), 4)]
+BATTLE_ROBOTS: int = 500  # robots in a mass battle (battle-arena.txt)
+BATTLE_TEAMS: int = 2  # teams in a mass battle, the player is in team 0
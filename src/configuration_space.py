@@ -0,0 +1,209 @@
+"""
+Configuration space of a hitbox: for every position of a robot center, whether
+its hitbox touches a blocked tile (e.g. wall or lava) or leaves the map.
+
+A hitbox of width w covers n or n + 1 tile columns, depending on where its left
+edge lies inside a tile (the same for rows). The blocked tiles are dilated once
+for each combination of covered columns and rows, one bitmask (int) per tile
+row. Checking a position is then one bit lookup in one of these masks, exact
+to the pixel like testing the hitbox Rect against the tiles, and independent
+of the hitbox size.
+
+sweep() moves a hitbox until it touches a blocked tile and slides along it.
+Only the positions where the hitbox starts to cover another tile column or row
+have to be checked, so the cost is the number of tile borders crossed.
+"""
+
+from typing import NamedTuple
+import config
+from map import Map
+
+
+class Contact(NamedTuple):
+    """Where a sweep stopped at a blocked tile"""
+
+    normal_x: int  # -1, 0 or 1: side of the hitbox touching the tile
+    normal_y: int
+    time: float  # part of the movement done before the contact (0 to 1)
+
+
+class ConfigurationSpace:
+    def __init__(
+        self,
+        game_map: Map,
+        offset_x: float,
+        offset_y: float,
+        width: float,
+        height: float,
+        blocked: int,
+    ):
+        """
+        Hitbox: pygame.Rect(x - offset_x, y - offset_y, width, height) for a center
+        at (x, y), blocked: effect bits of the tiles it must not touch (map.py)
+        """
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        # pygame.Rect truncates the size like this
+        self.width = int(width)
+        self.height = int(height)
+        self.tile_size = config.TILE_SIZE
+        self.cols = game_map.cols
+        self.rows = game_map.rows
+
+        # one int per tile row, bit c is set if tile c is blocked
+        digits = b"".join(b"1" if effects & blocked else b"0" for effects in range(256))
+        flags = game_map.tile_effects.translate(digits)
+        cols = self.cols
+        tile_rows = [
+            int(flags[row * cols:(row + 1) * cols][::-1], 2)  # column 0: lowest bit
+            for row in range(self.rows)
+        ]
+
+        # (covered columns, covered rows) -> dilated masks
+        self.masks: dict[tuple[int, int], list[int]] = {}
+        for span_x in self.spans(self.width):
+            for span_y in self.spans(self.height):
+                self.masks[span_x, span_y] = self.dilate(tile_rows, span_x, span_y)
+
+    def spans(self, size: int) -> set[int]:
+        """Number of tiles a hitbox edge of this size can cover"""
+        tile_size = self.tile_size
+        return {
+            (offset + size - 1) // tile_size + 1
+            for offset in (0, tile_size - 1)  # edge at the start / end of a tile
+        }
+
+    def dilate(self, tile_rows: list[int], span_x: int, span_y: int) -> list[int]:
+        """Bit c of row r: a hitbox covering tiles c to c + span_x - 1 and r to
+        r + span_y - 1 touches a blocked tile"""
+        wide = []
+        for row in tile_rows:
+            mask = row
+            for shift in range(1, span_x):
+                mask |= row >> shift
+            wide.append(mask)
+        masks = []
+        for row in range(self.rows - span_y + 1):
+            mask = 0
+            for covered in wide[row:row + span_y]:
+                mask |= covered
+            masks.append(mask)
+        return masks  # rows that leave the map at the bottom have no mask
+
+    def free(self, x: float, y: float) -> bool:
+        """Whether the hitbox of a robot centered at (x, y) touches no blocked tile"""
+        return self.free_at(int(x - self.offset_x), int(y - self.offset_y))
+
+    def free_at(self, left: int, top: int) -> bool:
+        """free() for the hitbox with its top left corner at (left, top)"""
+        tile_size = self.tile_size
+        col = left // tile_size
+        row = top // tile_size
+        if col < 0 or row < 0:
+            return False
+        span_x = (left + self.width - 1) // tile_size - col + 1
+        masks = self.masks[span_x, (top + self.height - 1) // tile_size - row + 1]
+        if col + span_x > self.cols or row >= len(masks):
+            return False  # leaves the map on the right or at the bottom
+        return not masks[row] >> col & 1
+
+    def sweep(
+        self, x: float, y: float, dx: float, dy: float
+    ) -> tuple[float, float, Contact | None]:
+        """
+        Move the hitbox centered at (x, y) by (dx, dy) until it would touch a
+        blocked tile, then slide along the tile with the rest of the movement.
+        Returns the new center and the first contact (None if there was none).
+        """
+        new_x, new_y, contact = self.sweep_to_contact(x, y, dx, dy)
+        if contact is None:
+            return new_x, new_y, None
+        rest = 1 - contact.time
+        if contact.normal_x:
+            new_x, new_y, _ = self.sweep_to_contact(new_x, new_y, 0, dy * rest)
+        else:
+            new_x, new_y, _ = self.sweep_to_contact(new_x, new_y, dx * rest, 0)
+        if self.free(x, y) and not self.free(new_x, new_y):
+            return x, y, contact  # rounding at a tile corner, better stay
+        return new_x, new_y, contact
+
+    def sweep_to_contact(
+        self, x: float, y: float, dx: float, dy: float
+    ) -> tuple[float, float, Contact | None]:
+        """Move the hitbox by (dx, dy) until it would touch a blocked tile"""
+        offset_x = self.offset_x
+        offset_y = self.offset_y
+        left = int(x - offset_x)
+        top = int(y - offset_y)
+        current = (left, top)  # edges after the last border
+        # (time, axis, left or top) whenever the hitbox covers another tile
+        # column (axis 0) or row (axis 1)
+        borders = self.borders(x - offset_x, left, dx, self.width, 0)
+        borders += self.borders(y - offset_y, top, dy, self.height, 1)
+        if not borders:  # the hitbox stays on the same tiles
+            return x + dx, y + dy, None
+        borders.sort()
+        for time, axis, value in borders:
+            # the other edge is where it is at this time, but at least at the
+            # last border it crossed (it may cross a border at the same time)
+            if axis == 0:
+                top = int(y + time * dy - offset_y)
+                top = min(top, current[1]) if dy < 0 else max(top, current[1])
+                current = (value, top)
+            else:
+                left = int(x + time * dx - offset_x)
+                left = min(left, current[0]) if dx < 0 else max(left, current[0])
+                current = (left, value)
+            if self.free_at(*current):
+                continue
+            # stop in the middle of the last pixel before the tile
+            if axis == 0:
+                step = 1 if dx > 0 else -1
+                stop_x = value - step + 0.5 + offset_x
+                stop_x = max(x, stop_x) if dx > 0 else min(x, stop_x)
+                return stop_x, y + time * dy, Contact(-step, 0, time)
+            step = 1 if dy > 0 else -1
+            stop_y = value - step + 0.5 + offset_y
+            stop_y = max(y, stop_y) if dy > 0 else min(y, stop_y)
+            return x + time * dx, stop_y, Contact(0, -step, time)
+        return x + dx, y + dy, None
+
+    def borders(
+        self, start: float, first: int, delta: float, size: int, axis: int
+    ) -> list[tuple[float, int, int]]:
+        """
+        Positions (left or top edge, first: start truncated) during a movement by
+        delta where the hitbox starts to cover one more tile column or row
+        """
+        tile_size = self.tile_size
+        last = int(start + delta)
+        found = []
+        if delta > 0:
+            # first edge position covering the next tile
+            value = ((first + size - 1) // tile_size + 1) * tile_size - size + 1
+            while value <= last:
+                found.append(((value - start) / delta, axis, value))
+                value += tile_size
+        elif delta < 0:
+            value = first // tile_size * tile_size - 1
+            while value >= last:
+                found.append(((value + 1 - start) / delta, axis, value))
+                value -= tile_size
+        return found
+
+
+def get_configuration_space(
+    game_map: Map,
+    offset_x: float,
+    offset_y: float,
+    width: float,
+    height: float,
+    blocked: int,
+) -> ConfigurationSpace:
+    """Return the configuration space for a hitbox (created once per map and size)"""
+    key = (offset_x, offset_y, width, height, blocked, config.TILE_SIZE)
+    space = game_map.configuration_spaces.get(key)
+    if space is None:
+        space = ConfigurationSpace(game_map, offset_x, offset_y, width, height, blocked)
+        game_map.configuration_spaces[key] = space
+    return space
@@ -1,14 +1,33 @@
+import os
 import pygame
 import sys
+from typing import Callable
 import config
-from map import Map
-from map_renderer import MapRenderer
-from robot import Robot
+from map_compiler import load_map, get_map_renderer
+from robot import Robot, get_hitbox_rect
+from spawn_service import NoSpawnPositionError, get_spawn_service
 from bullet import Bullet
 from button import Button
 from sounds import Sounds
+from audio_queue import AudioQueue
 from camera import Camera
 from robot_renderer import RobotRenderer
+from presenter import Presenter
+from profiler import Profiler
+from simulation_lod import SimulationLOD
+from spatial_hash import SpatialHash
+from ai_planner import create_ai, start_workers, stop_workers
+from scene_manager import Scene, SceneManager
+from texture_renderer import TextureBackend, TextureRobotRenderer
+from battle_world import BULLET_COLOR, BULLET_RADIUS, BattleWorld, step
+
+# Worker processes for the enemy planning: "--ai-workers=n" or ROBOARENA_AI_WORKERS=n,
+# forked before SDL starts its threads
+config.AI_WORKERS = int(os.environ.get("ROBOARENA_AI_WORKERS", config.AI_WORKERS))
+for arg in sys.argv[1:]:
+    if arg.startswith("--ai-workers="):
+        config.AI_WORKERS = int(arg.split("=", 1)[1])
+start_workers()
 
 # Initialisation
 pygame.init()
@@ -28,8 +47,19 @@ config.TILE_SIZE = int(base_tile_size * 2)
 window_width: int = base_tile_size * config.COLUMNS
 window_height: int = base_tile_size * config.ROWS
 
-screen: pygame.Surface = pygame.display.set_mode((window_width, window_height))
-pygame.display.set_caption("Roboarena")
+# Render backend: "--renderer=texture" or ROBOARENA_RENDERER=texture for SDL2 textures
+config.RENDER_BACKEND = os.environ.get("ROBOARENA_RENDERER", config.RENDER_BACKEND)
+for arg in sys.argv[1:]:
+    if arg.startswith("--renderer="):
+        config.RENDER_BACKEND = arg.split("=", 1)[1]
+
+texture_backend: TextureBackend | None = None
+if config.RENDER_BACKEND == "texture":
+    texture_backend = TextureBackend("Roboarena", (window_width, window_height))
+    screen: pygame.Surface = texture_backend.overlay_surface  # menus and texts
+else:
+    screen = pygame.display.set_mode((window_width, window_height))
+    pygame.display.set_caption("Roboarena")
 clock = pygame.time.Clock()
 
 
@@ -39,655 +69,678 @@ print(f"Fenster: {window_width}x{window_height}")
 print(f"TILE_SIZE: {config.TILE_SIZE}")
 
 
+# Loaded once and shared by all scenes
+sounds = Sounds()
+fonts: dict[tuple[str | None, int], pygame.font.Font] = {}  # (name, size) -> font
+robot_renderers: dict[str, RobotRenderer] = {}  # render backend -> renderer
+
+BUTTON_COLORS: dict[str, tuple[tuple[int, int, int], tuple[int, int, int]]] = {
+    "blue": ((20, 130, 200), (40, 160, 255)),  # (background, hover)
+    "red": ((200, 50, 50), (255, 80, 80)),
+}
+
+
+def get_font(font_name: str | None, font_size: int) -> pygame.font.Font:
+    if (font_name, font_size) not in fonts:
+        fonts[(font_name, font_size)] = pygame.font.SysFont(font_name, font_size)
+    return fonts[(font_name, font_size)]
+
+
+def get_robot_renderer(camera_surface: pygame.Surface) -> RobotRenderer:
+    """Robot renderer of the render backend, frames are only loaded once"""
+    if config.RENDER_BACKEND not in robot_renderers:
+        if texture_backend:
+            robot_renderers[config.RENDER_BACKEND] = TextureRobotRenderer(
+                texture_backend.renderer, camera_surface
+            )
+        else:
+            robot_renderers[config.RENDER_BACKEND] = RobotRenderer(camera_surface)
+    robot_renderer = robot_renderers[config.RENDER_BACKEND]
+    robot_renderer.camera_surface = camera_surface  # new camera for every match
+    return robot_renderer
+
+
 def draw_text(
     surface, text, x, y, font_size, color=(255, 255, 255), font_name=None, center=False
 ):
-    font = pygame.font.SysFont(font_name, font_size)
+    font = get_font(font_name, font_size)
     text_surface = font.render(text, True, color)
     text_rect = text_surface.get_rect(center=(screen.get_width() // 2, y))
     if center:
-        surface.blit(text_surface, text_rect)
-    else:
-        surface.blit(text_surface, (x, y))
-
-
-def main_menu():
-    clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 40)
-
-    start_button = Button(
-        rect=(screen.get_width() // 2 - 100, 300, 200, 50),
-        text="Start Game",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    options_button = Button(
-        rect=(screen.get_width() // 2 - 100, 370, 200, 50),
-        text="Options",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    instructions_button = Button(
-        rect=(screen.get_width() // 2 - 100, 440, 200, 50),
-        text="How to play",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    level_button = Button(
-        rect=(screen.get_width() // 2 - 100, 510, 200, 50),
-        text="Level selection",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    quit_button = Button(
-        rect=(screen.get_width() // 2 - 100, 580, 200, 50),
-        text="Exit Game",
-        font=font,
-        bg_color=(200, 50, 50),
-        text_color=(255, 255, 255),
-        hover_color=(255, 80, 80),
-    )
-
-    running = True
-    while running:
+        return surface.blit(text_surface, text_rect)
+    return surface.blit(text_surface, (x, y))
+
+
+def draw_buttons(buttons: list[Button], presenter: Presenter) -> None:
+    """Draw all buttons on a full update, otherwise only buttons with changed hover"""
+    for button in buttons:
+        if presenter.full_update or button.hover_changed():
+            presenter.mark_dirty(button.draw(screen))
+
+
+def start_scene(manager: SceneManager, create_scene: Callable[[], Scene]) -> None:
+    """
+    Switch to a new match (or battle), back to the level selection with the
+    reason if the robots cannot spawn on its level
+    """
+    try:
+        scene = create_scene()
+    except NoSpawnPositionError as error:
+        manager.switch(MainMenuScene())
+        manager.push(LevelSelectScene(str(error)))
+        return
+    manager.switch(scene)
+
+
+class MenuScene(Scene):
+    title = ""
+
+    def __init__(self):
+        """Screen with a title and buttons, only hovered buttons are redrawn"""
+        self.presenter = Presenter(screen, texture_backend)
+        self.buttons: list[tuple[Button, Callable[[], None]]] = []  # with action
+
+    def add_button(
+        self, text: str, x: int, y: int, action: Callable[[], None], color: str = "blue"
+    ) -> None:
+        """Add a button, x is relative to the center of the screen"""
+        bg_color, hover_color = BUTTON_COLORS[color]
+        button = Button(
+            rect=(screen.get_width() // 2 + x, y, 200, 50),
+            text=text,
+            font=get_font(None, 40),
+            bg_color=bg_color,
+            text_color=(255, 255, 255),
+            hover_color=hover_color,
+        )
+        self.buttons.append((button, action))
+
+    def enter(self) -> None:
+        self.presenter.mark_full()
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        for button, action in self.buttons:
+            if button.is_clicked(event):
+                action()
+
+    def draw_static(self) -> None:
+        """Content that does not change (drawn after another screen was shown)"""
         screen.fill((30, 30, 30))
+        draw_text(screen, self.title, 0, 150, 80, center=True)
 
-        title_font = pygame.font.SysFont(None, 80)
-        title_surf = title_font.render("Main Menu", True, (255, 255, 255))
-        title_rect = title_surf.get_rect(center=(screen.get_width() // 2, 150))
-        screen.blit(title_surf, title_rect)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if start_button.is_clicked(event):
-                game_loop()
-            if options_button.is_clicked(event):
-                options()
-            if instructions_button.is_clicked(event):
-                instructions_menu()
-            if level_button.is_clicked(event):
-                level_selection()
-            if quit_button.is_clicked(event):
-                pygame.quit()
-                sys.exit()
-
-        start_button.draw(screen)
-        options_button.draw(screen)
-        instructions_button.draw(screen)
-        level_button.draw(screen)
-        quit_button.draw(screen)
-
-        pygame.display.flip()
-        clock.tick(60)
-
-
-def pause_menu():
-    clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 40)
-
-    continue_button = Button(
-        rect=(screen.get_width() // 2 - 100, 230, 200, 50),
-        text="Continue",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    menu_button = Button(
-        rect=(screen.get_width() // 2 - 100, 300, 200, 50),
-        text="Main Menu",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    options_button = Button(
-        rect=(screen.get_width() // 2 - 100, 370, 200, 50),
-        text="Options",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    instructions_button = Button(
-        rect=(screen.get_width() // 2 - 100, 440, 200, 50),
-        text="How to play",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    quit_button = Button(
-        rect=(screen.get_width() // 2 - 100, 510, 200, 50),
-        text="Exit Game",
-        font=font,
-        bg_color=(200, 50, 50),
-        text_color=(255, 255, 255),
-        hover_color=(255, 80, 80),
-    )
-
-    paused = True
-    while paused:
-
-        sounds = Sounds()
+    def update(self, ms: int) -> None:
+        if self.presenter.full_update:
+            self.draw_static()
+        draw_buttons([button for button, _ in self.buttons], self.presenter)
+        self.presenter.present()
+
+
+class MainMenuScene(MenuScene):
+    title = "Main Menu"
+
+    def __init__(self):
+        super().__init__()
+        self.add_button("Start Game", -100, 300, self.start_game)
+        self.add_button("Options", -100, 370, lambda: self.manager.push(OptionsScene()))
+        self.add_button(
+            "How to play", -100, 440, lambda: self.manager.push(InstructionsScene())
+        )
+        self.add_button(
+            "Level selection", -100, 510, lambda: self.manager.push(LevelSelectScene())
+        )
+        self.add_button("Exit Game", -100, 580, lambda: self.manager.quit(), "red")
+
+    def start_game(self) -> None:
+        start_scene(self.manager, lambda: CountdownScene(MatchScene()))
+
+
+class PauseScene(MenuScene):
+    title = "Paused"
+
+    def __init__(self):
+        super().__init__()
+        self.add_button("Continue", -100, 230, lambda: self.manager.pop())
+        self.add_button(
+            "Main Menu", -100, 300, lambda: self.manager.switch(MainMenuScene())
+        )
+        self.add_button("Options", -100, 370, lambda: self.manager.push(OptionsScene()))
+        self.add_button(
+            "How to play", -100, 440, lambda: self.manager.push(InstructionsScene())
+        )
+        self.add_button("Exit Game", -100, 510, lambda: self.manager.quit(), "red")
+
+    def enter(self) -> None:
+        super().enter()
         sounds.stop_all_sounds()
-        screen.fill((30, 30, 30))
 
-        title_font = pygame.font.SysFont(None, 80)  # große Schrift
-        title_surf = title_font.render("Paused", True, (255, 255, 255))
-        title_rect = title_surf.get_rect(center=(screen.get_width() // 2, 150))
-        screen.blit(title_surf, title_rect)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if continue_button.is_clicked(event):
-                paused = False
-            if menu_button.is_clicked(event):
-                main_menu()
-            if options_button.is_clicked(event):
-                options()
-            if instructions_button.is_clicked(event):
-                instructions_menu()
-            if quit_button.is_clicked(event):
-                pygame.quit()
-                sys.exit()
-
-        continue_button.draw(screen)
-        menu_button.draw(screen)
-        options_button.draw(screen)
-        instructions_button.draw(screen)
-        quit_button.draw(screen)
-
-        pygame.display.flip()
-        clock.tick(60)
-
-
-def options():
-    clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 40)
-
-    easy_button = Button(
-        rect=(screen.get_width() // 2 - 350, 300, 200, 50),
-        text="Easy",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    medium_button = Button(
-        rect=(screen.get_width() // 2 - 100, 300, 200, 50),
-        text="Medium",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    hard_button = Button(
-        rect=(screen.get_width() // 2 + 150, 300, 200, 50),
-        text="Hard",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    back_button = Button(
-        rect=(screen.get_width() // 2 - 100, 510, 200, 50),
-        text="Back",
-        font=font,
-        bg_color=(200, 50, 50),
-        text_color=(255, 255, 255),
-        hover_color=(255, 80, 80),
-    )
-
-    running = True
-    while running:
-        screen.fill((30, 30, 30))
 
-        draw_text(screen, "Options", 0, 150, 80, center=True)
+class OptionsScene(MenuScene):
+    title = "Options"
 
+    def __init__(self):
+        super().__init__()
+        self.add_button("Easy", -350, 300, lambda: None)
+        self.add_button("Medium", -100, 300, lambda: None)
+        self.add_button("Hard", 150, 300, lambda: None)
+        self.add_button("Back", -100, 510, lambda: self.manager.pop(), "red")
+
+    def draw_static(self) -> None:
+        super().draw_static()
         draw_text(screen, "Difficulty", 0, 250, 50, center=True)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if easy_button.is_clicked(event):
-                pass
-            if medium_button.is_clicked(event):
-                pass
-            if hard_button.is_clicked(event):
-                pass
-            if back_button.is_clicked(event):
-                return
-
-        easy_button.draw(screen)
-        medium_button.draw(screen)
-        hard_button.draw(screen)
-        back_button.draw(screen)
-
-        pygame.display.flip()
-        clock.tick(60)
-
-
-def level_selection():
-    clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 40)
-
-    start_button = Button(
-        rect=(screen.get_width() // 2 - 100, 400, 200, 50),
-        text="Start Game",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    level1_button = Button(
-        rect=(screen.get_width() // 2 - 250, 300, 200, 50),
-        text="Level 1",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    level2_button = Button(
-        rect=(screen.get_width() // 2 + 50, 300, 200, 50),
-        text="Level 2",
-        font=font,
-        bg_color=(20, 130, 200),
-        text_color=(255, 255, 255),
-        hover_color=(40, 160, 255),
-    )
-
-    back_button = Button(
-        rect=(screen.get_width() // 2 - 100, 570, 200, 50),
-        text="Back",
-        font=font,
-        bg_color=(200, 50, 50),
-        text_color=(255, 255, 255),
-        hover_color=(255, 80, 80),
-    )
-
-    running = True
-    while running:
-        screen.fill((30, 30, 30))
 
-        draw_text(screen, "Level Selection", 0, 150, 80, center=True)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if start_button.is_clicked(event):
-                game_loop()
-            if level1_button.is_clicked(event):
-                game_loop("test-level.txt")
-            if level2_button.is_clicked(event):
-                game_loop("test-level2.txt")
-            if back_button.is_clicked(event):
-                return
-
-        start_button.draw(screen)
-        level1_button.draw(screen)
-        level2_button.draw(screen)
-        back_button.draw(screen)
-
-        pygame.display.flip()
-        clock.tick(60)
-
-
-def instructions_menu():
-    font = pygame.font.SysFont(None, 40)
-
-    back_button = Button(
-        rect=(screen.get_width() // 2 - 100, 500, 200, 50),
-        text="Back",
-        font=font,
-        bg_color=(200, 50, 50),
-        text_color=(255, 255, 255),
-        hover_color=(255, 80, 80),
-    )
-
-    instructions = ["Game instructions here..."]
-
-    running = True
-    while running:
-        screen.fill((30, 30, 30))
-        draw_text(screen, "How to play", 0, 150, 80, center=True)
+class LevelSelectScene(MenuScene):
+    title = "Level Selection"
 
-        for i, line in enumerate(instructions):
-            draw_text(screen, line, 50, 200 + i * 35, 30)
+    def __init__(self, message: str = ""):
+        super().__init__()
+        self.message = message  # why the last level could not be started
+        self.add_button("Start Game", -100, 400, lambda: self.start_match())
+        self.add_button("Level 1", -250, 300, lambda: self.start_match("test-level.txt"))
+        self.add_button("Level 2", 50, 300, lambda: self.start_match("test-level2.txt"))
+        self.add_button(
+            "Mass Battle", -100, 470, lambda: start_scene(self.manager, BattleScene)
+        )
+        self.add_button("Back", -100, 570, lambda: self.manager.pop(), "red")
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if back_button.is_clicked(event):
-                return
+    def start_match(self, map_file: str | None = None) -> None:
+        start_scene(self.manager, lambda: CountdownScene(MatchScene(map_file)))
 
-        back_button.draw(screen)
+    def draw_static(self) -> None:
+        super().draw_static()
+        if self.message:
+            draw_text(screen, self.message, 0, 240, 30, (255, 80, 80), center=True)
 
-        pygame.display.flip()
-        clock.tick(60)
 
+class InstructionsScene(MenuScene):
+    title = "How to play"
 
-def countdown(surface, camera, map_renderer, robot_renderer, robots, player):
-    font = pygame.font.SysFont(None, 150)
-    countdown_numbers = ["3", "2", "1", "GO!"]
+    def __init__(self):
+        super().__init__()
+        self.instructions = ["Game instructions here..."]
+        self.add_button("Back", -100, 500, lambda: self.manager.pop(), "red")
 
-    sounds = Sounds()
-    sounds.play_sound("countdown_sound")
+    def draw_static(self) -> None:
+        super().draw_static()
+        for i, line in enumerate(self.instructions):
+            draw_text(screen, line, 50, 200 + i * 35, 30)
 
-    # player can see whole arena during countdown
-    camera.zoom = 0.5
 
-    for count in countdown_numbers:
+class CountdownScene(Scene):
+    numbers = ["3", "2", "1", "GO!"]  # one per second
+
+    def __init__(self, match: "MatchScene"):
+        """Shows the arena of the match with a countdown, then starts the match"""
+        self.match = match
+        self.presenter = Presenter(screen, texture_backend)
+        self.elapsed = 0  # ms since the countdown started
+        self.shown = -1  # index of the number on the screen
+        self.started = False  # whether the match was started
+
+    def enter(self) -> None:
+        sounds.play_sound("countdown_sound")
+        # player can see whole arena during countdown
+        self.match.camera.zoom = 0.5
+
+    def update(self, ms: int) -> None:
+        self.elapsed += ms
+        index = self.elapsed // 1000
+        if index >= len(self.numbers):
+            self.started = True
+            self.manager.replace(self.match)
+            return
+        if index == self.shown:
+            return
+        self.shown = index
+
+        camera = self.match.camera
         camera.surface.fill((0, 0, 0))
-        map_renderer.draw_map(camera)
-
-        for robot in robots:
-            robot_renderer.draw(robot, camera, 0)
+        self.match.map_renderer.draw_map(camera)
+        for robot in self.match.robots:
+            self.match.robot_renderer.draw(robot, camera, 0)
 
-        text_surface = font.render(count, True, (255, 255, 255))
+        text_surface = get_font(None, 150).render(
+            self.numbers[index], True, (255, 255, 255)
+        )
         text_rect = text_surface.get_rect(
-            center=(surface.get_width() // 2, surface.get_height() // 2)
+            center=(screen.get_width() // 2, screen.get_height() // 2)
+        )
+        self.presenter.mark_full()
+        self.presenter.present_camera(camera, [])
+        self.presenter.mark_dirty(screen.blit(text_surface, text_rect))
+        self.presenter.present()
+
+    def exit(self) -> None:
+        if not self.started:
+            self.match.exit()  # left before the match started (e.g. quit)
+
+
+class MatchScene(Scene):
+    def __init__(self, map_file: str | None = None):
+        """The player against three enemies on a level"""
+        if map_file is None:
+            map_file = "test-level.txt"
+        self.map_file = map_file
+
+        # Map setup
+        self.game_map = load_map(map_file)
+        map_width_px = self.game_map.cols * config.TILE_SIZE
+        map_height_px = self.game_map.rows * config.TILE_SIZE
+
+        # Camera setup
+        self.camera = Camera(window_width, window_height, map_width_px, map_height_px)
+
+        renderer = texture_backend.renderer if texture_backend else None
+        self.map_renderer = get_map_renderer(self.game_map, self.camera.surface, renderer)
+        self.walls: list[pygame.Rect] = self.game_map.walls()
+
+        # Robot setup
+        self.robot_renderer = get_robot_renderer(self.camera.surface)
+        robot_size = int(config.TILE_SIZE * 1.3)
+        # sounds of all robots are collected and played once per frame
+        self.audio = AudioQueue(sounds, self.camera)
+        spawn_positions = get_spawn_service(self.game_map).generate_spawn_positions(
+            4, get_hitbox_rect(0, 0, robot_size)
+        )
+        zoom = self.camera.zoom
+        self.player = Robot(
+            self.camera.surface,
+            *spawn_positions[0],
+            robot_size,
+            0,
+            (255, 255, 255),
+            4 * zoom,
+            6 * zoom,
+            True,
+            "Spider",
+            self.audio,
+        )
+        enemy1 = Robot(
+            self.camera.surface,
+            *spawn_positions[1],
+            robot_size,
+            0,
+            (0, 100, 190),
+            4 * zoom,
+            6 * zoom,
+            False,
+            "Spider",
+            self.audio,
+        )
+        enemy2 = Robot(
+            self.camera.surface,
+            *spawn_positions[2],
+            robot_size,
+            50,
+            (255, 50, 120),
+            4 * zoom,
+            6 * zoom,
+            False,
+            "Spider",
+            self.audio,
+        )
+        enemy3 = Robot(
+            self.camera.surface,
+            *spawn_positions[3],
+            robot_size,
+            50,
+            (0, 250, 0),
+            4 * zoom,
+            6 * zoom,
+            False,
+            "Tank",
+            self.audio,
         )
-        surface.blit(camera.surface, (0, 0))
-        surface.blit(text_surface, text_rect)
-        pygame.display.flip()
-
-        # wait one second
-        pygame.time.delay(1000)
-
-
-def game_loop(map_file: str | None = None):
-    if map_file is None:
-        map_file = "test-level.txt"
-
-    # Map setup
-    game_map = Map(map_file)
-    map_data = game_map.get_map_data()
-    map_width_px = len(map_data[0]) * config.TILE_SIZE
-    map_height_px = len(map_data) * config.TILE_SIZE
-
-    # Camera setup
-    camera_width = window_width
-    camera_height = window_height
-    camera = Camera(camera_width, camera_height, map_width_px, map_height_px)
-
-    map_renderer = MapRenderer(camera.surface, config.TEXTURES)
-    map_renderer.draw_map_picture(game_map.get_map_data())
-    walls: list[pygame.Rect] = game_map.walls()
-
-    # Robot setup
-    robot_renderer = RobotRenderer(camera.surface)
-    spawn_positions = game_map.generate_spawn_positions()
-    robot_size = int(config.TILE_SIZE * 1.3)
-    player = Robot(
-        camera.surface,
-        *spawn_positions[0],
-        robot_size,
-        0,
-        (255, 255, 255),
-        4 * camera.zoom,
-        6 * camera.zoom,
-        True,
-        "Spider",
-    )
-    enemy1 = Robot(
-        camera.surface,
-        *spawn_positions[1],
-        robot_size,
-        0,
-        (0, 100, 190),
-        4 * camera.zoom,
-        6 * camera.zoom,
-        False,
-        "Spider",
-    )
-    enemy2 = Robot(
-        camera.surface,
-        *spawn_positions[2],
-        robot_size,
-        50,
-        (255, 50, 120),
-        4 * camera.zoom,
-        6 * camera.zoom,
-        False,
-        "Spider",
-    )
-    enemy3 = Robot(
-        camera.surface,
-        *spawn_positions[3],
-        robot_size,
-        50,
-        (0, 250, 0),
-        4 * camera.zoom,
-        6 * camera.zoom,
-        False,
-        "Tank",
-    )
-    robots: list[Robot] = [player, enemy1, enemy2, enemy3]
-
-    # Bullet and movement setup
-    bullets: list[Bullet] = []
-    enemy_behaviour_tick: int = 0
-
-    # show countdown before game starts
-    countdown(screen, camera, map_renderer, robot_renderer, robots, player)
-
-    running = True
-
-    # run game
-    while running:
-        dt = clock.tick(60) / 300  # animation speed
+        self.robots: list[Robot] = [self.player, enemy1, enemy2, enemy3]
+
+        # Bullet and movement setup
+        self.bullets: list[Bullet] = []
+        # robots and bullets sorted into cells for the collision checks
+        self.grid = SpatialHash(2 * config.TILE_SIZE)
+        self.grid.rebuild("robot", self.robots, robot_size)
+
+        # enemies pick their goals in worker processes (or spread over the frames),
+        # started when the countdown is over
+        self.ai_scheduler = None
+        # scene shown after the match and the ms until then
+        self.result: Scene | None = None
+        self.result_delay = 0
+        # far away enemies are updated less often
+        self.lod = SimulationLOD()
+
+        self.presenter = Presenter(screen, texture_backend)
+        self.final_presenter = Presenter(screen, texture_backend)  # last frame
+        self.profiler = Profiler()
+
+    def enter(self) -> None:
+        if self.ai_scheduler is None:  # first frame after the countdown
+            enemies = [robot for robot in self.robots if robot is not self.player]
+            self.ai_scheduler = create_ai(self.game_map)
+            self.ai_scheduler.start(enemies, pygame.time.get_ticks())
+            self.lod.start(enemies)
+        self.presenter.mark_full()
+
+    def exit(self) -> None:
+        """Stop the AI workers and sounds, forget the animation state of the robots"""
+        if self.ai_scheduler is not None:
+            self.ai_scheduler.close()
+        self.audio.stop_all_sounds()
+        self.robot_renderer.forget_robots()
+
+    def restart(self) -> Scene:
+        return CountdownScene(MatchScene(self.map_file))
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.manager.push(PauseScene())
+            if event.key == pygame.K_F3:
+                self.profiler.toggle()
+                self.presenter.mark_full()
+
+    def show_final_frame(self) -> None:
+        """Render everything one last time, so that the result can be seen"""
+        camera = self.camera
+        camera.follow_dynamic_center(self.robots, self.player)
+        camera.surface.fill((0, 0, 0))
+        self.map_renderer.draw_map(camera)
+
+        for robot in self.robots:
+            self.robot_renderer.draw(robot, camera, 0)
+
+        self.final_presenter.mark_full()
+        self.final_presenter.present_camera(camera, [])
+        self.final_presenter.present()
+
+    def update(self, ms: int) -> None:
+        if self.result is not None:
+            # short break, so that you can hear the sound of getting shot or lava
+            self.result_delay -= ms
+            if self.result_delay <= 0:
+                self.manager.replace(self.result)
+            return
+
+        dt = ms / 300  # animation speed
+        camera = self.camera
+        player = self.player
+        robots = self.robots
+        bullets = self.bullets
+        grid = self.grid
+        game_map = self.game_map
+        map_renderer = self.map_renderer
+        robot_renderer = self.robot_renderer
         camera.follow_dynamic_center(robots, player)
 
-        # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                sounds = Sounds()
-                sounds.stop_all_sounds()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    pause_menu()
+        # regions of robots, bullets and overlays drawn in this frame
+        entity_rects: list[pygame.Rect] = []
+        culled_robots = 0  # robots outside of the view (not drawn)
+        culled_bullets = 0
 
         # Drawing background
         camera.surface.fill((0, 0, 0))
         map_renderer.draw_map(camera)
 
-        # Timing logic
-        ticks = pygame.time.get_ticks()
+        # Enemy goals: new goal every 3 seconds per enemy (staggered)
+        self.ai_scheduler.update(pygame.time.get_ticks(), game_map, robots)
+        self.lod.next_frame()
 
-        # Enemy behavior update every 3 seconds
-        if ticks > enemy_behaviour_tick:
-            enemy_behaviour_tick += 3000  # 3 sec
-            goals: list[Robot | None] = []
-            for robot in robots:
-                if robot is player:
-                    continue
-                goals.append(robot.get_robot_with_distance_prob(game_map, robots))
-        for robot in robots:
+        for robot in list(robots):  # destroyed robots are removed in the loop
             if robot is player:  # player
-                player.update_player(robots, game_map, walls, bullets, camera)
+                player.update_player(
+                    robots, game_map, self.walls, bullets, camera, grid
+                )
                 if player.hp <= 0:
                     player.hp = 0  # set to 0, so it does not show a negativ number
-
-                    # render everything one last time, so that you can see, that hp is 0
-                    camera.follow_dynamic_center(robots, player)
-                    camera.surface.fill((0, 0, 0))
-                    map_renderer.draw_map(camera)
-
-                    for robot in robots:
-                        robot_renderer.draw(robot, camera, 0)
-
-                    screen.blit(camera.surface, (0, 0))
-                    pygame.display.flip()
-
-                    # short break, so that you can hear the sound of getting shot or lava
-                    pygame.time.delay(900)
-
-                    # call gameover function
-                    gameover(camera, map_renderer, robot_renderer, robots, player)
+                    self.show_final_frame()
+                    self.audio.flush()
+                    self.result = GameOverScene(self)
+                    self.result_delay = 900
+                    return
             else:  # enemies
-                robot.update_enemy(
-                    goals[robots.index(robot) - 1],
-                    robots,
-                    game_map,
-                    walls,
-                    bullets,
-                    camera,
-                )
+                band = self.lod.band(robot, player, camera)
+                steps = self.lod.steps(robot, band)
+                if steps:
+                    robot.update_enemy(
+                        self.ai_scheduler.goals.get(robot),
+                        robots,
+                        game_map,
+                        self.walls,
+                        bullets,
+                        camera,
+                        self.ai_scheduler.hiding_spots.get(robot),
+                        steps,
+                        full_detail=band == 0,
+                        grid=grid,
+                    )
+                else:
+                    robot.getting_shot(bullets, grid)  # hits are checked every frame
                 if robot.hp <= 0:
                     robots.remove(robot)
+                    grid.remove(robot)
+                    self.ai_scheduler.remove(robot)
+                    self.lod.remove(robot)
+                    robot_renderer.forget_robot(robot)
                     if len(robots) <= 1:
-                        # render everything one last time, so that you can see,
-                        # that all enemies are gone
-                        camera.follow_dynamic_center(robots, player)
-                        camera.surface.fill((0, 0, 0))
-                        map_renderer.draw_map(camera)
-
-                        for robot in robots:
-                            robot_renderer.draw(robot, camera, 0)
-
-                        screen.blit(camera.surface, (0, 0))
-                        pygame.display.flip()
-                        victory(camera, map_renderer, robot_renderer, robots, player)
+                        self.show_final_frame()
+                        self.manager.replace(VictoryScene(self))
+                        return
+                    continue
+            grid.move(robot)  # the next robots see its new position
 
-            # draw robot
-            robot_renderer.draw(robot, camera, dt)
+            # draw robot (and its animation) only if it is in the view
+            if not robot_renderer.is_visible(robot, camera):
+                culled_robots += 1
+                continue
+            entity_rects.append(robot_renderer.draw(robot, camera, dt))
 
             # draw bush overlay effect (if robot is next to a bush)
             if robot.in_bush:
-                for i, j in robot.bush_tiles:
-                    texture = config.TEXTURES["bush"]
-                    tile_size = int(config.TILE_SIZE * camera.zoom)
-                    tile = pygame.transform.scale(texture, (tile_size, tile_size))
-
-                    camera.surface.blit(
-                        tile, camera.apply(i * config.TILE_SIZE, j * config.TILE_SIZE)
-                    )
+                entity_rects.extend(
+                    map_renderer.draw_bush_overlay(robot.bush_tiles, camera)
+                )
 
         # Bullet updates
         for bullet in bullets:
-            bullet.update_bullet(game_map, camera)
-            if not bullet.alive:
-                bullets.remove(bullet)
-
-        screen.blit(camera.surface, (0, 0))
-        pygame.display.flip()
-
-    pygame.quit()
-    sys.exit()
-
-
-def gameover(camera, map_renderer, robot_renderer, robots, player):
-    sounds = Sounds()
-    sounds.stop_all_sounds()
-    sounds.play_sound("gameover_sound")
+            bullet.update_bullet(game_map, camera, draw=False)
+            if bullet.alive:
+                grid.move(bullet)
+            else:
+                grid.remove(bullet)
+            if not camera.is_visible(bullet.x, bullet.y, bullet.radius / camera.zoom):
+                culled_bullets += 1
+            elif texture_backend:
+                entity_rects.append(texture_backend.draw_bullet(bullet, camera))
+            else:
+                entity_rects.append(bullet.draw_bullet(camera))
+        # in place, the robots append their shots to this list
+        bullets[:] = [bullet for bullet in bullets if bullet.alive]
+
+        # play the sounds of this frame
+        self.audio.flush()
+
+        # show only the changed regions if the camera did not move
+        self.presenter.present_camera(camera, entity_rects)
+        profiler = self.profiler
+        profiler.set("robots drawn", len(robots) - culled_robots)
+        profiler.set("robots culled", culled_robots)
+        profiler.set("bullets drawn", len(bullets) - culled_bullets)
+        profiler.set("bullets culled", culled_bullets)
+        for name, value in self.lod.stats().items():
+            profiler.set(name, value)
+        profiler_rect = profiler.draw(screen)
+        if profiler_rect:
+            self.presenter.mark_dirty(profiler_rect)
+        self.presenter.present()
+        profiler.end_frame()
+
+
+class BattleScene(Scene):
+    def __init__(self, map_file: str = "battle-arena.txt"):
+        """Mass battle: config.BATTLE_ROBOTS robots in teams, stored in a BattleWorld"""
+        self.map_file = map_file
+        game_map = load_map(map_file)
+        self.camera = Camera(
+            window_width,
+            window_height,
+            game_map.cols * config.TILE_SIZE,
+            game_map.rows * config.TILE_SIZE,
+        )
 
-    running = True
-    while running:
-        if player:
-            camera.follow_dynamic_center(robots, player)
-        camera.surface.fill((0, 0, 0))
-        map_renderer.draw_map(camera)
+        renderer = texture_backend.renderer if texture_backend else None
+        self.map_renderer = get_map_renderer(game_map, self.camera.surface, renderer)
+        self.robot_renderer = get_robot_renderer(self.camera.surface)
+
+        self.world = BattleWorld(game_map)
+        self.world.spawn_robots(
+            config.BATTLE_ROBOTS,
+            config.BATTLE_TEAMS,
+            int(config.TILE_SIZE * 1.3),
+            4 * self.camera.zoom,
+            6 * self.camera.zoom,
+        )
+        self.player = self.world.views[0]
+        self.robots = []  # robots in the view (drawn in the last frame)
 
-        for robot in robots:
-            robot_renderer.draw(robot, camera, 0)
+        self.presenter = Presenter(screen, texture_backend)
+        self.profiler = Profiler()
 
-        draw_text(screen, "GAME OVER", 0, 200, 100, center=True)
+    def enter(self) -> None:
+        self.presenter.mark_full()
 
-        draw_text(
-            screen,
-            "Press ESC to return to Main Menu or press ENTER to restart",
-            0,
-            250,
-            50,
-            center=True,
-        )
+    def exit(self) -> None:
+        self.robot_renderer.forget_robots()
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    main_menu()
-                elif event.key == pygame.K_RETURN:
-                    game_loop()
+    def restart(self) -> Scene:
+        return BattleScene(self.map_file)
 
-        pygame.display.flip()
-        clock.tick(60)
+    def handle_event(self, event: pygame.event.Event) -> None:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.manager.push(PauseScene())
+            if event.key == pygame.K_F3:
+                self.profiler.toggle()
+                self.presenter.mark_full()
 
+    def update(self, ms: int) -> None:
+        dt = ms / 300  # animation speed
+        camera = self.camera
+        world = self.world
+        player = self.player
+        step(world, pygame.time.get_ticks(), pygame.key.get_pressed())
+        camera.follow_dynamic_center([], player)
 
-def victory(camera, map_renderer, robot_renderer, robots, player):
+        camera.surface.fill((0, 0, 0))
+        self.map_renderer.draw_map(camera)
+
+        # only the robots and bullets in view are drawn
+        view = camera.view_rect()
+        margin = self.robot_renderer.cull_margin(player, camera)  # same size for all
+        self.robots = world.robots_in_rect(view.inflate(margin * 2, margin * 2))
+        entity_rects: list[pygame.Rect] = []
+        for robot in self.robots:
+            entity_rects.append(self.robot_renderer.draw(robot, camera, dt))
+            if robot.in_bush:
+                entity_rects.extend(
+                    self.map_renderer.draw_bush_overlay(robot.bush_tiles, camera)
+                )
 
-    sounds = Sounds()
-    sounds.stop_all_sounds()
-    sounds.play_sound("win_sound")
+        radius = int(BULLET_RADIUS * camera.zoom)
+        bullets = world.bullets_in_rect(view.inflate(radius * 2, radius * 2))
+        for x, y in bullets:
+            center = camera.apply(int(x), int(y))
+            if texture_backend:
+                entity_rects.append(
+                    texture_backend.draw_circle(BULLET_COLOR, radius, center)
+                )
+            else:
+                entity_rects.append(
+                    pygame.draw.circle(camera.surface, BULLET_COLOR, center, radius)
+                )
 
-    running = True
-    while running:
-        if player:
-            camera.follow_dynamic_center(robots, player)
-        camera.surface.fill((0, 0, 0))
-        map_renderer.draw_map(camera)
+        self.presenter.present_camera(camera, entity_rects)
+        profiler = self.profiler
+        alive = sum(world.alive)
+        profiler.set("robots drawn", len(self.robots))
+        profiler.set("robots culled", alive - len(self.robots))
+        profiler.set("bullets drawn", len(bullets))
+        profiler.set("bullets culled", len(world.bullet_x) - len(bullets))
+        profiler_rect = profiler.draw(screen)
+        if profiler_rect:
+            self.presenter.mark_dirty(profiler_rect)
+        self.presenter.present()
+        profiler.end_frame()
+
+        if not player.alive:
+            player.hp = 0  # set to 0, so it does not show a negativ number
+            self.manager.replace(GameOverScene(self))
+        elif world.teams_alive() == {player.team}:
+            self.manager.replace(VictoryScene(self))
+
+
+class ResultScene(Scene):
+    title = ""
+    sound = ""
+
+    def __init__(self, match: MatchScene | BattleScene):
+        """Last frame of a match with the result, ENTER starts the match again"""
+        self.match = match
+        self.presenter = Presenter(screen, texture_backend)
+
+    def enter(self) -> None:
+        sounds.stop_all_sounds()
+        sounds.play_sound(self.sound)
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.manager.switch(MainMenuScene())
+            elif event.key == pygame.K_RETURN:
+                start_scene(self.manager, self.match.restart)
+
+    def update(self, ms: int) -> None:
+        camera = self.match.camera
+        if self.match.player:
+            camera.follow_dynamic_center(self.match.robots, self.match.player)
+
+        # the screen only changes while the camera is still moving
+        if self.presenter.camera_moved(camera):
+            camera.surface.fill((0, 0, 0))
+            self.match.map_renderer.draw_map(camera)
+
+            for robot in self.match.robots:
+                self.match.robot_renderer.draw(robot, camera, 0)
+
+            self.presenter.present_camera(camera, [])
+
+            self.presenter.mark_dirty(
+                draw_text(screen, self.title, 0, 200, 100, center=True)
+            )
+            self.presenter.mark_dirty(
+                draw_text(
+                    screen,
+                    "Press ESC to return to Main Menu or press ENTER to restart",
+                    0,
+                    250,
+                    50,
+                    center=True,
+                )
+            )
 
-        for robot in robots:
-            robot_renderer.draw(robot, camera, 0)
+        self.presenter.present()
 
-        draw_text(screen, "VICTORY", 0, 200, 100, center=True)
 
-        draw_text(
-            screen,
-            "Press ESC to return to Main Menu or press ENTER to restart",
-            0,
-            250,
-            50,
-            center=True,
-        )
+class GameOverScene(ResultScene):
+    title = "GAME OVER"
+    sound = "gameover_sound"
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    main_menu()
-                elif event.key == pygame.K_RETURN:
-                    game_loop()
 
-        pygame.display.flip()
-        clock.tick(60)
+class VictoryScene(ResultScene):
+    title = "VICTORY"
+    sound = "win_sound"
 
 
-main_menu()
+if __name__ == "__main__":
+    SceneManager(clock).run(MainMenuScene())
+    stop_workers()
+    pygame.quit()
+    sys.exit()
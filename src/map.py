@@ -1,156 +1,427 @@
 from typing import List, Tuple
+import math
 import pygame
 import config
+from array import array
+from functools import cached_property
+from itertools import accumulate
 from pathlib import Path
-from math import sqrt, ceil
-from random import randint
 from fallback_map import get_fallback_map
 
+# Tile types by tile code, the map stores one code (byte) per tile
+TILE_TYPES: list[str] = ["ground", "wall", "lava", "ice", "sand", "bush"]
+TILE_CODES: dict[str, int] = {tile: code for code, tile in enumerate(TILE_TYPES)}
+
+# Effects of the tiles on robots, one bit each (a tile can have several)
+EFFECT_SLOW = 1  # sand
+EFFECT_FAST = 2  # ice
+EFFECT_HAZARD = 4  # lava
+EFFECT_COVER = 8  # bush
+EFFECT_SOLID = 16  # wall
+TILE_EFFECTS: dict[str, int] = {
+    "ground": 0,
+    "wall": EFFECT_SOLID,
+    "lava": EFFECT_HAZARD,
+    "ice": EFFECT_FAST,
+    "sand": EFFECT_SLOW,
+    "bush": EFFECT_COVER,
+}
+# translates tile codes to effects (bytes.translate)
+EFFECT_TABLE = bytes(TILE_EFFECTS[tile] for tile in TILE_TYPES) + bytes(
+    256 - len(TILE_TYPES)
+)
+
+
+# tile codes of a footprint -> its effects, the same few footprints repeat a lot
+combined_effects: dict[bytes, int] = {}
+
+
+def combine_effects(codes: bytes) -> int:
+    """Effects of all the given tile codes (OR of their bits)"""
+    effects = combined_effects.get(codes)
+    if effects is None:
+        effects = 0
+        for effect in codes.translate(EFFECT_TABLE):
+            effects |= effect
+        if len(combined_effects) > 4096:  # keep the cache small
+            combined_effects.clear()
+        combined_effects[codes] = effects
+    return effects
+
+
+# Lookup table to translate the bytes of a level file to tile codes
+# (invalid characters become ground)
+CHAR_TO_TILE: dict[str, str] = {
+    "g": "ground",
+    "w": "wall",
+    "l": "lava",
+    "i": "ice",
+    "s": "sand",
+    "b": "bush",
+}
+CHAR_TABLE = bytearray(256)  # all zeros = ground
+for char, tile in CHAR_TO_TILE.items():
+    CHAR_TABLE[ord(char)] = TILE_CODES[tile]
+CHAR_TABLE = bytes(CHAR_TABLE)
+
+
+class MapFormatError(ValueError):
+    """Invalid level file, with the line and column (1-based) of the problem"""
+
+    def __init__(self, message: str, line: int, column: int):
+        super().__init__(f"line {line}, column {column}: {message}")
+        self.line = line
+        self.column = column
+
 
 class Map:
-    def __init__(self, file_path: str | None = None, player_count: int = 4):
-        """Initializes the map with default player-size and optional file input"""
+    def __init__(
+        self,
+        file_path: str | None = None,
+        player_count: int = 4,
+        compiled: dict | None = None,
+    ):
+        """Initializes the map with default player-size and optional file input
+        (or from already compiled map data, see map_compiler.py)"""
         self.player_count = player_count
         self.file_path = file_path
-        self.rows = config.ROWS
-        self.cols = config.COLUMNS
+        self.wall_rects: List[pygame.Rect] = []  # wall Rects for wall_rects_size
+        self.wall_rects_size = 0  # TILE_SIZE the wall Rects were created for
+        self.cache_key: str | None = None  # set if loaded by map_compiler
+        self.spawn_service = None  # created by spawn_service.get_spawn_service
+        # created by configuration_space.get_configuration_space
+        self.configuration_spaces: dict = {}
+        self.edits = 0  # number of tiles changed by set_tile
+        self.summed_areas: dict[int, array] = {}  # see summed_area_table
+        self.areas: dict[tuple[str, int, int], List[Tuple[int, int]]] = {}  # find_areas
 
-        # Initialize map with a basic layout (outer walls, ground inside)
-        self.map_data = self.initialize_map()
+        if compiled is not None:
+            self.load_compiled(compiled)
+            return
 
         # If a file path is provided: load from file, otherwise use the fallback map
         try:
-            inner_map = self.get_inner_map()
+            loaded = self.read_map_file()
         except FileNotFoundError:
             print(f"Warning: file {self.file_path} not found. Using fallback map.")
-            inner_map = get_fallback_map()
-        if inner_map is None:
+            loaded = self.create_map(get_fallback_map())
+        if loaded is None:
             print("Warning: No file. Using fallback map.")
-            inner_map = get_fallback_map()
-
-        self.create_map(inner_map)
-
-    def initialize_map(self) -> list[list[str]]:
-        """Creates an empty map with walls around and ground inside"""
-        map_data = []
-        for y in range(self.rows):
-            row = []
-            for x in range(self.cols):
-                is_border = x == 0 or x == self.cols - 1 or y == 0 or y == self.rows - 1
-                tile = "wall" if is_border else "ground"
-                row.append(tile)
-            map_data.append(row)
-        return map_data
-
-    def get_inner_map(self) -> List[List[str]] | None:
-        """Read map file and convert characters to tile types"""
-        if not self.file_path:
-            return None
-        with open(Path(self.file_path), "r", encoding="utf-8") as file:
-            lines = file.readlines()
-
-        if len(lines) != self.rows - 2:
-            raise ValueError(f"The file must have exactly {self.rows - 2} rows.")
-
-        char_to_tile = {
-            "g": "ground",
-            "w": "wall",
-            "l": "lava",
-            "i": "ice",
-            "s": "sand",
-            "b": "bush",
+            loaded = self.create_map(get_fallback_map())
+
+        # Tile codes row by row (including the outer walls)
+        self.tiles: bytearray
+        self.tiles, self.rows, self.cols = loaded
+
+    @cached_property
+    def wall_tiles(self) -> List[Tuple[int, int]]:
+        """All wall tiles (col, row) of the map"""
+        return self.find_tiles(TILE_CODES["wall"])
+
+    @cached_property
+    def bush_tiles(self) -> List[Tuple[int, int]]:
+        """All bush tiles (col, row) of the map"""
+        return self.find_tiles(TILE_CODES["bush"])
+
+    @cached_property
+    def valid_spawn_tiles(self) -> List[Tuple[int, int]]:
+        """All tiles (col, row) without wall, lava or bush away from the border"""
+        spawn_tiles = []
+        for tile in ("ground", "ice", "sand"):
+            spawn_tiles += [
+                (x, y)
+                for x, y in self.find_tiles(TILE_CODES[tile])
+                if 2 <= x <= self.cols - 3 and 2 <= y <= self.rows - 3
+            ]
+        spawn_tiles.sort(key=lambda tile: (tile[1], tile[0]))
+        return spawn_tiles
+
+    @cached_property
+    def tile_effects(self) -> bytes:
+        """Effect bits of every tile, row by row like tiles"""
+        return bytes(self.tiles).translate(EFFECT_TABLE)
+
+    def footprint_effects(
+        self, first_col: int, last_col: int, first_row: int, last_row: int
+    ) -> int:
+        """Effects of all tiles in the range (tiles outside of the map have none)"""
+        first_col = max(first_col, 0)
+        last_col = min(last_col, self.cols - 1)
+        tile_effects = self.tile_effects
+        effects = 0
+        for row in range(max(first_row, 0), min(last_row, self.rows - 1) + 1):
+            start = row * self.cols
+            for effect in tile_effects[start + first_col:start + last_col + 1]:
+                effects |= effect
+        return effects
+
+    def find_tiles(self, code: int) -> List[Tuple[int, int]]:
+        """Return all tiles (col, row) with the given tile code"""
+        found = []
+        index = self.tiles.find(code)
+        while index != -1:
+            found.append((index % self.cols, index // self.cols))
+            index = self.tiles.find(code, index + 1)
+        return found
+
+    def to_compiled(self) -> dict:
+        """Return the parsed map as plain data (used to cache compiled maps)"""
+        return {
+            "rows": self.rows,
+            "cols": self.cols,
+            "tiles": bytes(self.tiles),
+            "wall_tiles": self.wall_tiles,
+            "bush_tiles": self.bush_tiles,
+            "valid_spawn_tiles": self.valid_spawn_tiles,
         }
 
-        map_data: List[List[str]] = []
-        for line in lines:
-            line = line.rstrip("\n")
-            if len(line) != self.cols - 2:
-                raise ValueError(
-                    f"Each line must have exactly {self.cols - 2} columns."
-                )
+    def load_compiled(self, compiled: dict) -> None:
+        """Take over the plain data created by to_compiled"""
+        self.rows = compiled["rows"]
+        self.cols = compiled["cols"]
+        self.tiles = bytearray(compiled["tiles"])
+        self.wall_tiles = compiled["wall_tiles"]
+        self.bush_tiles = compiled["bush_tiles"]
+        self.valid_spawn_tiles = compiled["valid_spawn_tiles"]
 
-            row = []
-            for char in line:
-                if char in char_to_tile:
-                    row.append(char_to_tile[char])
-                else:
-                    row.append("ground")  # fill with ground if invalid char
-            map_data.append(row)
+    def read_map_file(self) -> Tuple[bytearray, int, int] | None:
+        """
+        Read the map file line by line and translate it to tile codes
+        Returns the tile codes with outer walls, the number of rows and columns
+        """
+        if not self.file_path:
+            return None
 
-        return map_data
+        wall = TILE_CODES["wall"]
+        tiles = bytearray()
+        inner_cols = 0
+        line_number = 0
+        with open(Path(self.file_path), "rb") as file:
+            for line_number, line in enumerate(file, start=1):
+                line = line.rstrip(b"\r\n")
+                if not line.isascii():
+                    # one column per character, unknown characters are ground
+                    line = line.decode("utf-8", "replace").encode("ascii", "replace")
+                if line_number == 1:
+                    if not line:
+                        raise MapFormatError("The first row must not be empty.", 1, 1)
+                    inner_cols = len(line)
+                    tiles += bytes([wall]) * (inner_cols + 2)  # top wall
+                if len(line) != inner_cols:
+                    raise MapFormatError(
+                        f"Each line must have exactly {inner_cols} columns.",
+                        line_number,
+                        min(len(line), inner_cols) + 1,
+                    )
+                tiles.append(wall)
+                tiles += line.translate(CHAR_TABLE)
+                tiles.append(wall)
 
-    def create_map(self, inner_map: list[list[str]]) -> None:
+        if line_number == 0:
+            raise MapFormatError("The file must contain at least one row.", 1, 1)
+        tiles += bytes([wall]) * (inner_cols + 2)  # bottom wall
+        return tiles, line_number + 2, inner_cols + 2
+
+    def create_map(self, inner_map: list[list[str]]) -> Tuple[bytearray, int, int]:
         """
-        Fill the central part of self.map_data with the given inner_map
+        Create the tile codes of the given inner_map surrounded by walls
+        Returns the tile codes, the number of rows and columns
         """
-        for y in range(len(inner_map)):
-            for x in range(len(inner_map[0])):
-                self.map_data[y + 1][x + 1] = inner_map[y][x]
-                # fill map_data with inner_map (offset by one)
+        wall = TILE_CODES["wall"]
+        cols = len(inner_map[0]) + 2
+        tiles = bytearray([wall]) * cols  # top wall
+        for row in inner_map:
+            tiles.append(wall)
+            tiles += bytes(TILE_CODES[tile] for tile in row)
+            tiles.append(wall)
+        tiles += bytearray([wall]) * cols  # bottom wall
+        return tiles, len(inner_map) + 2, cols
 
     def tile_to_pixel(self, x: int, y: int) -> Tuple[int, int]:
         """Convert tile (col, row) to pixel (x, y)
-        (Used in generate_spawn_positions)"""
+        (Used for spawn positions)"""
         px = x * config.TILE_SIZE + config.TILE_SIZE // 2
         py = y * config.TILE_SIZE + config.TILE_SIZE // 2
         return (px, py)
 
-    def generate_spawn_positions(self) -> List[Tuple[int, int]]:
-        """Generate spawn positions (pixels) avoiding invalid tiles"""
-        spawn_positions: List[Tuple[int, int]] = []
-        spawn_tiles: List[Tuple[int, int]] = []
-
-        min_col_dist = ceil(self.cols / self.player_count)
-        min_row_dist = ceil(self.rows / self.player_count)
-        min_euclidean_dist = sqrt(min_col_dist**2 + min_row_dist**2)
-
-        while len(spawn_tiles) < self.player_count:
-            col = randint(2, self.cols - 3)
-            row = randint(2, self.rows - 3)
-
-            if self.map_data[row][col] in ("wall", "lava", "bush"):
-                continue
-
-            too_close = False
-            for (
-                c,
-                r,
-            ) in (
-                spawn_tiles
-            ):  # Skip distance check for Player 0 (no previous spawns yet)
-                dist = sqrt((col - c) ** 2 + (row - r) ** 2)
-                if dist < min_euclidean_dist:
-                    too_close = True
-                    break
-
-            if not too_close:
-                spawn_tiles.append((col, row))
-                px, py = self.tile_to_pixel(col, row)
-                spawn_positions.append((px, py))
-
-        return spawn_positions
-
     def walls(self) -> List[pygame.Rect]:
         """Return all wall tiles as pygame.Rects for collision check"""
-        wall_rects = []
-        for y in range(len(self.map_data)):
-            for x in range(len(self.map_data[0])):
-                if self.map_data[y][x] == "wall":
-                    rect = pygame.Rect(
-                        x * config.TILE_SIZE,
-                        y * config.TILE_SIZE,
-                        config.TILE_SIZE,
-                        config.TILE_SIZE,
-                    )
-                    wall_rects.append(rect)
-        return wall_rects
+        # Rects only have to be created again if the TILE_SIZE changed
+        if self.wall_rects_size != config.TILE_SIZE:
+            self.wall_rects = [
+                pygame.Rect(
+                    x * config.TILE_SIZE,
+                    y * config.TILE_SIZE,
+                    config.TILE_SIZE,
+                    config.TILE_SIZE,
+                )
+                for x, y in self.wall_tiles
+            ]
+            self.wall_rects_size = config.TILE_SIZE
+        return self.wall_rects
 
     def get_tile_type(self, x: int, y: int) -> str | None:
         """Return the tile type at (x, y)"""
         if 0 <= y < self.rows and 0 <= x < self.cols:
-            return self.map_data[y][x]
+            return TILE_TYPES[self.tiles[y * self.cols + x]]
         return "void"
 
-    def get_map_data(self):
-        """Return map data"""
-        return self.map_data
+    def trace_segment(
+        self, x0: float, y0: float, x1: float, y1: float, code: int
+    ) -> Tuple[float, float] | None:
+        """
+        First point (in pixels) where the segment from (x0, y0) to (x1, y1) enters
+        a tile with the code, None if it crosses no such tile inside the map.
+        The tiles are visited in the order the segment crosses them (grid
+        traversal by Amanatides and Woo), so the cost is the number of tiles.
+        """
+        tile_size = config.TILE_SIZE
+        cols = self.cols
+        rows = self.rows
+        tiles = self.tiles
+        col = math.floor(x0 / tile_size)
+        row = math.floor(y0 / tile_size)
+        if 0 <= col < cols and 0 <= row < rows and tiles[row * cols + col] == code:
+            return (x0, y0)
+        last_col = math.floor(x1 / tile_size)
+        last_row = math.floor(y1 / tile_size)
+        if col == last_col and row == last_row:  # short segment inside one tile
+            return None
+
+        dx = x1 - x0
+        dy = y1 - y0
+        # t of the next vertical and horizontal tile border (0: start, 1: end)
+        # and the t between two borders
+        if dx > 0:
+            step_col, next_x = 1, ((col + 1) * tile_size - x0) / dx
+        elif dx < 0:
+            step_col, next_x = -1, (col * tile_size - x0) / dx
+        else:
+            step_col, next_x = 0, math.inf
+        if dy > 0:
+            step_row, next_y = 1, ((row + 1) * tile_size - y0) / dy
+        elif dy < 0:
+            step_row, next_y = -1, (row * tile_size - y0) / dy
+        else:
+            step_row, next_y = 0, math.inf
+        delta_x = tile_size / abs(dx) if dx else math.inf
+        delta_y = tile_size / abs(dy) if dy else math.inf
+
+        for _ in range(abs(last_col - col) + abs(last_row - row)):
+            if next_x < next_y:
+                t = next_x
+                next_x += delta_x
+                col += step_col
+            else:
+                t = next_y
+                next_y += delta_y
+                row += step_row
+            if 0 <= col < cols and 0 <= row < rows and tiles[row * cols + col] == code:
+                return (x0 + t * dx, y0 + t * dy)
+        return None
+
+    def summed_area_table(self, code: int) -> array:
+        """
+        Summed-area table of a tile code (built on first use): entry (row, col) of
+        the table (rows + 1 by cols + 1) is the number of tiles of the code above
+        and left of the tile
+        """
+        table = self.summed_areas.get(code)
+        if table is not None:
+            return table
+        cols = self.cols
+        # entries count up to rows * cols tiles, 2 bytes are enough for small maps
+        typecode = "H" if self.rows * cols <= 0xFFFF else "I"
+        is_code = bytes(1 if other == code else 0 for other in range(256))
+        table = array(typecode, [0]) * (cols + 1)  # first row: zeros
+        above = table[:]
+        for row in range(self.rows):
+            counts = self.tiles[row * cols:(row + 1) * cols].translate(is_code)
+            above = array(
+                typecode, (0, *map(int.__add__, above[1:], accumulate(counts)))
+            )
+            table += above
+        self.summed_areas[code] = table
+        return table
+
+    def count_in_rect(self, tile_type: str, rect) -> int:
+        """Number of tiles of the type in rect (col, row, width, height in tiles)"""
+        x, y, width, height = rect
+        left = max(x, 0)
+        top = max(y, 0)
+        right = min(x + width, self.cols)
+        bottom = min(y + height, self.rows)
+        if left >= right or top >= bottom:
+            return 0
+        table = self.summed_area_table(TILE_CODES[tile_type])
+        stride = self.cols + 1
+        return (
+            table[bottom * stride + right]
+            - table[top * stride + right]
+            - table[bottom * stride + left]
+            + table[top * stride + left]
+        )
+
+    def all_in_rect(self, tile_type: str, rect) -> bool:
+        """Whether all tiles in rect have the type (tiles outside the map do not)"""
+        width, height = rect[2], rect[3]
+        return width > 0 and height > 0 and (
+            self.count_in_rect(tile_type, rect) == width * height
+        )
+
+    def any_in_rect(self, tile_type: str, rect) -> bool:
+        """Whether a tile in rect has the type"""
+        return self.count_in_rect(tile_type, rect) > 0
+
+    def find_areas(
+        self, tile_type: str, width: int, height: int
+    ) -> List[Tuple[int, int]]:
+        """Top left tiles (col, row) of all areas of width x height tiles of the type"""
+        key = (tile_type, width, height)
+        if key not in self.areas:
+            self.areas[key] = [
+                (x, y)
+                for x, y in self.find_tiles(TILE_CODES[tile_type])
+                if self.all_in_rect(tile_type, (x, y, width, height))
+            ]
+        return self.areas[key]
+
+    def set_tile(self, x: int, y: int, tile_type: str) -> None:
+        """Change the tile at (x, y), the summed-area tables are updated and the
+        other data computed from the tiles is computed again when needed
+        (renderers and robots notice the change by edits, map_compiler.load_map
+        loads the level file again instead of returning the changed map)"""
+        old_code = self.tiles[y * self.cols + x]
+        code = TILE_CODES[tile_type]
+        if code == old_code:
+            return
+        self.tiles[y * self.cols + x] = code
+        self.edits += 1
+
+        # the change counts for the entries below and right of the tile in the
+        # tables of the old and the new code
+        stride = self.cols + 1
+        for changed, add in ((old_code, (-1).__add__), (code, (1).__add__)):
+            table = self.summed_areas.get(changed)
+            if table is None:
+                continue
+            for row in range(y + 1, self.rows + 1):
+                start = row * stride + x + 1
+                end = (row + 1) * stride
+                table[start:end] = array(table.typecode, map(add, table[start:end]))
+
+        for name in ("tile_effects", "wall_tiles", "bush_tiles", "valid_spawn_tiles"):
+            self.__dict__.pop(name, None)
+        self.wall_rects_size = 0
+        self.areas.clear()
+        self.configuration_spaces.clear()
+        self.spawn_service = None
+        self.cache_key = None  # no longer the compiled level file
+
+    def get_map_data(self) -> list[list[str]]:
+        """Return map data as tile types (row by row)
+        (creates a list per row, prefer get_tile_type or tiles for large maps)"""
+        return [
+            [TILE_TYPES[code] for code in self.tiles[y * self.cols:(y + 1) * self.cols]]
+            for y in range(self.rows)
+        ]
@@ -0,0 +1,124 @@
+"""
+Compiles .txt levels into cached map data.
+
+A compiled map contains the tile codes, wall tiles (collision), bush tiles
+(cover) and valid spawn tiles. It is stored on disk keyed by the hash of the
+level file and FORMAT_VERSION, so a level is only parsed once. Loaded maps and
+their rendered chunks are also kept in memory, so restarting a match or
+reselecting a level does not load or render the map again.
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+import pygame
+from pygame._sdl2.video import Renderer
+import config
+from map import Map
+from map_renderer import MapRenderer
+from texture_renderer import TextureMapRenderer
+
+FORMAT_VERSION: int = 2  # increase when the compiled data changes
+CACHE_DIR = Path("../cache/maps")  # compiled maps on disk
+
+# cache key -> loaded map
+loaded_maps: dict[str, Map] = {}
+# renderer of the last map (cache key, TILE_SIZE, SDL renderer) with its chunks
+map_renderers: dict[tuple[str, int, object], MapRenderer] = {}
+
+
+def cache_key(content: bytes) -> str:
+    """Key of a level file: hash of its content plus the format version"""
+    return f"{hashlib.sha256(content).hexdigest()}-v{FORMAT_VERSION}"
+
+
+def read_compiled(key: str) -> dict | None:
+    """Return the compiled map from the disk cache (None if missing or broken)"""
+    path = CACHE_DIR / f"{key}.pickle"
+    try:
+        with open(path, "rb") as file:
+            compiled = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if compiled.get("format_version") != FORMAT_VERSION:
+        return None
+    return compiled
+
+
+def write_compiled(key: str, compiled: dict) -> None:
+    """Store the compiled map in the disk cache"""
+    path = CACHE_DIR / f"{key}.pickle"
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so there is never a half written cache
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "wb") as file:
+            pickle.dump(compiled, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except OSError as error:
+        print(f"Warning: could not write map cache {path}: {error}")
+
+
+def compile_map(file_path: str) -> dict:
+    """Parse a level file into plain map data"""
+    compiled = Map(file_path).to_compiled()
+    compiled["format_version"] = FORMAT_VERSION
+    return compiled
+
+
+def load_map(file_path: str | None, player_count: int = 4) -> Map:
+    """Return the map of a level file, compiled maps are reused"""
+    try:
+        with open(Path(file_path), "rb") as file:
+            content = file.read()
+    except (FileNotFoundError, TypeError):
+        return Map(file_path, player_count)  # uses the fallback map
+
+    key = cache_key(content)
+    if key not in loaded_maps or loaded_maps[key].edits:  # changed by set_tile
+        compiled = read_compiled(key)
+        if compiled is None:
+            compiled = compile_map(file_path)
+            write_compiled(key, compiled)
+        game_map = Map(file_path, player_count, compiled)
+        game_map.cache_key = key
+        loaded_maps[key] = game_map
+
+    game_map = loaded_maps[key]
+    game_map.player_count = player_count
+    return game_map
+
+
+def create_map_renderer(
+    camera_surface: pygame.Surface, renderer: Renderer | None = None
+) -> MapRenderer:
+    """Surface renderer, or texture renderer if an SDL renderer is given"""
+    if renderer is None:
+        return MapRenderer(camera_surface, config.TEXTURES)
+    return TextureMapRenderer(renderer, camera_surface, config.TEXTURES)
+
+
+def get_map_renderer(
+    game_map: Map, camera_surface: pygame.Surface, renderer: Renderer | None = None
+) -> MapRenderer:
+    """Return a renderer for the map, rendered chunks are reused until the next map"""
+    key = game_map.cache_key
+    if key is None:
+        map_renderer = create_map_renderer(camera_surface, renderer)
+        map_renderer.draw_map_picture(game_map)
+        return map_renderer
+
+    if (key, config.TILE_SIZE, renderer) not in map_renderers:
+        # only the renderer of the current map is kept: every renderer holds up to
+        # MAX_CACHED_CHUNKS rendered chunks, they would add up over the levels
+        map_renderers.clear()
+        map_renderer = create_map_renderer(camera_surface, renderer)
+        map_renderer.draw_map_picture(game_map)
+        map_renderers[(key, config.TILE_SIZE, renderer)] = map_renderer
+
+    map_renderer = map_renderers[(key, config.TILE_SIZE, renderer)]
+    if map_renderer.game_map is not game_map:  # loaded again (see load_map)
+        map_renderer.draw_map_picture(game_map)
+    map_renderer.camera_surface = camera_surface  # new camera for every match
+    return map_renderer
@@ -1,50 +1,249 @@
+from collections import OrderedDict
 import pygame
 import config
 from camera import Camera
+from map import Map, TILE_CODES, TILE_TYPES
 
 
 class MapRenderer:
     def __init__(
         self, camera_surface: pygame.Surface, textures: dict[str, pygame.Surface]
     ):
-        """Draws the map on the screen."""
+        """Draws the map on the screen.
+
+        The map is split into chunks of config.CHUNK_SIZE x config.CHUNK_SIZE tiles.
+        Chunks are rendered on demand when they become visible and the least
+        recently used ones are dropped, so memory does not grow with the map size.
+        """
         self.camera_surface = camera_surface  # current visible screen
         self.textures = textures  # tile type to texture mapping
-        self.map_picture = None  # rendered map surface
-
-    def draw_map_picture(self, map_data: list[list[str]]) -> None:
-        """Creates the map image (not shown yet)."""
-        rows = len(map_data)
-        cols = len(map_data[0])
-        height = rows * config.TILE_SIZE
-        width = cols * config.TILE_SIZE
-        self.map_picture = pygame.Surface((width, height))
-
-        for y in range(rows):
-            for x in range(cols):
-                tile_type = map_data[y][x]
-                texture = self.textures[tile_type].convert()
-                texture = pygame.transform.scale(
-                    texture, (config.TILE_SIZE, config.TILE_SIZE)
-                )
-                self.map_picture.blit(
-                    texture, (x * config.TILE_SIZE, y * config.TILE_SIZE)
+        self.game_map: Map | None = None  # map to draw
+        self.map_edits = 0  # Map.edits when the chunks were dropped the last time
+        self.tile_textures: dict[str, pygame.Surface] = {}  # textures in TILE_SIZE
+        self.tile_size = 0  # TILE_SIZE the tile textures were scaled to
+        # (chunk column, chunk row) -> rendered chunk, least recently used first
+        self.chunks: OrderedDict[tuple[int, int], pygame.Surface] = OrderedDict()
+        # chunks scaled to the zoom of the last frame
+        # (chunk column, chunk row) -> (width, height, scaled chunk)
+        self.scaled_chunks: dict[tuple[int, int], tuple[int, int, pygame.Surface]] = {}
+        # transparent layers (in TILE_SIZE) with only the bush tiles of a chunk,
+        # drawn over robots, least recently used first
+        # (chunk column, chunk row) -> layer (None if the chunk has no bush)
+        self.bush_layers: OrderedDict[tuple[int, int], pygame.Surface | None] = (
+            OrderedDict()
+        )
+        self.bush_tile_size = 0  # TILE_SIZE of the bush layers
+        # bush tiles cut from the layers and scaled to the zoom of the last frames
+        # (col, row) -> scaled tile, least recently used first
+        self.scaled_bush_tiles: OrderedDict[tuple[int, int], pygame.Surface] = (
+            OrderedDict()
+        )
+        self.scaled_bush_size = 0  # zoomed tile size of the scaled bush tiles
+
+    def draw_map_picture(self, game_map: Map) -> None:
+        """Prepares the map for drawing (chunks are rendered when needed)."""
+        self.game_map = game_map
+        self.map_edits = game_map.edits
+        self.chunks.clear()
+        self.scaled_chunks = {}
+        self.bush_layers.clear()
+        self.scaled_bush_tiles.clear()
+
+    def check_edits(self) -> None:
+        """Drop the rendered chunks if tiles of the map were changed (set_tile)"""
+        if self.game_map is not None and self.game_map.edits != self.map_edits:
+            self.draw_map_picture(self.game_map)
+
+    def get_tile_texture(self, tile_type: str) -> pygame.Surface:
+        """Returns the texture of a tile type scaled to TILE_SIZE."""
+        if self.tile_size != config.TILE_SIZE:
+            self.tile_textures = {}
+            self.tile_size = config.TILE_SIZE
+        if tile_type not in self.tile_textures:
+            self.tile_textures[tile_type] = pygame.transform.scale(
+                self.textures[tile_type].convert(),
+                (config.TILE_SIZE, config.TILE_SIZE),
+            )
+        return self.tile_textures[tile_type]
+
+    def get_chunk(self, chunk_x: int, chunk_y: int) -> pygame.Surface:
+        """Returns the rendered chunk and renders it if it is not cached."""
+        key = (chunk_x, chunk_y)
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+
+        chunk = self.render_chunk(chunk_x, chunk_y)
+        self.chunks[key] = chunk
+        if len(self.chunks) > config.MAX_CACHED_CHUNKS:
+            self.chunks.popitem(last=False)  # drop least recently used chunk
+        return chunk
+
+    def render_chunk(self, chunk_x: int, chunk_y: int) -> pygame.Surface:
+        """Renders the tiles of a chunk (at TILE_SIZE) into a new surface."""
+        cols = self.game_map.cols
+        first_x, first_y, last_x, last_y = self.chunk_tiles(chunk_x, chunk_y)
+        chunk = pygame.Surface(
+            ((last_x - first_x) * config.TILE_SIZE, (last_y - first_y) * config.TILE_SIZE)
+        )
+        textures = [self.get_tile_texture(tile_type) for tile_type in TILE_TYPES]
+        for y in range(first_y, last_y):
+            row = self.game_map.tiles[y * cols + first_x:y * cols + last_x]
+            for x, code in enumerate(row):
+                chunk.blit(
+                    textures[code],
+                    (x * config.TILE_SIZE, (y - first_y) * config.TILE_SIZE),
                 )
+        return chunk
+
+    def visible_chunks(self, camera: Camera) -> list[tuple[int, int]]:
+        """Returns all chunks (column, row) that intersect the camera view."""
+        if not self.game_map:
+            return []
+        chunk_px = config.CHUNK_SIZE * config.TILE_SIZE
+        chunk_cols = -(-self.game_map.cols // config.CHUNK_SIZE)
+        chunk_rows = -(-self.game_map.rows // config.CHUNK_SIZE)
+
+        left = camera.offset_x
+        top = camera.offset_y
+        right = left + camera.camera_surface_width / camera.zoom
+        bottom = top + camera.camera_surface_height / camera.zoom
+
+        first_x = max(int(left // chunk_px), 0)
+        first_y = max(int(top // chunk_px), 0)
+        last_x = min(int(right // chunk_px), chunk_cols - 1)
+        last_y = min(int(bottom // chunk_px), chunk_rows - 1)
+        return [
+            (chunk_x, chunk_y)
+            for chunk_y in range(first_y, last_y + 1)
+            for chunk_x in range(first_x, last_x + 1)
+        ]
+
+    def chunk_rect(
+        self, camera: Camera, chunk_x: int, chunk_y: int, width: int, height: int
+    ) -> pygame.Rect:
+        """Returns the screen region of a chunk with the given size in pixels."""
+        chunk_px = config.CHUNK_SIZE * config.TILE_SIZE
+
+        # Position of both chunk corners on the screen (no gaps between chunks)
+        left, top = camera.apply(chunk_x * chunk_px, chunk_y * chunk_px)
+        right, bottom = camera.apply(
+            chunk_x * chunk_px + width, chunk_y * chunk_px + height
+        )
+        return pygame.Rect(left, top, right - left, bottom - top)
 
     def draw_map(self, camera: Camera) -> None:
         """Shows the visible part of the map through the camera."""
-        if self.map_picture:
-            # Move map based on camera offset and scale
-            offset_x = int(-camera.offset_x * camera.zoom)
-            offset_y = int(-camera.offset_y * camera.zoom)
-
-            # Scale map according to zoom level
-            scaled_map = pygame.transform.scale(
-                self.map_picture,
-                (
-                    int(self.map_picture.get_width() * camera.zoom),
-                    int(self.map_picture.get_height() * camera.zoom),
-                ),
+        self.check_edits()
+        scaled_chunks = {}
+        for chunk_x, chunk_y in self.visible_chunks(camera):
+            chunk = self.get_chunk(chunk_x, chunk_y)
+            left, top, width, height = self.chunk_rect(
+                camera, chunk_x, chunk_y, chunk.get_width(), chunk.get_height()
+            )
+            if width <= 0 or height <= 0:
+                continue
+
+            # Scale chunk according to zoom level (reuse it if the zoom did not change)
+            cached = self.scaled_chunks.get((chunk_x, chunk_y))
+            if cached and cached[0] == width and cached[1] == height:
+                scaled_chunk = cached[2]
+            else:
+                scaled_chunk = pygame.transform.scale(chunk, (width, height))
+            scaled_chunks[(chunk_x, chunk_y)] = (width, height, scaled_chunk)
+
+            # Draw the zoomed chunk
+            self.camera_surface.blit(scaled_chunk, (left, top))
+        self.scaled_chunks = scaled_chunks
+
+    def chunk_tiles(self, chunk_x: int, chunk_y: int) -> tuple[int, int, int, int]:
+        """Returns the first and last (exclusive) tile column and row of a chunk."""
+        first_x = chunk_x * config.CHUNK_SIZE
+        first_y = chunk_y * config.CHUNK_SIZE
+        last_x = min(first_x + config.CHUNK_SIZE, self.game_map.cols)
+        last_y = min(first_y + config.CHUNK_SIZE, self.game_map.rows)
+        return first_x, first_y, last_x, last_y
+
+    def render_bush_layer(
+        self, chunk_x: int, chunk_y: int, tile_size: int
+    ) -> pygame.Surface | None:
+        """Renders the bush tiles of a chunk on a transparent surface."""
+        cols = self.game_map.cols
+        bush = TILE_CODES["bush"]
+        first_x, first_y, last_x, last_y = self.chunk_tiles(chunk_x, chunk_y)
+        if not any(
+            bush in self.game_map.tiles[y * cols + first_x:y * cols + last_x]
+            for y in range(first_y, last_y)
+        ):
+            return None
+
+        layer = pygame.Surface(
+            ((last_x - first_x) * tile_size, (last_y - first_y) * tile_size),
+            pygame.SRCALPHA,
+        )
+        texture = pygame.transform.scale(self.textures["bush"], (tile_size, tile_size))
+        for y in range(first_y, last_y):
+            row = self.game_map.tiles[y * cols + first_x:y * cols + last_x]
+            for x, code in enumerate(row):
+                if code == bush:
+                    layer.blit(texture, (x * tile_size, (y - first_y) * tile_size))
+        return layer
+
+    def get_bush_layer(self, chunk_x: int, chunk_y: int) -> pygame.Surface | None:
+        """Returns the bush layer of a chunk in TILE_SIZE (cached)."""
+        tile_size = config.TILE_SIZE
+        if tile_size != self.bush_tile_size:
+            self.bush_layers.clear()
+            self.bush_tile_size = tile_size
+        key = (chunk_x, chunk_y)
+        if key in self.bush_layers:
+            self.bush_layers.move_to_end(key)
+            return self.bush_layers[key]
+
+        layer = self.render_bush_layer(chunk_x, chunk_y, tile_size)
+        self.bush_layers[key] = layer
+        if len(self.bush_layers) > config.MAX_CACHED_CHUNKS:
+            self.bush_layers.popitem(last=False)  # drop least recently used layer
+        return layer
+
+    def draw_bush_overlay(
+        self, tiles: list[tuple[int, int]], camera: Camera
+    ) -> list[pygame.Rect]:
+        """
+        Draws the bush tiles (col, row) again, e.g. on top of a robot in a bush.
+        Returns the drawn screen regions.
+        """
+        tile_size = int(config.TILE_SIZE * camera.zoom)
+        if tile_size != self.scaled_bush_size:
+            self.scaled_bush_tiles.clear()
+            self.scaled_bush_size = tile_size
+        drawn_rects = []
+        for x, y in tiles:
+            chunk_x, local_x = divmod(x, config.CHUNK_SIZE)
+            chunk_y, local_y = divmod(y, config.CHUNK_SIZE)
+            layer = self.get_bush_layer(chunk_x, chunk_y)
+            if layer is None:
+                continue
+            area = pygame.Rect(
+                local_x * config.TILE_SIZE,
+                local_y * config.TILE_SIZE,
+                config.TILE_SIZE,
+                config.TILE_SIZE,
             )
-            # Draw the zoomed map
-            self.camera_surface.blit(scaled_map, (offset_x, offset_y))
+            position = camera.apply(x * config.TILE_SIZE, y * config.TILE_SIZE)
+            if tile_size == config.TILE_SIZE:
+                drawn_rects.append(self.camera_surface.blit(layer, position, area))
+                continue
+            # only the tile is scaled to the zoom (the zoom changes all the time)
+            tile = self.scaled_bush_tiles.get((x, y))
+            if tile is None:
+                tile = pygame.transform.scale(
+                    layer.subsurface(area), (tile_size, tile_size)
+                )
+                self.scaled_bush_tiles[(x, y)] = tile
+                if len(self.scaled_bush_tiles) > config.MAX_CACHED_BUSH_TILES:
+                    self.scaled_bush_tiles.popitem(last=False)
+            else:
+                self.scaled_bush_tiles.move_to_end((x, y))
+            drawn_rects.append(self.camera_surface.blit(tile, position))
+        return drawn_rects
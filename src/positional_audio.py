@@ -0,0 +1,79 @@
+"""
+Positional audio: the volume and stereo pan of a sound follow the position of
+its emitter relative to the camera center, sounds outside the audibility radius
+are not played at all. Positional sounds share a pool of mixer channels, a new
+sound takes a free channel or the one of a less important sound.
+"""
+
+import math
+import pygame
+import config
+from camera import Camera
+
+FIRST_POOL_CHANNEL: int = 4  # channels 1 to 3 are used by Sounds
+
+
+def audibility_radius(camera: Camera) -> float:
+    """Distance (world pixels) up to which emitters are heard"""
+    # zoomed out, the player sees (and hears) more of the map
+    return config.AUDIO_RADIUS * config.TILE_SIZE / camera.zoom
+
+
+def stereo_volume(camera: Camera, x: float, y: float) -> tuple[float, float] | None:
+    """Left and right volume of an emitter at (x, y), None if it is not audible"""
+    radius = audibility_radius(camera)
+    dx = x - camera.center_x
+    dy = y - camera.center_y
+    distance_sq = dx * dx + dy * dy
+    if distance_sq >= radius * radius:
+        return None
+
+    volume = 1 - math.sqrt(distance_sq) / radius
+    # -1: left edge of the view, 1: right edge
+    pan = dx * 2 * camera.zoom / camera.camera_surface_width
+    pan = max(-1.0, min(pan, 1.0))
+    return volume * min(1.0, 1 - pan), volume * min(1.0, 1 + pan)
+
+
+class ChannelPool:
+    def __init__(self, size: int = config.AUDIO_CHANNELS):
+        """Mixer channels for positional sounds, allocated by priority"""
+        if pygame.mixer.get_num_channels() < FIRST_POOL_CHANNEL + size:
+            pygame.mixer.set_num_channels(FIRST_POOL_CHANNEL + size)
+        self.channels = [
+            pygame.mixer.Channel(FIRST_POOL_CHANNEL + i) for i in range(size)
+        ]
+        self.priorities: list[float] = [0.0] * size  # priority of the last sound
+
+        # statistics
+        self.stolen = 0  # sounds cut off by a sound with higher priority
+        self.dropped = 0  # sounds not played because all channels were more important
+
+    def play(
+        self, sound: pygame.mixer.Sound, priority: float, left: float, right: float
+    ) -> bool:
+        """Play on a free channel or replace the sound with the lowest priority"""
+        lowest = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                break
+            if self.priorities[i] < priority and (
+                lowest is None or self.priorities[i] < self.priorities[lowest]
+            ):
+                lowest = i
+        else:
+            if lowest is None:
+                self.dropped += 1
+                return False
+            i = lowest
+            self.stolen += 1
+
+        channel = self.channels[i]
+        channel.play(sound)
+        channel.set_volume(left, right)
+        self.priorities[i] = priority
+        return True
+
+    def stop(self) -> None:
+        for channel in self.channels:
+            channel.stop()
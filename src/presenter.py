@@ -0,0 +1,86 @@
+import pygame
+from camera import Camera
+from texture_renderer import TextureBackend
+
+
+class Presenter:
+    def __init__(self, screen: pygame.Surface, backend: TextureBackend | None = None):
+        """Shows changed parts of the screen instead of flipping the whole display.
+
+        Screens mark the regions they changed (moved sprites, hovered buttons,..)
+        and present() updates only these regions. If everything changed (first
+        frame, camera moved, returning from another screen) the display is flipped.
+
+        With the texture backend the camera frame is already drawn by the SDL
+        renderer; screen is then the overlay surface (menus, texts) on top of it.
+        """
+        self.screen = screen
+        self.backend = backend
+        self.camera_frame = False  # whether the renderer holds a new camera frame
+        self.dirty_rects: list[pygame.Rect] = []  # changed regions of this frame
+        self.full_update = True  # whether the whole screen has to be updated
+        self.last_view: tuple[int, int, float] | None = None  # last camera view
+        self.last_entity_rects: list[pygame.Rect] = []  # entities of the last frame
+
+    def mark_dirty(self, rect: pygame.Rect) -> None:
+        """Mark a changed region of the screen"""
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def mark_full(self) -> None:
+        """Mark the whole screen as changed (e.g. after another screen was shown)"""
+        self.full_update = True
+
+    def camera_view(self, camera: Camera) -> tuple[int, int, float]:
+        """Offset and zoom of the camera (small zoom changes are not visible)"""
+        return (camera.offset_x, camera.offset_y, round(camera.zoom, 4))
+
+    def camera_moved(self, camera: Camera) -> bool:
+        """Check if the camera view changed since the last present_camera"""
+        return self.camera_view(camera) != self.last_view
+
+    def present_camera(self, camera: Camera, entity_rects: list[pygame.Rect]) -> None:
+        """
+        Copy the camera surface to the screen: everything if the camera moved,
+        otherwise only the regions of the entities drawn in this and the last frame
+        """
+        if self.camera_moved(camera):
+            self.full_update = True
+
+        if self.backend is not None:
+            # frame is drawn by the renderer, texts are drawn on a clear overlay
+            self.screen.fill((0, 0, 0, 0))
+            self.camera_frame = True
+        elif self.full_update:
+            self.screen.blit(camera.surface, (0, 0))
+        else:
+            for rect in entity_rects + self.last_entity_rects:
+                self.screen.blit(camera.surface, rect, rect)
+                self.mark_dirty(rect)
+
+        self.last_view = self.camera_view(camera)
+        self.last_entity_rects = entity_rects
+
+    def present(self) -> None:
+        """Show the changes of this frame on the display"""
+        if self.backend is not None:
+            self.present_textures()
+        elif self.full_update:
+            pygame.display.flip()
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+        self.full_update = False
+        self.dirty_rects = []
+
+    def present_textures(self) -> None:
+        """Texture backend: draw the overlay (if it changed) and present"""
+        if self.camera_frame:
+            # overlay only contains texts marked as dirty
+            if self.dirty_rects:
+                self.backend.draw_overlay()
+            self.backend.present()
+        elif self.full_update or self.dirty_rects:
+            # menu screen: the overlay is the whole screen
+            self.backend.clear()
+            self.backend.draw_overlay()
+            self.backend.present()
+        self.camera_frame = False
@@ -0,0 +1,61 @@
+import time
+import pygame
+import config
+
+PROFILER_BACKGROUND: tuple[int, int, int] = (20, 20, 20)
+PROFILER_TEXT_COLOR: tuple[int, int, int] = (220, 220, 220)
+
+
+class Profiler:
+    def __init__(self):
+        """Counters of the current frame (culled robots, ...) and the frame time.
+
+        The game loop sets the counters every frame, draw() shows them in the
+        top left corner while the profiler is enabled (F3 or SHOW_PROFILER).
+        """
+        self.enabled = config.SHOW_PROFILER
+        self.values: dict[str, float] = {}  # name -> value of the current frame
+        self.frame_ms = 0.0  # frame time (smoothed)
+        self.last_frame = time.perf_counter()
+        self.font: pygame.font.Font | None = None
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+
+    def set(self, name: str, value: float) -> None:
+        self.values[name] = value
+
+    def end_frame(self) -> None:
+        """Measure the time since the last frame"""
+        now = time.perf_counter()
+        self.frame_ms += ((now - self.last_frame) * 1000 - self.frame_ms) * 0.1
+        self.last_frame = now
+
+    def lines(self) -> list[str]:
+        lines = [f"frame: {self.frame_ms:.1f} ms"]
+        for name, value in self.values.items():
+            if isinstance(value, float):
+                lines.append(f"{name}: {value:.2f}")
+            else:
+                lines.append(f"{name}: {value}")
+        return lines
+
+    def draw(self, surface: pygame.Surface) -> pygame.Rect | None:
+        """Draws the counters (if enabled) and returns the drawn region"""
+        if not self.enabled:
+            return None
+        if self.font is None:
+            self.font = pygame.font.SysFont(None, 24)
+
+        texts = [
+            self.font.render(line, True, PROFILER_TEXT_COLOR) for line in self.lines()
+        ]
+        width = max(text.get_width() for text in texts) + 10
+        height = sum(text.get_height() for text in texts) + 10
+        # opaque background, so the old values do not shine through
+        rect = pygame.draw.rect(surface, PROFILER_BACKGROUND, (5, 5, width, height))
+        y = 10
+        for text in texts:
+            surface.blit(text, (10, y))
+            y += text.get_height()
+        return rect
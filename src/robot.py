@@ -3,9 +3,18 @@ import config
 from bullet import Bullet
 import math
 import random
-from map import Map
+from map import EFFECT_COVER, EFFECT_FAST, EFFECT_HAZARD, EFFECT_SLOW, EFFECT_SOLID, Map
+from spawn_service import NoSpawnPositionError, get_spawn_service
 from sounds import Sounds
+from audio_queue import AudioQueue
 from camera import Camera
+from configuration_space import (
+    ConfigurationSpace,
+    Contact,
+    get_configuration_space,
+)
+from spatial_hash import SpatialHash
+from steering import facing, goal_angle, steer
 
 # Constants
 ice_acceleration: float = 2
@@ -14,6 +23,168 @@ sand_acceleration: float = 1 / 2
 # Recharge-rate (how much power will be recharged every frame)
 recharge_rate: float = 0.05
 
+# Distance a bullet can reach, robots further away are no threat (move_if_in_range)
+BULLET_REACH: int = 800
+
+# Speed factor and sound (of the player) for the terrain effects, the first
+# effect touched by the robot counts (factor None: the speed stays as it is)
+TERRAIN_SPEEDS: list[tuple[int, float | None, str | None]] = [
+    (EFFECT_FAST, ice_acceleration, "ice_sound"),
+    (EFFECT_SLOW, sand_acceleration, "sand_sound"),
+    (EFFECT_SOLID, None, None),
+]
+
+
+def terrain_speed(effects: int) -> tuple[float | None, str | None]:
+    """Speed factor and sound for the terrain effects touched by a robot"""
+    for effect, factor, sound in TERRAIN_SPEEDS:
+        if effects & effect:
+            return factor, sound
+    return 1.0, None
+
+
+# terrain_speed for all combinations of effects (index: effect bits)
+TERRAIN_SPEED_TABLE: list[tuple[float | None, str | None]] = [
+    terrain_speed(effects) for effects in range(2 * EFFECT_SOLID)
+]
+
+
+def get_hitbox_rect(x: float, y: float, hitbox_radius: int) -> pygame.Rect:
+    """Returns the hitbox of a robot with the given hitbox radius at (x, y)"""
+    return pygame.Rect(
+        x - hitbox_radius * 0.4,
+        y - hitbox_radius * 0.35,
+        hitbox_radius * 0.75,
+        hitbox_radius * 0.75,
+    )
+
+
+def get_tile_bounds(
+    x: float, y: float, hitbox_radius: int
+) -> tuple[int, int, int, int]:
+    """First and last column and row touched by a hitbox at (x, y)"""
+    # same rounding as the pygame.Rect of get_hitbox_rect, without creating it
+    left = int(x - hitbox_radius * 0.4)
+    top = int(y - hitbox_radius * 0.35)
+    size = int(hitbox_radius * 0.75)
+    tile_size = config.TILE_SIZE
+    return (
+        left // tile_size,
+        (left + size - 1) // tile_size,
+        top // tile_size,
+        (top + size - 1) // tile_size,
+    )
+
+
+def get_tile_rect(x: float, y: float, hitbox_radius: int) -> tuple[int, int, int, int]:
+    """Tiles touched by a hitbox at (x, y) as (col, row, width, height)"""
+    first_col, last_col, first_row, last_row = get_tile_bounds(x, y, hitbox_radius)
+    return first_col, first_row, last_col - first_col + 1, last_row - first_row + 1
+
+
+def get_touched_tiles(x: float, y: float, hitbox_radius: int) -> list[tuple[int, int]]:
+    """Returns the tiles (col, row) touched by a hitbox at (x, y)"""
+    first_col, last_col, first_row, last_row = get_tile_bounds(x, y, hitbox_radius)
+    return [
+        (i, j)
+        for i in range(first_col, last_col + 1)
+        for j in range(first_row, last_row + 1)
+    ]
+
+
+# The planning functions only use x, y and hitbox_radius of the robots, so they
+# work with Robot objects as well as with the snapshots of the AI planner
+
+
+def robot_distances(robot, robots: list) -> list[tuple[float, object]]:
+    """Distances (between the hitboxes) from robot to the other robots, nearest first"""
+    dist_robot = []
+    for other in robots:
+        if other != robot:
+            x_to_robot = other.x - robot.x
+            y_to_robot = other.y - robot.y
+            dist = (
+                math.sqrt((x_to_robot) ** 2 + (y_to_robot) ** 2)
+                - robot.hitbox_radius * 0.4
+                - other.hitbox_radius * 0.4
+            )
+            dist_robot.append((dist, other))
+    return sorted(dist_robot, key=lambda x: x[0])
+
+
+def distances_to_probabilities(
+    dist_robot: list[tuple[float, object]]
+) -> list[tuple[float, object]]:
+    """Probability for each robot, the nearer the more probable"""
+    prob_robot = []
+    total_dist: float = sum(d for d, r in dist_robot)
+    for dist, robot in dist_robot:
+        # preventing divison with 0
+        if dist == 0:
+            prob: float = 10**9
+        else:
+            prob: float = total_dist / dist
+
+        prob_robot.append((prob, robot))
+    return prob_robot
+
+
+def visible_robots(robots: list, game_map: Map) -> list:
+    """Robots that are not completely hidden in a bush"""
+    visible = []
+    for robot in robots:
+        if isinstance(robot, Robot):
+            hidden = robot.is_hidden(game_map)
+        else:  # snapshot of the AI planner
+            hidden = game_map.all_in_rect(
+                "bush", get_tile_rect(robot.x, robot.y, robot.hitbox_radius)
+            )
+        if not hidden:
+            visible.append(robot)
+    return visible
+
+
+def choose_goal(robot, robots: list, game_map: Map, visible: list | None = None):
+    """
+    Random robot (not hidden in a bush) to follow, nearer ones are more probable
+    visible can be given if visible_robots was already computed for robots
+    """
+    if visible is None:
+        visible = visible_robots(robots, game_map)
+    potential_goals = [other for other in visible if other is not robot]
+    if len(potential_goals) > 0:
+        prob_robot = distances_to_probabilities(robot_distances(robot, potential_goals))
+
+        # avoiding: 'ValueError: Total of weights must be greater than zero'
+        # by removing robots with zero probability before calling random.choices
+        prob_robot = [(p, r) for p, r in prob_robot if p > 0]
+
+        return random.choices(
+            [r for p, r in prob_robot], weights=[p for p, r in prob_robot], k=1
+        )[0]
+    return None
+
+
+def find_hiding_spot(
+    x: float, y: float, hitbox_radius: int, game_map: Map
+) -> tuple[float, float] | None:
+    """Middle of the nearest bush area large enough to hide a robot"""
+    tile_size = config.TILE_SIZE
+    hitbox = get_hitbox_rect(x, y, hitbox_radius)
+    # the bush area (in tiles) has to be more than twice as large as the hitbox
+    cols = 2 * hitbox.width // tile_size + 1
+    rows = 2 * hitbox.height // tile_size + 1
+    areas = game_map.find_areas("bush", cols, rows)
+    if not areas:
+        return None
+    i, j = min(
+        areas,
+        key=lambda tile: ((tile[0] + 1 / 2) * tile_size - x) ** 2
+        + ((tile[1] + 1 / 2) * tile_size - y) ** 2,
+    )
+    # get middle
+    return ((i + (cols - 1)) * tile_size, (j + (rows - 1)) * tile_size)
+
 
 class Robot:
     def __init__(
@@ -28,6 +199,7 @@ class Robot:
         speed_alpha: float,
         is_player: bool,
         robot_type: str = "",
+        sounds: Sounds | AudioQueue | None = None,
     ):
         self.screen = screen
         self.x = x  # x-coordiante of center
@@ -52,13 +224,26 @@ class Robot:
         self.times_without_bush = 0
         # how often there was no bus in touched_textures in a row
         # while the robot was in a bush
-        self.sounds = Sounds()  # loading the sounds
+        # loading the sounds (robots may share one already loaded instance or the
+        # AudioQueue of the match)
+        self.sounds = sounds if sounds else Sounds()
 
         self.in_bush = False  # Whether the robot is currently standing in a bush tile
         self.bush_tiles = (
             []
         )  # List of bush tile positions robot is currently overlapping
         self.robot_type = robot_type
+
+        # tiles touched by the hitbox and their types, only computed again when
+        # the hitbox crosses a tile border (see update_occupancy)
+        self.occupied_bounds: tuple[int, int, int, int] | None = None
+        self.occupied_map: Map | None = None
+        self.occupied_tiles: list[tuple[int, int]] = []
+        self.occupied_textures: set[str] = set()
+        self.occupied_effects = 0  # effect bits of the tiles (see map.py)
+        self.occupied_bush_tiles: list[tuple[int, int]] = []
+        self.occupied_hidden = False  # only touches bush tiles
+        self.occupied_edits = 0  # Map.edits when the types were looked up
         # if robot_type == "Spider":
         #   self.player_sound = "spider_sound"
         # else:
@@ -72,16 +257,18 @@ class Robot:
         walls: list[pygame.Rect],
         bullets: list[Bullet],
         camera: Camera,
+        grid: SpatialHash | None = None,
     ) -> None:
+        """grid: robots and bullets of the match (neighbour queries)"""
         # Check for effect
-        self.exist(game_map, robots, bullets)
+        self.exist(game_map, robots, bullets, grid=grid)
 
         # Update player position based on key inputs
         keys = pygame.key.get_pressed()
 
         x = (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]) * self.v
         y = (keys[pygame.K_DOWN] - keys[pygame.K_UP]) * self.v
-        self.move_if_no_walls(x, y, walls, robots, game_map)
+        self.move_if_no_walls(x, y, walls, robots, game_map, grid=grid)
         self.alpha += (keys[pygame.K_d] - keys[pygame.K_a]) * self.v_alpha
         self.alpha = self.alpha % 360
 
@@ -109,7 +296,7 @@ class Robot:
 
         # check, if user used a key for shooting
         if keys[pygame.K_s]:
-            self.shoot(bullets, camera, walls, robots, game_map)
+            self.shoot(bullets, camera, walls, robots, game_map, grid)
 
     # Lets a robot follow another robot
     def update_enemy(
@@ -120,54 +307,61 @@ class Robot:
         walls: list[pygame.Rect],
         bullets: list[Bullet],
         camera: Camera,
+        hiding_spot: tuple[float, float] | None = None,
+        steps: int = 1,
+        full_detail: bool = True,
+        grid: SpatialHash | None = None,
     ) -> None:
+        """
+        steps: number of frames simulated at once (simulation LOD)
+        full_detail: False for far away enemies, they do not avoid other robots
+        grid: robots and bullets of the match (neighbour queries)
+        """
         # Check for effect
-        self.exist(game_map, robots, bullets)
+        self.exist(game_map, robots, bullets, steps, grid)
 
         # Check for goal
         if not goal:
-            self.go_hide(game_map, walls, robots)
+            self.go_hide(game_map, walls, robots, hiding_spot, steps, grid)
             return None
 
-        # Move towards a goal position
+        # Move towards a goal position and turn to face it
         x_to_goal = goal.x - self.x
         y_to_goal = goal.y - self.y
-        x = math.copysign(self.v, x_to_goal)
-        y = math.copysign(self.v, y_to_goal)
-        self.move_if_no_walls(x, y, walls, robots, game_map, check_for_lava=True)
-
-        # Adjust rotation to face the goal
-        rad_to_goal = math.atan2(y_to_goal, x_to_goal)
-        angle_to_goal = (math.degrees(rad_to_goal) + 180) % 360
-
-        # Invert direction if shortest rotation is the other way
-        if angle_to_goal < self.alpha:
-            if abs(angle_to_goal - self.alpha) > 180:
-                angle_to_goal *= -1
+        start_alpha = self.alpha
+        x, y, alpha, aimed = steer(
+            x_to_goal, y_to_goal, start_alpha, self.v * steps, self.v_alpha * steps
+        )
+        if full_detail:
+            self.move_if_no_walls(
+                x, y, walls, robots, game_map, check_for_lava=True, grid=grid
+            )
         else:
-            if abs(angle_to_goal - self.alpha) < 180:
-                angle_to_goal *= -1
-        self.alpha += math.copysign(self.v_alpha, angle_to_goal)
-        self.alpha = self.alpha % 360
+            self.move_without_robots(x, y, walls, game_map)
+        self.alpha = alpha
 
         # shoot if angle to goal is under 10°
-        angle_diff = abs(abs(angle_to_goal - 180) - self.alpha) % 360
-        if (angle_diff <= 10) or (angle_diff >= 350):
-            self.shoot(bullets, camera, walls, robots, game_map)
+        if aimed:
+            self.shoot(bullets, camera, walls, robots, game_map, grid)
 
         # avoid being in range of other robots
-        self.move_if_in_range(robots, walls, game_map)
+        if full_detail:
+            self.move_if_in_range(robots, walls, game_map, grid)
 
         # # check, if robot NPC is moving
         self.moving = (
             abs(goal.x - self.x) > 0.5
             or abs(goal.y - self.y) > 0.5
-            or abs(angle_to_goal - self.alpha) > 1
+            or abs(goal_angle(x_to_goal, y_to_goal, start_alpha) - self.alpha) > 1
         )
 
     # React to collisions with other robots
     def robot_collision(
-        self, robot: "Robot", robots: list["Robot"], walls: list[pygame.Rect]
+        self,
+        robot: "Robot",
+        robots: list["Robot"],
+        game_map: Map,
+        grid: SpatialHash | None = None,
     ) -> None:
         rad_to_goal = math.atan2(robot.y - self.y, robot.x - self.x)
         angle_to_goal = (math.degrees(rad_to_goal) + 180) % 360
@@ -176,36 +370,63 @@ class Robot:
         y = 10 * math.sin(angle_away * math.pi / 180)
         xnew = self.x + x
         ynew = self.y + y
-        newRect = pygame.Rect(
-            xnew - self.hitbox_radius,
-            ynew - self.hitbox_radius,
-            self.hitbox_radius * 2,
-            self.hitbox_radius * 2,
+        radius = self.hitbox_radius
+        # the whole robot (not only its hitbox) must not touch a wall
+        space = get_configuration_space(
+            game_map, radius, radius, radius * 2, radius * 2, EFFECT_SOLID
         )
         # moves robot to direct wanted path if no wall
-        if newRect.collidelist(walls) == -1:
+        if space.free(xnew, ynew):
             self.x = xnew
             self.y = ynew
-            (dist, robot) = self.robot_dist(robots)[0]
+            (dist, robot) = self.nearest_robot(robots, grid)
             if dist <= 0:
                 self.x -= x
                 self.y -= y
 
     # Detect distances to other robots
     def robot_dist(self, robots: list["Robot"]) -> list[tuple[float, "Robot"]]:
-        dist_robot: list[tuple[float, Robot]] = []
-        for robot in robots:
-            if robot != self:
-                x_to_robot = robot.x - self.x
-                y_to_robot = robot.y - self.y
-                dist = (
-                    math.sqrt((x_to_robot) ** 2 + (y_to_robot) ** 2)
-                    - self.hitbox_radius * 0.4
-                    - robot.hitbox_radius * 0.4
-                )
-                dist_robot.append((dist, robot))
-        dist_robot = sorted(dist_robot, key=lambda x: x[0])
-        return dist_robot
+        return robot_distances(self, robots)
+
+    def nearest_robot(
+        self, robots: list["Robot"], grid: SpatialHash | None = None
+    ) -> tuple[float, "Robot | None"]:
+        """
+        Nearest other robot and the distance between the hitboxes like
+        robot_dist(robots)[0]. With a grid only robots near enough to touch
+        this one are compared ((inf, None) if there is none).
+        """
+        if grid is None:
+            return self.robot_dist(robots)[0]
+        reach = (self.hitbox_radius + grid.max_radius.get("robot", 0)) * 0.4
+        nearest: tuple[float, Robot | None] = (math.inf, None)
+        # in the order of robots, so that the first of equally near robots is found
+        for other in grid.in_order(grid.query_radius("robot", self.x, self.y, reach)):
+            if other is self:
+                continue
+            x_to_robot = other.x - self.x
+            y_to_robot = other.y - self.y
+            dist = (
+                math.sqrt((x_to_robot) ** 2 + (y_to_robot) ** 2)
+                - self.hitbox_radius * 0.4
+                - other.hitbox_radius * 0.4
+            )
+            if dist < nearest[0]:
+                nearest = (dist, other)
+        return nearest
+
+    def robots_within(
+        self, robots: list["Robot"], distance: float, grid: SpatialHash | None = None
+    ) -> list["Robot"]:
+        """Other robots with their center at most distance away"""
+        if grid is not None:
+            robots = grid.in_order(grid.query_radius("robot", self.x, self.y, distance))
+        return [
+            robot
+            for robot in robots
+            if robot is not self
+            and (robot.x - self.x) ** 2 + (robot.y - self.y) ** 2 <= distance**2
+        ]
 
     def get_hitbox(self, x: float | None = None, y: float | None = None) -> pygame.Rect:
         """
@@ -218,77 +439,88 @@ class Robot:
         if y is None:
             y = self.y
 
-        return pygame.Rect(
-            x - self.hitbox_radius * 0.4,
-            y - self.hitbox_radius * 0.35,
-            self.hitbox_radius * 0.75,
-            self.hitbox_radius * 0.75,
+        return get_hitbox_rect(x, y, self.hitbox_radius)
+
+    def configuration_space(self, game_map: Map, blocked: int) -> ConfigurationSpace:
+        """Positions where the hitbox touches none of the blocked effects"""
+        radius = self.hitbox_radius
+        return get_configuration_space(
+            game_map, radius * 0.4, radius * 0.35, radius * 0.75, radius * 0.75, blocked
         )
 
-    # Get the list of tiles touched by the robot
+    def update_occupancy(self, game_map: Map | None = None) -> None:
+        """Compute the touched tiles (and their types) again if the robot left them"""
+        bounds = get_tile_bounds(self.x, self.y, self.hitbox_radius)
+        if bounds != self.occupied_bounds:
+            self.occupied_bounds = bounds
+            self.occupied_tiles = get_touched_tiles(self.x, self.y, self.hitbox_radius)
+            self.occupied_map = None  # the types are those of the old tiles
+        if game_map is not None and (
+            game_map is not self.occupied_map or game_map.edits != self.occupied_edits
+        ):
+            types = [game_map.get_tile_type(i, j) for i, j in self.occupied_tiles]
+            self.occupied_map = game_map
+            self.occupied_edits = game_map.edits
+            self.occupied_textures = set(types)
+            self.occupied_effects = game_map.footprint_effects(*bounds)
+            self.occupied_hidden = game_map.all_in_rect(
+                "bush", get_tile_rect(self.x, self.y, self.hitbox_radius)
+            )
+            self.occupied_bush_tiles = [
+                tile for tile, tile_type in zip(self.occupied_tiles, types)
+                if tile_type == "bush"
+            ]
+
+    # Get the list of tiles touched by the robot (shared, do not change it)
     def touched_tiles(self) -> list[tuple[int, int]]:
+        self.update_occupancy()
+        return self.occupied_tiles
 
-        x_bounds = [
-            self.get_hitbox().left // config.TILE_SIZE,
-            (self.get_hitbox().right - 1) // config.TILE_SIZE,
-        ]
-        y_bounds = [
-            self.get_hitbox().top // config.TILE_SIZE,
-            (self.get_hitbox().bottom - 1) // config.TILE_SIZE,
-        ]
-        touching_tiles = []
-        for i in range(x_bounds[0], x_bounds[1] + 1):
-            for j in range(y_bounds[0], y_bounds[1] + 1):
-                touching_tiles.append((i, j))
-        return touching_tiles
-
-    # Get the textures of the tiles touched by the robot
+    # Get the textures of the tiles touched by the robot (shared, do not change it)
     def touched_textures(self, game_map: Map) -> set[str]:
-        touched_textures = set()
-        for [i, j] in self.touched_tiles():
-            touched_textures.add(game_map.get_tile_type(i, j))
-        return touched_textures
+        self.update_occupancy(game_map)
+        return self.occupied_textures
+
+    # Get the effect bits of the tiles touched by the robot
+    def terrain_effects(self, game_map: Map) -> int:
+        self.update_occupancy(game_map)
+        return self.occupied_effects
+
+    # Check if the robot only touches bush tiles (can not be seen)
+    def is_hidden(self, game_map: Map) -> bool:
+        self.update_occupancy(game_map)
+        return self.occupied_hidden
 
     # Effect for robot from map
     def map_effects(self, game_map: Map, robots: list["Robot"]) -> None:
-        touched_textures = self.touched_textures(game_map)
+        effects = self.terrain_effects(game_map)
         # stop sand and bush sounds, when robot is no longer on sand/bush
-        if "sand" not in touched_textures or not self.moving:
+        if not effects & EFFECT_SLOW or not self.moving:
             self.times_without_sand += 1
             if self.times_without_sand > 50:  # avoid stopping the sound unintentionally
-                self.sounds.stop_loop("sand_sound")
+                if self.is_player:  # only the player plays loops
+                    self.sounds.stop_loop("sand_sound")
                 self.times_without_sand = 0
-        if "bush" not in touched_textures or not self.moving:
+        if not effects & EFFECT_COVER or not self.moving:
             self.times_without_bush += 1
             if self.times_without_bush > 50:  # avoid stopping the sound unintentionally
-                self.sounds.stop_loop("bush_sound")
+                if self.is_player:  # only the player plays loops
+                    self.sounds.stop_loop("bush_sound")
                 self.times_without_bush = 0
-        if "ice" in touched_textures:
-            self.v = self.speed * ice_acceleration
-            self.v_alpha = self.speed_alpha * ice_acceleration
-            if self.is_player and self.moving:
-                self.sounds.play_sound("ice_sound")
-        elif "sand" in touched_textures:
-            self.v = self.speed * sand_acceleration
-            self.v_alpha = self.speed_alpha * sand_acceleration
-            if self.is_player and self.moving:
-                self.sounds.play_sound("sand_sound")
-        elif "wall" in touched_textures:
-            pass
-        else:
-            self.v = self.speed
-            self.v_alpha = self.speed_alpha
-        if "lava" in touched_textures:
+        factor, sound = TERRAIN_SPEED_TABLE[effects]
+        if factor is not None:
+            self.v = self.speed * factor
+            self.v_alpha = self.speed_alpha * factor
+        if sound and self.is_player and self.moving:
+            self.sounds.play_sound(sound)
+        if effects & EFFECT_HAZARD:
             self.get_spawn_position(game_map, robots)
             self.hp -= 40
-            if self.is_player:
-                self.sounds.play_sound("lava_sound")
-        if "bush" in touched_textures:
+            self.sounds.play_at("lava_sound", self.x, self.y)
+        if effects & EFFECT_COVER:
             self.in_bush = True
-            self.bush_tiles = []
-            for [i, j] in self.touched_tiles():
-                if game_map.get_tile_type(i, j) == "bush":
-                    self.bush_tiles.append((i, j))
+            self.update_occupancy(game_map)  # the robot may have respawned (lava)
+            self.bush_tiles = self.occupied_bush_tiles
             if self.is_player and self.moving:
                 self.sounds.play_sound("bush_sound")
 
@@ -296,38 +528,19 @@ class Robot:
             self.in_bush = False
             self.bush_tiles = []
 
-    # Get random spawn position
+    # Get spawn position far away from the other robots (e.g. after touching lava)
     def get_spawn_position(
         self, game_map: Map, robots: list["Robot"]
     ) -> tuple[int, int]:
-        # Get random position
-        position_x = random.randint(
-            2 * config.TILE_SIZE + self.hitbox_radius,
-            (config.COLUMNS - 2) * config.TILE_SIZE,
-        )
-        position_y = random.randint(
-            2 * config.TILE_SIZE + self.hitbox_radius,
-            (config.ROWS - 2) * config.TILE_SIZE,
-        )
-        # Check for distance to other robots
-        self.x = position_x
-        self.y = position_y
-        max_dist = math.hypot(
-            config.TILE_SIZE * (config.ROWS - 2),
-            config.TILE_SIZE * (config.COLUMNS - 2),
-        )
-        min_dist = max_dist / (len(robots) + 1)
-        if self.robot_dist(robots)[0][0] > min_dist:
-            # Check for tiles to avoid walls, lava and bush
-            touched_textures = self.touched_textures(game_map)
-            if (
-                ("lava" not in touched_textures)
-                and ("wall" not in touched_textures)
-                and ("bush" not in touched_textures)
-            ):
-                return (position_x, position_y)
-        # Try again
-        return self.get_spawn_position(game_map, robots)
+        occupied = [(robot.x, robot.y) for robot in robots if robot is not self]
+        try:
+            position = get_spawn_service(game_map).find_position(
+                self.get_hitbox(0, 0), occupied
+            )
+        except NoSpawnPositionError:
+            return (self.x, self.y)  # nowhere to respawn, the robot stays
+        self.x, self.y = position
+        return position
 
     # moves robot if new position not in wall
     def move_if_no_walls(
@@ -338,67 +551,42 @@ class Robot:
         robots: list["Robot"],
         game_map: Map,
         check_for_lava: bool = False,
-    ) -> None:
-        xnew = self.x + x
-        ynew = self.y + y
-        # moves robot to direct wanted path if no wall
-        hitbox = self.get_hitbox(xnew, ynew)
-        if hitbox.collidelist(walls) == -1:
-            self.x = xnew
-            self.y = ynew
-            if check_for_lava:
-                touched_textures = self.touched_textures(game_map)
-                if "lava" in touched_textures:
-                    self.y -= y
-                    touched_textures = self.touched_textures(game_map)
-                    if "lava" in touched_textures:
-                        self.x -= x
-                        self.y += y
-                        if "lava" in touched_textures:
-                            self.y -= y
-                else:
-                    (dist, robot) = self.robot_dist(robots)[0]
-                    if dist <= 0:
-                        self.x -= x
-                        self.y -= y
-                        self.robot_collision(robot, robots, walls)
-                check_for_lava = False
-            else:
-                (dist, robot) = self.robot_dist(robots)[0]
-                if dist <= 0:
-                    self.x -= x
-                    self.y -= y
-                    self.robot_collision(robot, robots, walls)
-        # to avoid not moving at all when goal is behind wall
-        else:
+        grid: SpatialHash | None = None,
+    ) -> Contact | None:
+        """
+        Moves the robot by (x, y) until its hitbox touches a wall (or lava) and
+        lets it slide along the wall with the rest of the movement.
+        Returns where it touched the wall (None if it did not).
+        """
+        # walls (and lava) are swept in the configuration space of the map
+        blocked = EFFECT_SOLID | EFFECT_HAZARD if check_for_lava else EFFECT_SOLID
+        space = self.configuration_space(game_map, blocked)
+        xnew, ynew, contact = space.sweep(self.x, self.y, x, y)
+        if contact is not None:
             current_time = pygame.time.get_ticks()
             # avoid playing the wall_hit sound too often when going along a wall
             if self.is_player and (current_time - self.last_wall_hit_time > 3000):
                 self.sounds.play_sound("wall_hit_sound")
                 self.last_wall_hit_time = current_time
-            # check and move if only in x direction is no wall
-            xnew = self.x + x
-            ynew = self.y
-            hitbox = self.get_hitbox(xnew, ynew)
-            if hitbox.collidelist(walls) == -1:
-                self.x = xnew
-                self.y = ynew
-                (dist, robot) = self.robot_dist(robots)[0]
-                if dist <= 0:
-                    self.x -= x
-                    self.robot_collision(robot, robots, walls)
-            else:
-                # check and move if only in y direction is no wall
-                xnew = self.x
-                ynew = self.y + y
-                hitbox = self.get_hitbox(xnew, ynew)
-                if hitbox.collidelist(walls) == -1:
-                    self.x = xnew
-                    self.y = ynew
-                    (dist, robot) = self.robot_dist(robots)[0]
-                    if dist <= 0:
-                        self.y -= y
-                        self.robot_collision(robot, robots, walls)
+
+        # the robot only moves if it does not run into another robot
+        xold = self.x
+        yold = self.y
+        self.x = xnew
+        self.y = ynew
+        (dist, robot) = self.nearest_robot(robots, grid)
+        if dist <= 0:
+            self.x = xold
+            self.y = yold
+            self.robot_collision(robot, robots, game_map, grid)
+        return contact
+
+    def move_without_robots(
+        self, x: float, y: float, walls: list[pygame.Rect], game_map: Map
+    ) -> None:
+        """Cheaper move_if_no_walls (simulation LOD): walls and lava, no robots"""
+        safe = self.configuration_space(game_map, EFFECT_SOLID | EFFECT_HAZARD)
+        self.x, self.y, _ = safe.sweep(self.x, self.y, x, y)
 
     def shoot(
         self,
@@ -407,6 +595,7 @@ class Robot:
         walls: list[pygame.Rect],
         robots: list["Robot"],
         game_map: Map,
+        grid: SpatialHash | None = None,
     ) -> None:
         current_time = pygame.time.get_ticks()
         # make sure there is a break between the shots
@@ -429,21 +618,27 @@ class Robot:
             (0, 0, 0),
             self,
             20 * camera.zoom,
-            800,  # reach
+            BULLET_REACH,
         )  # create bullet
         # recoil
         direction_rad = math.radians(self.alpha)
         x = self.v * -math.cos(direction_rad) * 2
         y = self.v * -math.sin(direction_rad) * 2
-        self.move_if_no_walls(x, y, walls, robots, game_map)
+        self.move_if_no_walls(x, y, walls, robots, game_map, grid=grid)
         self.last_shot_time = current_time  # update time of last shot
         self.power -= 20  # update power
         bullets.append(bullet)
-        if self.is_player:
-            self.sounds.play_sound("shot_sound")
+        if grid is not None:
+            grid.insert(bullet, "bullet", bullet.radius)
+        self.sounds.play_at("shot_sound", self.x, self.y)
 
     # checks and react if robot is shot
-    def getting_shot(self, bullets: list[Bullet]) -> None:
+    def getting_shot(
+        self, bullets: list[Bullet], grid: SpatialHash | None = None
+    ) -> None:
+        if grid is not None:  # only the bullets near enough to hit
+            reach = grid.max_radius.get("bullet", 0) + self.hitbox_radius * 0.35
+            bullets = grid.query_radius("bullet", self.x, self.y, reach)
         for bullet in bullets:
             if self is bullet.shooter:  # except for robot which shot the bullet
                 continue
@@ -454,60 +649,30 @@ class Robot:
             if dist < max_dist:
                 bullet.alive = False
                 self.hp = self.hp - 15
-                if self.is_player:
-                    self.sounds.play_sound("player_hit_sound")
+                self.sounds.play_at("player_hit_sound", self.x, self.y)
 
     # helper-function to get list of robots with probability corresponding to its distance
     def dist_to_prob(
         self, dist_robot: list[tuple[float, "Robot"]]
     ) -> list[tuple[float, "Robot"]]:
-        prob_robot: list[tuple[float, "Robot"]] = []
-        total_dist: float = sum(d for d, r in dist_robot)
-        for dist, robot in dist_robot:
-            # preventing divison with 0
-            if dist == 0:
-                prob: float = 10**9
-            else:
-                prob: float = total_dist / dist
-
-            prob_robot.append((prob, robot))
-        return prob_robot
+        return distances_to_probabilities(dist_robot)
 
     # helper-function to get list of robots with corresponding distance
     def get_robot_with_distance_prob(
         self, game_map: Map, robots: list["Robot"]
     ) -> "None | Robot":
-        potential_goals: list["Robot"] = []
-        for robot in robots:
-            if (
-                not all("bush" == tile for tile in robot.touched_textures(game_map))
-            ) and robot is not self:
-                potential_goals.append(robot)
-        if len(potential_goals) > 0:
-            dist_robot: list[tuple[float, "Robot"]] = self.robot_dist(potential_goals)
-            prob_robot: list[tuple[float, "Robot"]] = self.dist_to_prob(dist_robot)
-
-            # avoiding: 'ValueError: Total of weights must be greater than zero'
-            # by removing robots with zero probability before calling random.choices
-            prob_robot = [(p, r) for p, r in prob_robot if p > 0]
-
-            robot: "Robot" = random.choices(
-                [r for p, r in prob_robot], weights=[p for p, r in prob_robot], k=1
-            )[0]
-            return robot
-        return None
+        return choose_goal(self, robots, game_map)
 
     # Avoid if in range of other robots
     def move_if_in_range(
-        self, robots: list["Robot"], walls: list[pygame.Rect], game_map: Map
+        self,
+        robots: list["Robot"],
+        walls: list[pygame.Rect],
+        game_map: Map,
+        grid: SpatialHash | None = None,
     ) -> None:
-        for robot in robots:
-            if robot == self:
-                continue
-            rad_to_robot = math.atan2(robot.y - self.y, robot.x - self.x)
-            angle_to_robot = (math.degrees(rad_to_robot) + 180) % 360
-            angle_diff = abs(abs(angle_to_robot) - robot.alpha) % 360
-            if (angle_diff <= 10) or (angle_diff >= 350):  # in range of robot
+        for robot in self.robots_within(robots, BULLET_REACH, grid):
+            if facing(self.x, self.y, robot):  # in range of robot
                 x_to_goal = robot.x - self.x
                 y_to_goal = robot.y - self.y
                 if abs(y_to_goal) <= 0.5:
@@ -518,81 +683,54 @@ class Robot:
                     y = math.copysign(self.v, x_to_goal * -1)
                 else:
                     y = math.copysign(0, x_to_goal * -1)
-                self.move_if_no_walls(x, y, walls, robots, game_map)  # move to side
+                # move to side
+                self.move_if_no_walls(x, y, walls, robots, game_map, grid=grid)
 
     # Robot does nothing (but still experience effects of map and bullets)
     def exist(
-        self, game_map: Map, robots: list["Robot"], bullets: list[Bullet]
+        self,
+        game_map: Map,
+        robots: list["Robot"],
+        bullets: list[Bullet],
+        steps: int = 1,
+        grid: SpatialHash | None = None,
     ) -> None:
         # Check for effects and bullets
         self.map_effects(game_map, robots)
-        self.getting_shot(bullets)
+        self.getting_shot(bullets, grid)
 
-        # recharge power
+        # recharge power (for all frames since the last update)
         if self.power < 100:
-            self.power += recharge_rate
+            self.power = min(self.power + recharge_rate * steps, 100)
 
     def go_hide(
-        self, game_map: Map, walls: list[pygame.Rect], robots: list["Robot"]
+        self,
+        game_map: Map,
+        walls: list[pygame.Rect],
+        robots: list["Robot"],
+        hiding_spot: tuple[float, float] | None = None,
+        steps: int = 1,
+        grid: SpatialHash | None = None,
     ) -> None:
+        """Moves to the nearest bush (hiding_spot if it was planned already)"""
         # Already in bush
-        if all("bush" == tile for tile in self.touched_textures(game_map)):
+        if self.is_hidden(game_map):
             return None
-        # Search for nearest Bush
-        bush_tiles = []
-        for i in range(0, config.COLUMNS):
-            for j in range(0, config.ROWS):
-                if game_map.get_tile_type(i, j) == "bush":
-                    bush_tiles.append((i, j))
-        sorted_bush_tiles = []
-        for i, j in bush_tiles:
-            tile_x = (i + 1 / 2) * config.TILE_SIZE
-            tile_y = (j + 1 / 2) * config.TILE_SIZE
-            dist = math.sqrt((tile_x - self.x) ** 2 + (tile_y - self.y) ** 2)
-            sorted_bush_tiles.append((i, j, dist))
-        sorted_bush_tiles = sorted(sorted_bush_tiles, key=lambda tile: tile[2])
-        nearest_bush_middle = None
-        for i, j, d in sorted_bush_tiles:
-            xn = 1
-            yn = 1
-            while (2 * self.get_hitbox().width) >= (xn * config.TILE_SIZE):
-                if i + xn <= config.COLUMNS and (i + xn, j) in bush_tiles:
-                    xn += 1
-                else:
-                    break
-            while (2 * self.get_hitbox().height) >= (yn * config.TILE_SIZE):
-                if j + yn <= config.ROWS:
-                    if (((i + n, j + yn) in bush_tiles) for n in range(xn)):
-                        yn += 1
-                else:
-                    break
-            if (
-                2 * self.get_hitbox().width < xn * config.TILE_SIZE
-                and 2 * self.get_hitbox().height < yn * config.TILE_SIZE
-            ):
-                # get middle
-                x = (i + (xn - 1)) * config.TILE_SIZE
-                y = (j + (yn - 1)) * config.TILE_SIZE
-                nearest_bush_middle = (x, y)
-                break
+        # Search for nearest Bush (bush tiles are collected when loading the map)
+        if hiding_spot is None:
+            hiding_spot = find_hiding_spot(self.x, self.y, self.hitbox_radius, game_map)
+        nearest_bush_middle = hiding_spot
         # go to bush
         if not nearest_bush_middle:
             return None
-        x = math.copysign(self.v, nearest_bush_middle[0] - self.x)
-        y = math.copysign(self.v, nearest_bush_middle[1] - self.y)
+        x = math.copysign(self.v * steps, nearest_bush_middle[0] - self.x)
+        y = math.copysign(self.v * steps, nearest_bush_middle[1] - self.y)
         # Adjust rotation to face the goal
-        rad_to_goal = math.atan2(
-            nearest_bush_middle[1] - self.y, nearest_bush_middle[0] - self.x
+        angle_to_goal = goal_angle(
+            nearest_bush_middle[0] - self.x, nearest_bush_middle[1] - self.y, self.alpha
         )
-        angle_to_goal = (math.degrees(rad_to_goal) + 180) % 360
-
-        # Invert direction if shortest rotation is the other way
-        if angle_to_goal < self.alpha:
-            if abs(angle_to_goal - self.alpha) > 180:
-                angle_to_goal *= -1
-        else:
-            if abs(angle_to_goal - self.alpha) < 180:
-                angle_to_goal *= -1
-        self.alpha += math.copysign(self.v_alpha, angle_to_goal)
+        self.alpha += math.copysign(self.v_alpha * steps, angle_to_goal)
         self.alpha = self.alpha % 360
-        self.move_if_no_walls(x, y, walls, robots, game_map, check_for_lava=True)
+        self.move_if_no_walls(
+            x, y, walls, robots, game_map, check_for_lava=True, grid=grid
+        )
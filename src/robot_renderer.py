@@ -39,6 +39,7 @@ class RobotRenderer:
         self.frame_indices: dict[object, int] = {}
         self.timers: dict[object, float] = {}
         self.frame_duration = 0.3  # seconds per frame
+        self.fonts: dict[int, pygame.font.Font] = {}  # font size -> font
 
         # Load animation frames for each robot type
         self.load_robot_type("Spider")
@@ -71,6 +72,50 @@ class RobotRenderer:
                 self.animations[robot.robot_type]
             )
 
+    def forget_robot(self, robot) -> None:
+        """Drop the animation state of a robot (e.g. when it is destroyed)"""
+        self.frame_indices.pop(robot, None)
+        self.timers.pop(robot, None)
+
+    def forget_robots(self) -> None:
+        """Drop the animation state of all robots (e.g. at the end of a match)"""
+        self.frame_indices.clear()
+        self.timers.clear()
+
+    def get_font(self, size: int) -> pygame.font.Font:
+        """Returns the font for the value texts (loaded once per size)"""
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.SysFont("Arial", size, bold=True)
+        return self.fonts[size]
+
+    def draw_sprite(
+        self, frame: pygame.Surface, size: int, angle: float, center: tuple[int, int]
+    ) -> pygame.Rect:
+        """Draws a robot frame scaled to size x size and rotated around center"""
+        scaled_image = pygame.transform.smoothscale(frame, (size, size))
+
+        # Rotate after scaling
+        rotated_image = pygame.transform.rotate(scaled_image, angle)
+
+        # Center rotated image at the robot's position
+        rect = rotated_image.get_rect(center=center)
+
+        # Draw on camera surface
+        return self.camera_surface.blit(rotated_image, rect)
+
+    def draw_rect(self, color, rect: pygame.Rect, width: int = 0) -> None:
+        """Draws a filled rect (or its outline if width > 0)"""
+        pygame.draw.rect(self.camera_surface, color, rect, width)
+
+    def draw_icon(
+        self, name: str, size: int, position: tuple[float, float], angle: float = 0
+    ) -> pygame.Rect:
+        """Draws an icon of config.ICONS scaled to size x size (and rotated)"""
+        icon = pygame.transform.scale(config.ICONS[name], (size, size))
+        if angle:
+            icon = pygame.transform.rotate(icon, angle)
+        return self.camera_surface.blit(icon, position)
+
     def draw_text_with_outline(
         self, font, text, x, y, color=(255, 255, 255), outline_color=(0, 0, 0)
     ):
@@ -93,9 +138,20 @@ class RobotRenderer:
         main_text = font.render(text, True, color)
         self.camera_surface.blit(main_text, (x, y))
 
-    def draw(self, robot, camera, dt):
+    def cull_margin(self, robot, camera) -> float:
+        """Distance (world pixels) from the robot center its sprite and bars reach"""
+        # bars are drawn up to 130 below the robot, sprite and bars are about
+        # hitbox_radius screen pixels wide
+        return 130 + 2 * robot.hitbox_radius / camera.zoom
+
+    def is_visible(self, robot, camera) -> bool:
+        """Whether anything drawn for the robot would be in the camera view"""
+        return camera.is_visible(robot.x, robot.y, self.cull_margin(robot, camera))
+
+    def draw(self, robot, camera, dt) -> pygame.Rect:
         """Renders the robot sprite (or default shape), eyes,
-        life count and power bar using the camera system"""
+        life count and power bar using the camera system
+        Returns the screen region of everything drawn for the robot"""
 
         self.update_animation(robot, dt)
 
@@ -104,22 +160,13 @@ class RobotRenderer:
             frame = self.animations[robot.robot_type][self.frame_indices.get(robot, 0)]
 
             scaled_size = int(robot.hitbox_radius * camera.zoom)
-            scaled_image = pygame.transform.smoothscale(
-                frame, (scaled_size, scaled_size)
+            drawn_rect = self.draw_sprite(
+                frame, scaled_size, -robot.alpha, camera.apply(robot.x, robot.y)
             )
 
-            # Rotate after scaling
-            rotated_image = pygame.transform.rotate(scaled_image, -robot.alpha)
-
-            # Center rotated image at the robot's position
-            rect = rotated_image.get_rect(center=camera.apply(robot.x, robot.y))
-
-            # Draw on camera surface
-            self.camera_surface.blit(rotated_image, rect)
-
         else:
             # Default body
-            pygame.draw.circle(
+            drawn_rect = pygame.draw.circle(
                 self.camera_surface,
                 robot.color,
                 camera.apply(robot.x, robot.y),
@@ -166,7 +213,7 @@ class RobotRenderer:
 
         # Draw background bar
         if not robot.in_bush:
-            pygame.draw.rect(self.camera_surface, bg_color_power, bg_power_rect)
+            self.draw_rect(bg_color_power, bg_power_rect)
 
         # Draw outline for background bar
         bg_outline_color = (
@@ -175,8 +222,7 @@ class RobotRenderer:
             min(bg_color_power[2] + 30, 255),
         )
         if not robot.in_bush:
-            pygame.draw.rect(
-                self.camera_surface,
+            self.draw_rect(
                 bg_outline_color,
                 bg_power_rect,
                 robot.hitbox_radius // 25,
@@ -184,8 +230,7 @@ class RobotRenderer:
 
         # Draw fill bar
         if not robot.in_bush:
-            pygame.draw.rect(
-                self.camera_surface,
+            self.draw_rect(
                 POWER_BAR_COLOR,
                 pygame.Rect(power_x, power_y, fill_width, power_height),
             )
@@ -194,33 +239,33 @@ class RobotRenderer:
         r, g, b = POWER_BAR_COLOR
         highlight_color = (min(r + 40, 255), min(g + 40, 255), min(b + 40, 255))
         if not robot.in_bush:
-            pygame.draw.rect(
-                self.camera_surface,
+            self.draw_rect(
                 highlight_color,
                 pygame.Rect(power_x, power_y, fill_width, power_height),
                 robot.hitbox_radius // 25,
             )
 
         # Draw power value text
-        font = pygame.font.SysFont("Arial", int(power_height * 1.5), bold=True)
+        font = self.get_font(int(power_height * 1.5))
         text = str(int(robot.power))
-        power_number = font.render(text, True, (255, 255, 255))
-        p_nrect = power_number.get_rect()
-        power_text_x = power_x + (power_width - p_nrect.width) // 2
-        power_text_y = power_y + (power_height - p_nrect.height) // 2
+        p_width, p_height = font.size(text)
+        power_text_x = power_x + (power_width - p_width) // 2
+        power_text_y = power_y + (power_height - p_height) // 2
 
         if config.SHOW_STATS:
             if not robot.in_bush:
                 self.draw_text_with_outline(font, text, power_text_x, power_text_y)
 
         # Draw power icon (lightning)
-        icon_power = pygame.transform.scale(
-            config.ICONS["power"], (int(power_height + 4), int(power_height + 4))
-        )
-        icon_x = power_x - icon_power.get_width() - 5
+        icon_power_size = int(power_height + 4)
+        icon_x = power_x - icon_power_size - 5
         icon_y = power_y
+        drawn_rect = drawn_rect.union(
+            pygame.Rect(icon_x, icon_y, icon_power_size, icon_power_size)
+        )
+        drawn_rect = drawn_rect.union(bg_power_rect)
         if not robot.in_bush:
-            self.camera_surface.blit(icon_power, (icon_x, icon_y))
+            self.draw_icon("power", icon_power_size, (icon_x, icon_y))
 
         # --- Life bar (above power bar) ---
         max_life_height = power_height  # same height as power bar
@@ -252,7 +297,7 @@ class RobotRenderer:
 
         # Draw background
         if not robot.in_bush:
-            pygame.draw.rect(self.camera_surface, bg_color_rgb, bg_rect)
+            self.draw_rect(bg_color_rgb, bg_rect)
 
         # Draw outline for background bar
         bg_outline_color = (
@@ -261,8 +306,7 @@ class RobotRenderer:
             min(bg_color_rgb[2] + 30, 255),
         )
         if not robot.in_bush:
-            pygame.draw.rect(
-                self.camera_surface,
+            self.draw_rect(
                 bg_outline_color,
                 bg_rect,
                 robot.hitbox_radius // 20,
@@ -270,8 +314,7 @@ class RobotRenderer:
 
         # Draw fill bar
         if not robot.in_bush:
-            pygame.draw.rect(
-                self.camera_surface,
+            self.draw_rect(
                 bar_color,
                 pygame.Rect(life_x, life_y, fill_life_width, max_life_height),
             )
@@ -281,8 +324,7 @@ class RobotRenderer:
         highlight_color = (min(r + 30, 255), min(g + 30, 255), min(b + 40, 255))
 
         if not robot.in_bush:
-            pygame.draw.rect(
-                self.camera_surface,
+            self.draw_rect(
                 highlight_color,
                 pygame.Rect(life_x, life_y, fill_life_width, max_life_height),
                 robot.hitbox_radius // 25,
@@ -290,11 +332,9 @@ class RobotRenderer:
 
         # Draw text (HP number)
         life_text = str(int(robot.hp))
-        l_nrect = font.render(
-            life_text, True, (0, 0, 0)
-        ).get_rect()  # use same font as power bar
-        text_x = life_x + (max_life_widht - l_nrect.width) // 2
-        text_y = life_y + (max_life_height - l_nrect.height) // 2
+        l_width, l_height = font.size(life_text)  # use same font as power bar
+        text_x = life_x + (max_life_widht - l_width) // 2
+        text_y = life_y + (max_life_height - l_height) // 2
 
         # Only show HP text if SHOW_STATS is active
         if config.SHOW_STATS:
@@ -303,13 +343,15 @@ class RobotRenderer:
 
         # Draw life icon (heart)
         icon_size = max_life_height
-        icon_heart = pygame.transform.scale(
-            config.ICONS["heart"], (int(icon_size + 3), int(icon_size + 3))
-        )
-        icon_x = life_x - icon_heart.get_width() - 5
+        icon_heart_size = int(icon_size + 3)
+        icon_x = life_x - icon_heart_size - 5
         icon_y = life_y
+        drawn_rect = drawn_rect.union(
+            pygame.Rect(icon_x, icon_y, icon_heart_size, icon_heart_size)
+        )
+        drawn_rect = drawn_rect.union(bg_rect)
         if not robot.in_bush:
-            self.camera_surface.blit(icon_heart, (icon_x, icon_y))
+            self.draw_icon("heart", icon_heart_size, (icon_x, icon_y))
 
         # Draw Explosion for shooting
         fire_height = robot.hitbox_radius * 0.15
@@ -332,14 +374,16 @@ class RobotRenderer:
         )
 
         icon_size = fire_height
-        icon_fire = pygame.transform.scale(
-            config.ICONS["explosion"], (int(icon_size + 3), int(icon_size + 3))
-        ).convert_alpha()
-
-        icon_fire = pygame.transform.rotate(
-            icon_fire, -robot.alpha - 90
-        )  # angle image to fit robot.angle
 
         current_time = pygame.time.get_ticks()
         if current_time - robot.last_shot_time < 30:
-            self.camera_surface.blit(icon_fire, (fire_x, fire_y))
+            drawn_rect = drawn_rect.union(
+                self.draw_icon(
+                    "explosion",
+                    int(icon_size + 3),
+                    (fire_x, fire_y),
+                    -robot.alpha - 90,  # angle image to fit robot.angle
+                )
+            )
+        # the value texts are a bit larger than the bars
+        return drawn_rect.inflate(int(power_height), int(power_height))
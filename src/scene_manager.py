@@ -0,0 +1,112 @@
+"""
+Runs the screens of the game (menus, countdown, match, pause, ...) as scenes
+in one loop.
+
+Scenes do not call each other. They ask the SceneManager to switch to another
+scene (all scenes are left and release their resources), to replace the top
+scene, to push a scene on top (e.g. pause over the match) or to pop back to
+the scene below. The changes are applied between two frames, so playing many
+rounds does not nest stack frames that keep old matches alive.
+"""
+
+import pygame
+
+
+class Scene:
+    """A screen of the game, the methods are called by the SceneManager"""
+
+    manager: "SceneManager"
+
+    def enter(self) -> None:
+        """Called when the scene becomes the top scene (again)"""
+
+    def handle_event(self, event: pygame.event.Event) -> None:
+        """Called for every event while the scene is the top scene"""
+
+    def update(self, ms: int) -> None:
+        """Update and draw one frame (ms: time since the last frame)"""
+
+    def exit(self) -> None:
+        """Called when the scene is removed, its resources are released here"""
+
+
+class SceneManager:
+    def __init__(self, clock: pygame.time.Clock, fps: int = 60):
+        self.clock = clock
+        self.fps = fps
+        self.stack: list[Scene] = []  # top scene last
+        self.pending: list[tuple[str, Scene | None]] = []  # changes for next frame
+        self.running = False
+
+    @property
+    def scene(self) -> Scene | None:
+        """The scene shown at the moment"""
+        return self.stack[-1] if self.stack else None
+
+    def switch(self, scene: Scene) -> None:
+        """Leave all scenes and show scene"""
+        self.pending.append(("switch", scene))
+
+    def replace(self, scene: Scene) -> None:
+        """Leave the top scene and show scene instead"""
+        self.pending.append(("replace", scene))
+
+    def push(self, scene: Scene) -> None:
+        """Show scene on top, the scene below continues when it is popped"""
+        self.pending.append(("push", scene))
+
+    def pop(self) -> None:
+        """Leave the top scene and return to the scene below"""
+        self.pending.append(("pop", None))
+
+    def quit(self) -> None:
+        self.running = False
+
+    def apply_pending(self) -> None:
+        """Apply the scene changes requested in the last frame"""
+        while self.pending:
+            action, scene = self.pending.pop(0)
+            if action == "switch":
+                while self.stack:
+                    self.stack.pop().exit()
+            elif action in ("replace", "pop") and self.stack:
+                self.stack.pop().exit()
+            if scene is not None:
+                scene.manager = self
+                self.stack.append(scene)
+            if self.stack:
+                self.stack[-1].enter()
+
+    def run(self, scene: Scene) -> None:
+        """Run the game loop until quit() is called or no scene is left"""
+        self.switch(scene)
+        self.running = True
+        while self.running:
+            self.apply_pending()
+            if not self.stack:
+                break
+            ms = self.clock.tick(self.fps)
+            self.step(ms, pygame.event.get())
+        self.close()
+
+    def step(self, ms: int, events: list[pygame.event.Event]) -> None:
+        """One frame of the top scene: hand it the events, then update it"""
+        self.apply_pending()
+        if not self.stack:
+            return
+        scene = self.stack[-1]
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.quit()
+                break
+            scene.handle_event(event)
+            if self.pending:
+                break  # the next events belong to the next scene
+        if self.running and not self.pending:
+            scene.update(ms)
+
+    def close(self) -> None:
+        """Leave all scenes"""
+        self.pending.clear()
+        while self.stack:
+            self.stack.pop().exit()
@@ -0,0 +1,79 @@
+"""
+Simulation level of detail: enemies far away from the camera and the player
+are updated less often. Each update then simulates all frames since the last
+one at once (speed, rotation and power recharge are scaled), and far enemies
+use a cheaper movement model without the checks against other robots.
+Hits are still checked every frame, lava and other map effects on every update.
+"""
+
+import math
+import config
+from camera import Camera
+from robot import Robot
+
+
+class SimulationLOD:
+    def __init__(self, bands: list[tuple[float, int]] = config.LOD_BANDS):
+        """bands: (max distance in tiles, update every n frames), nearest first"""
+        self.bands = bands
+        self.last_update: dict[Robot, int] = {}  # robot -> frame of its last update
+        self.phases: dict[Robot, int] = {}  # robot -> offset of its update frames
+        self.frame = 0
+
+        # statistics of the current frame
+        self.band_counts = [0] * len(bands)  # enemies per band
+        self.updates = 0  # enemies updated in this frame
+        self.skipped = 0  # enemies only checked for hits in this frame
+
+    def start(self, enemies: list[Robot]) -> None:
+        """Spread the updates of the enemies over the frames"""
+        for i, enemy in enumerate(enemies):
+            self.last_update[enemy] = self.frame
+            self.phases[enemy] = i
+
+    def remove(self, robot: Robot) -> None:
+        self.last_update.pop(robot, None)
+        self.phases.pop(robot, None)
+
+    def next_frame(self) -> None:
+        self.frame += 1
+        self.band_counts = [0] * len(self.bands)
+        self.updates = 0
+        self.skipped = 0
+
+    def band(self, robot: Robot, player: Robot, camera: Camera) -> int:
+        """Index of the distance band of a robot (distance to camera or player)"""
+        distance = min(
+            math.hypot(robot.x - camera.center_x, robot.y - camera.center_y),
+            math.hypot(robot.x - player.x, robot.y - player.y),
+        ) / config.TILE_SIZE
+        for i, (max_distance, _) in enumerate(self.bands):
+            if distance <= max_distance:
+                return i
+        return len(self.bands) - 1
+
+    def steps(self, robot: Robot, band: int) -> int:
+        """Frames to simulate for the robot in this frame (0: not due)"""
+        self.band_counts[band] += 1
+        every = self.bands[band][1]
+        if (self.frame + self.phases.get(robot, 0)) % every:
+            self.skipped += 1
+            return 0
+        # after a band change this can differ from every
+        steps = self.frame - self.last_update.get(robot, self.frame - 1)
+        self.last_update[robot] = self.frame
+        self.updates += 1
+        return steps
+
+    def stats(self) -> dict[str, int | str]:
+        """Counters for the profiler"""
+        stats: dict[str, int | str] = {
+            "lod bands": " ".join(
+                f"{max_distance:g}:{every}" for max_distance, every in self.bands
+            ),
+            "lod updates": self.updates,
+            "lod skipped": self.skipped,
+        }
+        for i, count in enumerate(self.band_counts):
+            stats[f"lod band {i}"] = count
+        return stats
@@ -0,0 +1,385 @@
+"""
+Soak test: plays many matches headless with scripted input and watches memory
+and frame times over the whole session.
+
+Run from the src directory (resources are loaded relative to it):
+
+    python soak.py --matches 2000 --output soak.json
+    python soak.py --minutes 120 --battle-every 10
+
+The script clicks through the menus, drives the player with changing key
+combinations, pauses every match once and ends it after --match-frames frames
+(alternately by losing and by winning). Every --sample-every frames it records
+traced memory (tracemalloc), the resident set size, the object count per type
+and the frame time percentiles of the match frames since the last sample.
+The resident set size is measured as the game has it, including free memory
+the C heap keeps. With --trim-heap, free memory of the C heap is also given
+back to the system after each sample and the size after that is recorded
+(glibc only, rss_trimmed_kb): if only the untrimmed size grows, the growth is
+memory the C heap keeps, not live objects. It fails (exit code 1) if memory
+(untrimmed) or the p95 frame time grew beyond the thresholds between the first
+sample after the warm-up and the end.
+"""
+
+import os
+
+# Run without a window and without a sound device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse  # noqa: E402
+import collections  # noqa: E402
+import ctypes  # noqa: E402
+import ctypes.util  # noqa: E402
+import gc  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import tracemalloc  # noqa: E402
+
+import pygame  # noqa: E402
+
+import ai_planner  # noqa: E402
+import config  # noqa: E402
+import main  # noqa: E402  (sets up the window, does not start the game loop)
+from scene_manager import Scene, SceneManager  # noqa: E402
+
+FRAME_MS = 1000 // 60  # simulated time per frame
+MOVE_KEYS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN]
+TURN_KEYS = [pygame.K_a, pygame.K_d]
+RESULT_FRAMES = 30  # frames the result is shown before the next match
+
+
+class Keys(dict):
+    """Pressed keys like pygame.key.get_pressed(), missing keys are not pressed"""
+
+    def __missing__(self, key: int) -> bool:
+        return False
+
+
+class Script:
+    def __init__(
+        self, seed: int, match_frames: int, menu_every: int, battle_every: int
+    ):
+        """Scripted input: which keys are held and which events are sent"""
+        self.random = random.Random(seed)
+        self.match_frames = match_frames
+        self.menu_every = menu_every  # return to the main menu every n matches
+        self.battle_every = battle_every  # play a mass battle every n matches
+        self.keys = Keys()
+        self.scene: Scene | None = None  # scene of the last frame
+        self.scene_frames = 0  # frames of the current scene
+        self.match: Scene | None = None  # match of the last match frame
+        self.match_frame = 0  # frames of the current match (without pauses)
+        self.paused = False  # whether the current match was paused already
+        self.matches = 0  # finished matches
+
+    def get_pressed(self) -> Keys:
+        return self.keys
+
+    def hold_random_keys(self) -> None:
+        """New key combination: movement, turning and shooting"""
+        self.keys = Keys()
+        for key in self.random.sample(MOVE_KEYS, self.random.randint(0, 2)):
+            self.keys[key] = True
+        if self.random.random() < 0.5:
+            self.keys[self.random.choice(TURN_KEYS)] = True
+        self.keys[pygame.K_s] = self.random.random() < 0.6
+
+    def next_level(self) -> str:
+        if self.battle_every and (self.matches + 1) % self.battle_every == 0:
+            return "Mass Battle"
+        return self.random.choice(["Level 1", "Level 2"])
+
+    def events(self, scene: Scene) -> list[pygame.event.Event]:
+        """Events for the next frame of scene"""
+        if scene is not self.scene:
+            self.scene = scene
+            self.scene_frames = 0
+        self.scene_frames += 1
+
+        if isinstance(scene, main.MainMenuScene):
+            return [click(scene, "Level selection")] if self.scene_frames > 2 else []
+        if isinstance(scene, main.LevelSelectScene):
+            return [click(scene, self.next_level())] if self.scene_frames > 2 else []
+        if isinstance(scene, main.PauseScene):
+            return [click(scene, "Continue")] if self.scene_frames > 2 else []
+        if isinstance(scene, (main.MatchScene, main.BattleScene)):
+            return self.play(scene)
+        if isinstance(scene, main.ResultScene) and self.scene_frames == RESULT_FRAMES:
+            self.matches += 1
+            if self.menu_every and self.matches % self.menu_every == 0:
+                return [key_event(pygame.K_ESCAPE)]
+            if self.battle_every and (self.matches + 1) % self.battle_every == 0:
+                return [key_event(pygame.K_ESCAPE)]  # battles start in the menu
+            return [key_event(pygame.K_RETURN)]
+        return []
+
+    def play(self, match: "main.MatchScene | main.BattleScene") -> list:
+        if match is not self.match:  # new match, not the one after a pause
+            self.match = match
+            self.match_frame = 0
+            self.paused = False
+        self.match_frame += 1
+        if self.match_frame % 30 == 1:
+            self.hold_random_keys()
+        if self.match_frame == self.match_frames // 2 and not self.paused:
+            self.paused = True
+            return [key_event(pygame.K_ESCAPE)]
+        if self.match_frame >= self.match_frames:
+            end_match(match, won=self.matches % 2 == 1)
+        return []
+
+
+def click(scene: "main.MenuScene", text: str) -> pygame.event.Event:
+    """Left click on the button of the menu with this text"""
+    for button, _ in scene.buttons:
+        if button.text == text:
+            return pygame.event.Event(
+                pygame.MOUSEBUTTONDOWN, button=1, pos=button.rect.center
+            )
+    raise ValueError(f"no button {text!r} in {type(scene).__name__}")
+
+
+def key_event(key: int) -> pygame.event.Event:
+    return pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode="")
+
+
+def end_match(match: "main.MatchScene | main.BattleScene", won: bool) -> None:
+    """Destroy the enemies or the player, the match ends in the next frame(s)"""
+    if isinstance(match, main.BattleScene):
+        world = match.world
+        for i in range(len(world.hp)):
+            if (world.team[i] == match.player.team) != won:
+                world.hp[i] = 0
+                world.alive[i] = False
+        return
+    for robot in match.robots:
+        if (robot is match.player) != won:
+            robot.hp = 0
+
+
+def rss_kb() -> float:
+    """Resident set size of the process"""
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    except OSError:
+        import resource  # not on Windows
+
+        # peak instead of the current size on systems without /proc
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / 1024 if sys.platform == "darwin" else maxrss
+
+
+def trim_heap() -> None:
+    """Give free memory of the C heap back to the system (glibc only)"""
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        libc.malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # not glibc (e.g. musl)
+
+
+def object_counts() -> collections.Counter:
+    return collections.Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+def percentile(values: list[float], p: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[p - 1]
+
+
+def take_sample(
+    frame: int, matches: int, start: float, frame_times: list[float], trim: bool
+) -> dict:
+    gc.collect()
+    rss = rss_kb()
+    if trim:  # the game itself never trims its heap
+        trim_heap()
+    traced, peak = tracemalloc.get_traced_memory()
+    counts = object_counts()
+    return {
+        "frame": frame,
+        "matches": matches,
+        "seconds": round(time.perf_counter() - start, 1),
+        "traced_kb": traced / 1024,
+        "traced_peak_kb": peak / 1024,
+        "rss_kb": rss,
+        "rss_trimmed_kb": rss_kb() if trim else None,
+        "objects": sum(counts.values()),
+        "object_types": dict(counts.most_common(20)),
+        "frames": len(frame_times),
+        "p50_ms": percentile(frame_times, 50),
+        "p95_ms": percentile(frame_times, 95),
+        "p99_ms": percentile(frame_times, 99),
+        "max_ms": max(frame_times, default=0.0),
+    }
+
+
+def check(baseline: dict, last: dict, args: argparse.Namespace) -> list[str]:
+    """Return the thresholds exceeded between the baseline and the last sample"""
+    failures = []
+    traced_growth = last["traced_kb"] - baseline["traced_kb"]
+    if traced_growth > args.max_traced_growth:
+        failures.append(f"traced memory grew by {traced_growth:.0f} kB")
+    rss_growth = last["rss_kb"] - baseline["rss_kb"]
+    if rss_growth > args.max_rss_growth:
+        failure = f"RSS grew by {rss_growth:.0f} kB"
+        if args.trim_heap:
+            trimmed_growth = last["rss_trimmed_kb"] - baseline["rss_trimmed_kb"]
+            failure += f" ({trimmed_growth:.0f} kB after trimming the C heap)"
+        failures.append(failure)
+    ratio = last["p95_ms"] / max(baseline["p95_ms"], 1e-9)
+    if ratio > 1 + args.max_p95_growth:
+        failures.append(f"p95 frame time grew to {ratio:.2f}x")
+    return failures
+
+
+def soak(args: argparse.Namespace, script: Script) -> dict:
+    manager = SceneManager(main.clock)
+    manager.running = True
+    manager.switch(main.MainMenuScene())
+    start = time.perf_counter()
+    end = start + args.minutes * 60 if args.minutes else float("inf")
+
+    samples: list[dict] = []
+    baseline: dict | None = None
+    baseline_snapshot = None
+    frame_times: list[float] = []  # match frames since the last sample
+    frame = 0
+    while manager.running and script.matches < args.matches:
+        if args.frames and frame >= args.frames or time.perf_counter() > end:
+            break
+        manager.apply_pending()
+        scene = manager.scene
+        if scene is None:
+            break
+        events = script.events(scene)
+        frame_start = time.perf_counter()
+        manager.step(FRAME_MS, events)
+        if isinstance(scene, (main.MatchScene, main.BattleScene)):
+            frame_times.append((time.perf_counter() - frame_start) * 1000)
+        pygame.event.pump()  # the dummy driver queues nothing, keep SDL alive
+        frame += 1
+
+        if frame % args.sample_every == 0:
+            sample = take_sample(
+                frame, script.matches, start, frame_times, args.trim_heap
+            )
+            samples.append(sample)
+            frame_times = []
+            print(
+                f"frame {frame:>8} matches {script.matches:>6} "
+                f"traced {sample['traced_kb']:9.0f} kB rss {sample['rss_kb']:9.0f} kB "
+                f"objects {sample['objects']:>8} p95 {sample['p95_ms']:6.2f} ms"
+            )
+            if baseline is None and script.matches >= args.warmup:
+                baseline = sample
+                baseline_snapshot = tracemalloc.take_snapshot()
+
+    manager.close()
+    last = take_sample(frame, script.matches, start, frame_times, args.trim_heap)
+    if frame_times or not samples:
+        samples.append(last)
+    else:
+        last = samples[-1]  # percentiles of the last full window
+    result: dict = {"samples": samples, "failures": []}
+    if baseline is None or baseline is last:
+        print("Too short for a comparison (no sample after the warm-up)")
+        return result
+
+    growth = object_counts()
+    growth.subtract(collections.Counter(baseline["object_types"]))
+    result["object_growth"] = {
+        name: count
+        for name, count in growth.most_common(10)
+        if name in baseline["object_types"] and count > 0
+    }
+    result["memory_growth"] = [
+        str(stat)
+        for stat in tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")[
+            :10
+        ]
+    ]
+    result["failures"] = check(baseline, last, args)
+    return result
+
+
+def main_soak(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Roboarena soak test")
+    parser.add_argument("-o", "--output", default="soak_results.json")
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--frames", type=int, default=0, help="stop after n frames")
+    parser.add_argument("--minutes", type=float, default=0, help="stop after n minutes")
+    parser.add_argument("--match-frames", type=int, default=600)
+    parser.add_argument("--menu-every", type=int, default=10)
+    parser.add_argument("--battle-every", type=int, default=0, help="0: no battles")
+    parser.add_argument("--sample-every", type=int, default=5000, help="frames")
+    parser.add_argument("--warmup", type=int, default=20, help="matches")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--ai-workers", type=int, help="--ai-workers=n (read by main, see config)"
+    )
+    parser.add_argument(
+        "--max-traced-growth", type=float, default=1024, help="kB of traced memory"
+    )
+    parser.add_argument("--max-rss-growth", type=float, default=32768, help="kB")
+    parser.add_argument(
+        "--max-p95-growth",
+        type=float,
+        default=0.5,
+        help="allowed p95 frame time growth (0.5 = 50%%)",
+    )
+    parser.add_argument(
+        "--trim-heap",
+        action="store_true",
+        help="give free C heap memory back after each sample (rss_trimmed_kb)",
+    )
+    parser.add_argument("--renderer", help="surface or texture (read by main)")
+    args = parser.parse_args(argv)
+
+    script = Script(args.seed, args.match_frames, args.menu_every, args.battle_every)
+    pygame.key.get_pressed = script.get_pressed  # the player reads the script
+
+    tracemalloc.start()
+    result = soak(args, script)
+    tracemalloc.stop()
+    ai_planner.stop_workers()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "meta": {
+                    "python": platform.python_version(),
+                    "pygame": pygame.version.ver,
+                    "platform": platform.platform(),
+                    "renderer": config.RENDER_BACKEND,
+                    "ai_workers": ai_planner.executor_workers,
+                    "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                },
+                **result,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Results written to {args.output}")
+
+    for line in result.get("memory_growth", []):
+        print(line)
+    for failure in result["failures"]:
+        print(f"FAILED: {failure}")
+    if result["failures"]:
+        return 1
+    print("No growth beyond the thresholds.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_soak())
@@ -85,6 +85,10 @@ class Sounds:
                     self.channel_single.set_volume(1.0)
                 self.channel_single.play(self.sounds[action], loops=0)
 
+    def play_at(self, action: str, x: float, y: float):
+        # without a camera the position is not used (see AudioQueue.play_at)
+        self.play_sound(action)
+
     def stop_loop(self, action: str):
         if action == "drive_sound":
             self.move_playing = False
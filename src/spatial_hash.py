@@ -0,0 +1,111 @@
+"""
+Broadphase for the interactions between robots and bullets.
+
+A uniform grid of square cells: every entity is stored in the cell of its
+center, in one layer per kind ("robot", "bullet"). A query returns the entities
+in all cells overlapping the query area. These are candidates, the caller still
+tests the exact distance, so the cost depends on the number of entities nearby
+and not on the number of all entities.
+
+The grid is updated incrementally: move() only touches the cells if the entity
+crossed a cell border.
+"""
+
+import itertools
+import math
+import pygame
+
+
+class SpatialHash:
+    def __init__(self, cell_size: float):
+        """cell_size: in world pixels (a few tiles, about the size of a query)"""
+        self.cell_size = cell_size
+        # kind -> (cell column, cell row) -> entities
+        self.layers: dict[str, dict[tuple[int, int], list]] = {}
+        self.cells: dict[object, tuple[str, tuple[int, int]]] = {}  # cell of entity
+        # insertion order of the entities, the order of the lists they are in
+        self.order: dict[object, int] = {}
+        self.counter = itertools.count()
+        # kind -> largest radius of the entities (queries must reach that far)
+        self.max_radius: dict[str, float] = {}
+
+    def cell(self, x: float, y: float) -> tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, entity, kind: str, radius: float = 0) -> None:
+        """Add an entity with x and y attributes (its center)"""
+        key = self.cell(entity.x, entity.y)
+        self.layers.setdefault(kind, {}).setdefault(key, []).append(entity)
+        self.cells[entity] = (kind, key)
+        self.order[entity] = next(self.counter)
+        if radius > self.max_radius.get(kind, 0):
+            self.max_radius[kind] = radius
+
+    def remove(self, entity) -> None:
+        location = self.cells.pop(entity, None)
+        if location is None:
+            return
+        del self.order[entity]
+        kind, key = location
+        cell = self.layers[kind][key]
+        cell.remove(entity)
+        if not cell:
+            del self.layers[kind][key]
+
+    def move(self, entity) -> None:
+        """Update the cell of an entity after it moved"""
+        kind, key = self.cells[entity]
+        new_key = self.cell(entity.x, entity.y)
+        if new_key == key:
+            return
+        cell = self.layers[kind][key]
+        cell.remove(entity)
+        if not cell:
+            del self.layers[kind][key]
+        self.layers[kind].setdefault(new_key, []).append(entity)
+        self.cells[entity] = (kind, new_key)
+
+    def rebuild(self, kind: str, entities: list, radius: float = 0) -> None:
+        """Replace all entities of a kind"""
+        for entity in [e for e, (k, _) in self.cells.items() if k == kind]:
+            del self.cells[entity]
+            del self.order[entity]
+        self.layers[kind] = {}
+        self.max_radius.pop(kind, None)
+        for entity in entities:
+            self.insert(entity, kind, radius)
+
+    def query_box(
+        self, kind: str, left: float, top: float, right: float, bottom: float
+    ) -> list:
+        """Entities of a kind whose cell overlaps the box (candidates)"""
+        layer = self.layers.get(kind)
+        if not layer:
+            return []
+        first_col, first_row = self.cell(left, top)
+        last_col, last_row = self.cell(right, bottom)
+        found = []
+        if (last_col - first_col + 1) * (last_row - first_row + 1) > len(layer):
+            # large area: checking the occupied cells is cheaper
+            for (col, row), cell in layer.items():
+                if first_col <= col <= last_col and first_row <= row <= last_row:
+                    found.extend(cell)
+            return found
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                cell = layer.get((col, row))
+                if cell:
+                    found.extend(cell)
+        return found
+
+    def in_order(self, entities: list) -> list:
+        """Entities in the order they were inserted (like in the list of a match)"""
+        return sorted(entities, key=self.order.__getitem__)
+
+    def query_radius(self, kind: str, x: float, y: float, radius: float) -> list:
+        """Candidates for entities of a kind with their center within radius"""
+        return self.query_box(kind, x - radius, y - radius, x + radius, y + radius)
+
+    def query_rect(self, kind: str, rect: pygame.Rect) -> list:
+        """Candidates for entities of a kind with their center inside rect"""
+        return self.query_box(kind, rect.left, rect.top, rect.right, rect.bottom)
@@ -0,0 +1,103 @@
+import random
+import pygame
+import config
+from map import EFFECT_COVER, EFFECT_HAZARD, EFFECT_SOLID, Map
+from configuration_space import get_configuration_space
+
+# Number of random candidates compared for each spawn (bounds the time per spawn)
+SPAWN_SAMPLES: int = 32
+
+# Tiles a robot must not touch when spawning (wall, lava and bush)
+BLOCKED_EFFECTS: int = EFFECT_SOLID | EFFECT_HAZARD | EFFECT_COVER
+
+
+class NoSpawnPositionError(Exception):
+    """Raised if the map has no tile a robot with the given hitbox can spawn on"""
+
+
+class SpawnService:
+    def __init__(self, game_map: Map):
+        """Finds spawn positions on a map in bounded time.
+
+        Valid spawn positions (tile centers where the hitbox touches no wall,
+        lava or bush) are computed once per hitbox size. A spawn is the best of
+        SPAWN_SAMPLES random candidates: the one farthest away from all robots.
+        """
+        self.game_map = game_map
+        # (hitbox offset and size, TILE_SIZE) -> valid spawn positions (pixels)
+        self.candidates_by_hitbox: dict[tuple, list[tuple[int, int]]] = {}
+
+    def candidates(self, hitbox: pygame.Rect) -> list[tuple[int, int]]:
+        """
+        Return all valid spawn positions (pixels) for a hitbox
+        hitbox is relative to the robot center (e.g. robot.get_hitbox(0, 0))
+        """
+        key = (hitbox.x, hitbox.y, hitbox.width, hitbox.height, config.TILE_SIZE)
+        if key in self.candidates_by_hitbox:
+            return self.candidates_by_hitbox[key]
+
+        # tile centers where the hitbox is inside the map and touches no blocked tile
+        game_map = self.game_map
+        space = get_configuration_space(
+            game_map, -hitbox.x, -hitbox.y, hitbox.width, hitbox.height, BLOCKED_EFFECTS
+        )
+        positions = []
+        for x, y in game_map.valid_spawn_tiles:
+            px, py = game_map.tile_to_pixel(x, y)
+            if space.free(px, py):
+                positions.append((px, py))
+
+        self.candidates_by_hitbox[key] = positions
+        return positions
+
+    def required_candidates(self, hitbox: pygame.Rect) -> list[tuple[int, int]]:
+        """
+        candidates(), raises NoSpawnPositionError if there is no valid spawn
+        position at all
+        """
+        candidates = self.candidates(hitbox)
+        if not candidates:
+            raise NoSpawnPositionError(
+                f"No spawn position on {self.game_map.file_path or 'the map'} "
+                f"for a hitbox of {hitbox.width}x{hitbox.height} px."
+            )
+        return candidates
+
+    def find_position(
+        self, hitbox: pygame.Rect, occupied: list[tuple[float, float]]
+    ) -> tuple[int, int]:
+        """
+        Return a spawn position (pixels) far away from the occupied positions
+        Raises NoSpawnPositionError if there is no valid spawn position at all
+        """
+        candidates = self.required_candidates(hitbox)
+        if not occupied:
+            return random.choice(candidates)
+
+        # Best candidate sampling: take the sample with the largest distance
+        # to the nearest occupied position
+        samples = random.sample(candidates, min(SPAWN_SAMPLES, len(candidates)))
+        best_position = samples[0]
+        best_dist = -1.0
+        for px, py in samples:
+            dist = min((px - x) ** 2 + (py - y) ** 2 for x, y in occupied)
+            if dist > best_dist:
+                best_position = (px, py)
+                best_dist = dist
+        return best_position
+
+    def generate_spawn_positions(
+        self, count: int, hitbox: pygame.Rect
+    ) -> list[tuple[int, int]]:
+        """Generate spawn positions (pixels) for count robots far from each other"""
+        positions: list[tuple[int, int]] = []
+        for _ in range(count):
+            positions.append(self.find_position(hitbox, positions))
+        return positions
+
+
+def get_spawn_service(game_map: Map) -> SpawnService:
+    """Return the spawn service of the map (created once per map)"""
+    if game_map.spawn_service is None:
+        game_map.spawn_service = SpawnService(game_map)
+    return game_map.spawn_service
@@ -0,0 +1,52 @@
+"""
+Steering of the enemies: turning towards the goal and the fire cone.
+
+steer() is the per-robot logic of Robot.update_enemy and of the steering system
+of the mass battle (battle_world.py), facing() the one of Robot.move_if_in_range.
+"""
+
+import math
+
+
+def goal_angle(x_to_goal: float, y_to_goal: float, alpha: float) -> float:
+    """
+    Direction from the goal to the robot (0 to 360 degree), negative if the robot
+    turns the other way round to face the goal (alpha: direction of the robot)
+    """
+    angle_to_goal = (math.degrees(math.atan2(y_to_goal, x_to_goal)) + 180) % 360
+
+    # Invert direction if shortest rotation is the other way
+    if angle_to_goal < alpha:
+        if abs(angle_to_goal - alpha) > 180:
+            angle_to_goal *= -1
+    else:
+        if abs(angle_to_goal - alpha) < 180:
+            angle_to_goal *= -1
+    return angle_to_goal
+
+
+def steer(
+    x_to_goal: float, y_to_goal: float, alpha: float, v: float, v_alpha: float
+) -> tuple[float, float, float, bool]:
+    """
+    Movement (x, y) of a robot with speed v towards the goal, its direction after
+    turning towards the goal by v_alpha and whether it faces the goal then (at
+    most 10 degree off, time to shoot)
+    """
+    angle_to_goal = goal_angle(x_to_goal, y_to_goal, alpha)
+    alpha = (alpha + math.copysign(v_alpha, angle_to_goal)) % 360
+    angle_diff = abs(abs(angle_to_goal - 180) - alpha) % 360
+    return (
+        math.copysign(v, x_to_goal),
+        math.copysign(v, y_to_goal),
+        alpha,
+        (angle_diff <= 10) or (angle_diff >= 350),
+    )
+
+
+def facing(x: float, y: float, robot) -> bool:
+    """Whether robot faces the position (x, y), at most 10 degree off"""
+    rad_to_robot = math.atan2(robot.y - y, robot.x - x)
+    angle_to_robot = (math.degrees(rad_to_robot) + 180) % 360
+    angle_diff = abs(angle_to_robot - robot.alpha) % 360
+    return (angle_diff <= 10) or (angle_diff >= 350)
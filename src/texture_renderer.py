@@ -0,0 +1,245 @@
+"""
+SDL2 texture backend (pygame._sdl2.video).
+
+The map chunks, bush layers, robot frames, icons, value texts and bullets are
+uploaded once as textures and drawn by the SDL renderer (scaling and rotation
+happen there instead of in pygame.transform on every frame). Menus and texts are
+still drawn on a pygame.Surface, which is uploaded as an overlay texture by the
+Presenter.
+
+Works with SDL's software renderer (TEXTURE_ACCELERATED = 0), so it also runs
+without a GPU, e.g. with SDL_VIDEODRIVER=dummy.
+"""
+
+import math
+from collections import OrderedDict
+import pygame
+from pygame._sdl2.video import Renderer, Texture, Window
+import config
+from camera import Camera
+from map_renderer import MapRenderer
+from robot_renderer import RobotRenderer
+
+BLEND_MODE_BLEND: int = 1  # SDL_BLENDMODE_BLEND (alpha blending)
+MAX_CACHED_TEXTS: int = 512  # rendered value texts kept as textures (LRU)
+
+
+class TextureBackend:
+    def __init__(self, title: str, size: tuple[int, int]):
+        """Creates the game window with an SDL renderer
+
+        pygame.display.set_mode creates its own window, which can not be used by
+        a Renderer. It is created hidden (events and convert() still need it).
+        """
+        if pygame.display.get_surface() is None:
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        self.window = Window(title, size)
+        self.renderer = Renderer(self.window, accelerated=config.TEXTURE_ACCELERATED)
+        self.size = size
+
+        # menus and texts are drawn on this surface and shown as overlay
+        self.overlay_surface = pygame.Surface(size, pygame.SRCALPHA, 32)
+        self.overlay = Texture(self.renderer, size, streaming=True)
+        self.overlay.blend_mode = BLEND_MODE_BLEND
+
+        # (color, radius) -> bullet circle
+        self.bullet_textures: dict[tuple, Texture] = {}
+
+    def clear(self) -> None:
+        """Clears the whole window (black)"""
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+
+    def draw_overlay(self) -> None:
+        """Uploads the overlay surface and draws it on top of the window"""
+        self.overlay.update(self.overlay_surface)
+        self.overlay.draw()
+
+    def present(self) -> None:
+        self.renderer.present()
+
+    def draw_bullet(self, bullet, camera: Camera) -> pygame.Rect:
+        """Draws a bullet (like Bullet.draw_bullet) and returns the drawn region"""
+        return self.draw_circle(
+            bullet.color, bullet.radius, camera.apply(int(bullet.x), int(bullet.y))
+        )
+
+    def draw_circle(self, color, radius: int, center: tuple[int, int]) -> pygame.Rect:
+        """Draws a filled circle (cached texture) and returns the drawn region"""
+        key = (tuple(color), radius)
+        if key not in self.bullet_textures:
+            size = radius * 2
+            circle = pygame.Surface((size, size), pygame.SRCALPHA, 32)
+            pygame.draw.circle(circle, color, (radius, radius), radius)
+            self.bullet_textures[key] = Texture.from_surface(self.renderer, circle)
+
+        texture = self.bullet_textures[key]
+        rect = pygame.Rect(0, 0, texture.width, texture.height)
+        rect.center = center
+        texture.draw(dstrect=rect)
+        return rect
+
+
+class TextureMapRenderer(MapRenderer):
+    def __init__(self, renderer: Renderer, camera_surface, textures):
+        """MapRenderer drawing the map chunks as textures"""
+        super().__init__(camera_surface, textures)
+        self.renderer = renderer
+        # (chunk_x, chunk_y) -> chunk texture, least recently used first
+        self.chunk_textures: OrderedDict[tuple[int, int], Texture] = OrderedDict()
+        # (chunk_x, chunk_y) -> bush layer texture, least recently used first
+        self.bush_layer_textures: OrderedDict[tuple[int, int], Texture | None] = (
+            OrderedDict()
+        )
+
+    def draw_map_picture(self, game_map) -> None:
+        super().draw_map_picture(game_map)
+        self.chunk_textures.clear()
+        self.bush_layer_textures.clear()
+
+    def get_chunk_texture(self, chunk_x: int, chunk_y: int) -> Texture:
+        """Returns the chunk texture and uploads it if it is not cached"""
+        key = (chunk_x, chunk_y)
+        if key in self.chunk_textures:
+            self.chunk_textures.move_to_end(key)
+            return self.chunk_textures[key]
+
+        texture = Texture.from_surface(self.renderer, self.render_chunk(*key))
+        self.chunk_textures[key] = texture
+        if len(self.chunk_textures) > config.MAX_CACHED_CHUNKS:
+            self.chunk_textures.popitem(last=False)  # drop least recently used
+        return texture
+
+    def draw_map(self, camera: Camera) -> None:
+        """Clears the window and draws the visible chunks"""
+        self.check_edits()
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+        for chunk_x, chunk_y in self.visible_chunks(camera):
+            texture = self.get_chunk_texture(chunk_x, chunk_y)
+            rect = self.chunk_rect(camera, chunk_x, chunk_y, texture.width,
+                                   texture.height)
+            if rect.width > 0 and rect.height > 0:
+                texture.draw(dstrect=rect)
+
+    def get_bush_layer_texture(self, chunk_x: int, chunk_y: int) -> Texture | None:
+        """Returns the bush layer of a chunk (at TILE_SIZE) as texture"""
+        key = (chunk_x, chunk_y)
+        if key in self.bush_layer_textures:
+            self.bush_layer_textures.move_to_end(key)
+            return self.bush_layer_textures[key]
+
+        layer = self.render_bush_layer(chunk_x, chunk_y, config.TILE_SIZE)
+        texture = Texture.from_surface(self.renderer, layer) if layer else None
+        self.bush_layer_textures[key] = texture
+        if len(self.bush_layer_textures) > config.MAX_CACHED_CHUNKS:
+            self.bush_layer_textures.popitem(last=False)
+        return texture
+
+    def draw_bush_overlay(
+        self, tiles: list[tuple[int, int]], camera: Camera
+    ) -> list[pygame.Rect]:
+        tile_size = int(config.TILE_SIZE * camera.zoom)
+        drawn_rects = []
+        for x, y in tiles:
+            chunk_x, local_x = divmod(x, config.CHUNK_SIZE)
+            chunk_y, local_y = divmod(y, config.CHUNK_SIZE)
+            texture = self.get_bush_layer_texture(chunk_x, chunk_y)
+            if texture is None:
+                continue
+            area = pygame.Rect(
+                local_x * config.TILE_SIZE,
+                local_y * config.TILE_SIZE,
+                config.TILE_SIZE,
+                config.TILE_SIZE,
+            )
+            rect = pygame.Rect(
+                camera.apply(x * config.TILE_SIZE, y * config.TILE_SIZE),
+                (tile_size, tile_size),
+            )
+            texture.draw(srcrect=area, dstrect=rect)
+            drawn_rects.append(rect)
+        return drawn_rects
+
+
+class TextureRobotRenderer(RobotRenderer):
+    def __init__(self, renderer: Renderer, camera_surface):
+        """RobotRenderer drawing frames, bars, icons and texts with the renderer"""
+        self.renderer = renderer
+        self.frame_textures: dict[pygame.Surface, Texture] = {}  # frame -> texture
+        self.icon_textures: dict[str, Texture] = {}
+        # (font, text, color, outline color) -> text texture, least recently used first
+        self.text_textures: OrderedDict[tuple, Texture] = OrderedDict()
+        super().__init__(camera_surface)
+
+    def load_robot_type(self, robot_type: str):
+        super().load_robot_type(robot_type)
+        for frame in self.animations[robot_type]:
+            self.frame_textures[frame] = Texture.from_surface(self.renderer, frame)
+
+    def draw_sprite(
+        self, frame: pygame.Surface, size: int, angle: float, center: tuple[int, int]
+    ) -> pygame.Rect:
+        rect = pygame.Rect(0, 0, size, size)
+        rect.center = center
+        # pygame rotates counterclockwise, SDL clockwise
+        self.frame_textures[frame].draw(dstrect=rect, angle=-angle)
+
+        # region of the rotated sprite
+        radians = math.radians(angle)
+        rotated_size = math.ceil(size * (abs(math.cos(radians)) + abs(math.sin(radians))))
+        return pygame.Rect(0, 0, rotated_size, rotated_size).move(
+            center[0] - rotated_size // 2, center[1] - rotated_size // 2
+        )
+
+    def draw_rect(self, color, rect: pygame.Rect, width: int = 0) -> None:
+        rect = pygame.Rect(rect)
+        self.renderer.draw_color = pygame.Color(color)
+        if width <= 0:
+            self.renderer.fill_rect(rect)
+            return
+        # pygame draws the outline inside the rect
+        for i in range(width):
+            inner = rect.inflate(-2 * i, -2 * i)
+            if inner.width <= 0 or inner.height <= 0:
+                break
+            self.renderer.draw_rect(inner)
+
+    def draw_icon(
+        self, name: str, size: int, position: tuple[float, float], angle: float = 0
+    ) -> pygame.Rect:
+        if name not in self.icon_textures:
+            self.icon_textures[name] = Texture.from_surface(
+                self.renderer, config.ICONS[name]
+            )
+        rect = pygame.Rect(position, (size, size))
+        self.icon_textures[name].draw(dstrect=rect, angle=-angle)
+        return rect
+
+    def draw_text_with_outline(
+        self, font, text, x, y, color=(255, 255, 255), outline_color=(0, 0, 0)
+    ):
+        key = (font, text, color, outline_color)
+        if key in self.text_textures:
+            self.text_textures.move_to_end(key)
+        else:
+            # text with its outline in 8 directions, rendered once
+            main_text = font.render(text, True, color)
+            outline = font.render(text, True, outline_color)
+            surface = pygame.Surface(
+                (main_text.get_width() + 2, main_text.get_height() + 2),
+                pygame.SRCALPHA,
+                32,
+            )
+            for offset_x in (-1, 0, 1):
+                for offset_y in (-1, 0, 1):
+                    if offset_x or offset_y:
+                        surface.blit(outline, (1 + offset_x, 1 + offset_y))
+            surface.blit(main_text, (1, 1))
+
+            self.text_textures[key] = Texture.from_surface(self.renderer, surface)
+            if len(self.text_textures) > MAX_CACHED_TEXTS:
+                self.text_textures.popitem(last=False)
+
+        texture = self.text_textures[key]
+        texture.draw(dstrect=(x - 1, y - 1, texture.width, texture.height))